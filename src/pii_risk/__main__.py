@@ -1,36 +1,328 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import sys
+
 import typer
 
-from pii_risk.eval.audit import audit_records
+from pii_risk.data.compact import DEFAULT_ROW_GROUP_ROWS, compact_dataset
+from pii_risk.data.sampling import SAMPLE_MODES
+from pii_risk.eval.audit import DEFAULT_AUDIT_BATCH_ROWS, DEFAULT_THRESHOLD, audit_records
+from pii_risk.eval.checkpoint import DEFAULT_CHECKPOINT_SECONDS
+from pii_risk.eval.cube import RiskCube, update_cube
+from pii_risk.eval.rollups import (
+    DEFAULT_HIGH_RISK_SCORE,
+    DEFAULT_MAX_GROUPS,
+    ROLLUP_KEYS,
+    aggregate_exposure,
+)
+from pii_risk.eval.summary import DEFAULT_TOP_K
+from pii_risk.eval.sweep import parse_thresholds
+from pii_risk.labels.functions import LABELING_FUNCTIONS, label_dataset
 from pii_risk.pii.detector import detect_pii_spans, redact_text
 from pii_risk.pii.scoring import score_record
 
-from pii_risk.ingest.mastodon import ingest_mastodon
+from pii_risk.ingest.mastodon import ingest_mastodon, ingest_mastodon_stream
 from pii_risk.ingest.reddit import ingest_reddit
+from pii_risk.ingest.stream import DEFAULT_MICRO_BATCH_ROWS, DEFAULT_MICRO_BATCH_SECONDS
+from pii_risk.ml.batch_score import DEFAULT_SCORE_BATCH_ROWS, score_dataset
 from pii_risk.ml.combine import combined_score
+from pii_risk.ml.near_dup import DEFAULT_MAX_DISTANCE
 from pii_risk.ml.predict import predict_risk
+from pii_risk.ml.stream import DEFAULT_MAX_LATENCY_MS, DEFAULT_STREAM_BATCH_ROWS, score_stream
 from pii_risk.ml.train import train_model
+from pii_risk.service import (
+    DEFAULT_BATCH_LATENCY_MS,
+    DEFAULT_HOST,
+    DEFAULT_MAX_BATCH,
+    DEFAULT_PORT,
+    load_test,
+    serve,
+)
 
 app = typer.Typer(help="PII risk assessment tools.")
 
+SAMPLE_MODE_HELP = f"How --max-rows rows are picked: {', '.join(SAMPLE_MODES)}."
+STRATA_HELP = "Comma-separated strata for --sample-mode stratified: platform,community,month."
+
+
+def _parse_list(value: str) -> tuple[str, ...]:
+    return tuple(name.strip() for name in value.split(",") if name.strip())
+
+
+def _parse_functions(value: str) -> tuple[str, ...]:
+    names = _parse_list(value)
+    return tuple(LABELING_FUNCTIONS) if names == ("all",) else names
+
 
 @app.command("ingest-reddit")
 def ingest_reddit_command(
-    input: str = typer.Option(..., "--input", help="Path to JSONL or CSV file."),
+    input: str = typer.Option(..., "--input", help="Path to JSONL, CSV, Arrow or Parquet input."),
     output: str = typer.Option(..., "--output", help="Output directory."),
     max_rows: int | None = typer.Option(None, "--max-rows", help="Max rows to ingest."),
+    workers: int = typer.Option(1, "--workers", help="Worker processes for JSONL input."),
+    dedup: bool = typer.Option(
+        True, "--dedup/--no-dedup", help="Skip record ids already in the dataset."
+    ),
 ) -> None:
-    ingest_reddit(input, output, max_rows)
+    ingest_reddit(input, output, max_rows, workers=workers, dedup=dedup)
 
 
 @app.command("ingest-mastodon")
 def ingest_mastodon_command(
-    input: str = typer.Option(..., "--input", help="Path to JSONL or CSV file."),
+    input: str = typer.Option(..., "--input", help="Path to JSONL, CSV, Arrow or Parquet input."),
     output: str = typer.Option(..., "--output", help="Output directory."),
     max_rows: int | None = typer.Option(None, "--max-rows", help="Max rows to ingest."),
+    workers: int = typer.Option(1, "--workers", help="Worker processes for JSONL input."),
+    dedup: bool = typer.Option(
+        True, "--dedup/--no-dedup", help="Skip record ids already in the dataset."
+    ),
+    default_created_at: str | None = typer.Option(
+        None, "--default-created-at", help="Timestamp for posts that have none."
+    ),
+) -> None:
+    ingest_mastodon(
+        input,
+        output,
+        max_rows,
+        workers=workers,
+        dedup=dedup,
+        default_created_at=default_created_at,
+    )
+
+
+@app.command("ingest-mastodon-stream")
+def ingest_mastodon_stream_command(
+    source: str = typer.Option(
+        "-", "--source", help="'-' for stdin, tcp://host:port, unix:///path or a FIFO path."
+    ),
+    output: str = typer.Option(..., "--output", help="Output directory."),
+    batch_rows: int = typer.Option(
+        DEFAULT_MICRO_BATCH_ROWS, "--batch-rows", help="Write a batch after this many events."
+    ),
+    batch_seconds: float = typer.Option(
+        DEFAULT_MICRO_BATCH_SECONDS,
+        "--batch-seconds",
+        help="Write a batch once its first event is this old.",
+    ),
+    max_rows: int | None = typer.Option(None, "--max-rows", help="Stop after this many events."),
+    dedup: bool = typer.Option(
+        True, "--dedup/--no-dedup", help="Skip record ids already in the dataset."
+    ),
+    default_created_at: str | None = typer.Option(
+        None, "--default-created-at", help="Timestamp for posts that have none."
+    ),
+    score_output: str | None = typer.Option(
+        None, "--score-output", help="Also write each batch scored to this directory."
+    ),
+    models: str = typer.Option("models", "--models", help="Models directory for scoring."),
+) -> None:
+    ingest_mastodon_stream(
+        source,
+        output,
+        batch_rows=batch_rows,
+        batch_seconds=batch_seconds,
+        max_rows=max_rows,
+        dedup=dedup,
+        default_created_at=default_created_at,
+        score_dir=score_output,
+        models_dir=models,
+    )
+
+
+@app.command("compact-dataset")
+def compact_dataset_command(
+    input: str = typer.Option(..., "--input", help="Path to Parquet dataset."),
+    target_file_mb: int = typer.Option(256, "--target-file-mb", help="Target file size."),
+    row_group_rows: int = typer.Option(
+        DEFAULT_ROW_GROUP_ROWS, "--row-group-rows", help="Rows per row group."
+    ),
+    measure_scan: bool = typer.Option(
+        True,
+        "--measure-scan/--no-measure-scan",
+        help="Time a streaming created_at scan before and after.",
+    ),
+) -> None:
+    compact_dataset(
+        input,
+        target_file_bytes=target_file_mb * 1024 * 1024,
+        row_group_rows=row_group_rows,
+        measure_scan=measure_scan,
+    )
+
+
+@app.command("score-dataset")
+def score_dataset_command(
+    input: str = typer.Option(..., "--input", help="Path to Parquet dataset."),
+    output: str = typer.Option(..., "--output", help="Output directory for the scored dataset."),
+    models_dir: str = typer.Option("models", "--models", help="Folder with the model artifacts."),
+    workers: int = typer.Option(1, "--workers", help="Partitions scored in parallel."),
+    batch_size: int = typer.Option(
+        DEFAULT_SCORE_BATCH_ROWS, "--batch-size", help="Records per scoring batch."
+    ),
+    force: bool = typer.Option(
+        False, "--force", help="Re-score every partition, even unchanged ones."
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="List the partitions that would be re-scored."
+    ),
+    near_duplicates: bool = typer.Option(
+        False,
+        "--near-duplicates/--no-near-duplicates",
+        help="Reuse the model score of near-identical texts within a partition.",
+    ),
+    near_duplicate_distance: int = typer.Option(
+        DEFAULT_MAX_DISTANCE,
+        "--near-duplicate-distance",
+        help="Max differing SimHash bits for two texts to share a score.",
+    ),
+    cube: str | None = typer.Option(
+        None, "--cube", help="Refresh this rollup cube after scoring."
+    ),
+) -> None:
+    score_dataset(
+        input,
+        output,
+        models_dir=models_dir,
+        workers=workers,
+        batch_size=batch_size,
+        force=force,
+        dry_run=dry_run,
+        near_duplicates=near_duplicates,
+        near_duplicate_distance=near_duplicate_distance,
+        cube_dir=cube,
+    )
+
+
+@app.command("aggregate")
+def aggregate_command(
+    input: str = typer.Option(..., "--input", help="Path to a scored Parquet dataset."),
+    output: str = typer.Option(..., "--output", help="Output directory for the rollups."),
+    keys: str = typer.Option(
+        ",".join(ROLLUP_KEYS), "--keys", help="Comma-separated keys to roll up by."
+    ),
+    high_risk_score: int = typer.Option(
+        DEFAULT_HIGH_RISK_SCORE, "--high-risk-score", help="final_score counted as high risk."
+    ),
+    max_groups: int = typer.Option(
+        DEFAULT_MAX_GROUPS, "--max-groups", help="Groups per key held in memory before spilling."
+    ),
+    platform: str | None = typer.Option(None, "--platform", help="Only this platform."),
+    created_from: str | None = typer.Option(
+        None, "--created-from", help="Only records created at or after this ISO prefix."
+    ),
+    created_to: str | None = typer.Option(
+        None, "--created-to", help="Only records created before this ISO prefix."
+    ),
+) -> None:
+    aggregate_exposure(
+        input,
+        output,
+        keys=[key.strip() for key in keys.split(",") if key.strip()],
+        high_risk_score=high_risk_score,
+        max_groups=max_groups,
+        platform=platform,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
+@app.command("update-cube")
+def update_cube_command(
+    input: str = typer.Option(..., "--input", help="Path to a scored Parquet dataset."),
+    output: str = typer.Option(..., "--output", help="Directory of the rollup cube."),
+    force: bool = typer.Option(False, "--force", help="Rebuild every slice of the cube."),
+) -> None:
+    update_cube(input, output, force=force)
+
+
+@app.command("query-cube")
+def query_cube_command(
+    cube: str = typer.Option(..., "--cube", help="Directory of the rollup cube."),
+    by: str = typer.Option("", "--by", help="Comma-separated dimensions to group by."),
+    pii_type: str | None = typer.Option(None, "--pii-type", help="Only records with this type."),
+    platform: str | None = typer.Option(None, "--platform", help="Comma-separated platforms."),
+    community: str | None = typer.Option(None, "--community", help="Comma-separated communities."),
+    year: str | None = typer.Option(None, "--year", help="Comma-separated years."),
+    month: str | None = typer.Option(None, "--month", help="Comma-separated months."),
+    score_bucket: str | None = typer.Option(
+        None, "--score-bucket", help="Comma-separated score buckets, e.g. 75-100."
+    ),
+) -> None:
+    filters = {
+        name: _parse_list(value)
+        for name, value in {
+            "platform": platform,
+            "community": community,
+            "year": year,
+            "month": month,
+            "score_bucket": score_bucket,
+        }.items()
+        if value is not None
+    }
+    result = RiskCube.open(cube).query(by=_parse_list(by), pii_type=pii_type, **filters)
+    for row in result.to_pylist():
+        typer.echo(json.dumps(row))
+
+
+@app.command("score-stream")
+def score_stream_command(
+    models_dir: str = typer.Option("models", "--models", help="Folder with the model artifacts."),
+    batch_size: int = typer.Option(
+        DEFAULT_STREAM_BATCH_ROWS, "--batch-size", help="Max records per micro-batch."
+    ),
+    max_latency_ms: float = typer.Option(
+        DEFAULT_MAX_LATENCY_MS, "--max-latency-ms", help="Max wait before a partial batch."
+    ),
+    text_field: str = typer.Option("text", "--text-field", help="JSON field holding the text."),
 ) -> None:
-    ingest_mastodon(input, output, max_rows)
+    try:
+        score_stream(
+            sys.stdin.buffer,
+            sys.stdout.buffer,
+            models_dir=models_dir,
+            batch_size=batch_size,
+            max_latency_ms=max_latency_ms,
+            text_field=text_field,
+        )
+    except BrokenPipeError:
+        # The consumer went away (e.g. `| head`); stop quietly.
+        sys.stderr.close()
+
+
+@app.command("serve")
+def serve_command(
+    models_dir: str = typer.Option("models", "--models", help="Folder with the model artifacts."),
+    host: str = typer.Option(DEFAULT_HOST, "--host", help="Address to listen on."),
+    port: int = typer.Option(DEFAULT_PORT, "--port", help="TCP port to listen on."),
+    socket_path: str | None = typer.Option(
+        None, "--socket", help="Listen on this Unix socket instead of TCP."
+    ),
+    workers: int = typer.Option(1, "--workers", help="Scoring processes."),
+    max_batch: int = typer.Option(DEFAULT_MAX_BATCH, "--max-batch", help="Max texts per batch."),
+    max_latency_ms: float = typer.Option(
+        DEFAULT_BATCH_LATENCY_MS, "--max-latency-ms", help="Max wait to fill a batch."
+    ),
+) -> None:
+    try:
+        asyncio.run(
+            serve(models_dir, host, port, socket_path, workers, max_batch, max_latency_ms)
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+@app.command("load-test-service")
+def load_test_service_command(
+    host: str = typer.Option(DEFAULT_HOST, "--host", help="Service address."),
+    port: int = typer.Option(DEFAULT_PORT, "--port", help="Service TCP port."),
+    socket_path: str | None = typer.Option(None, "--socket", help="Service Unix socket."),
+    endpoint: str = typer.Option("/v1/score", "--endpoint", help="Endpoint to call."),
+    requests: int = typer.Option(1_000, "--requests", help="Requests to send."),
+    concurrency: int = typer.Option(32, "--concurrency", help="Concurrent connections."),
+) -> None:
+    asyncio.run(load_test(host, port, socket_path, endpoint, requests, concurrency))
 
 
 @app.command("analyze-text")
@@ -50,8 +342,40 @@ def analyze_text_command(
 def train_ml_command(
     input: str = typer.Option(..., "--input", help="Path to Parquet dataset."),
     max_rows: int | None = typer.Option(None, "--max-rows", help="Max rows to ingest."),
+    sample_mode: str = typer.Option("head", "--sample-mode", help=SAMPLE_MODE_HELP),
+    seed: int = typer.Option(0, "--seed", help="Seed for sampling."),
+    strata: str = typer.Option("platform", "--strata", help=STRATA_HELP),
+    labeling_functions: str = typer.Option(
+        "",
+        "--labeling-functions",
+        help="Label with these comma-separated labeling functions ('all' for every one).",
+    ),
+) -> None:
+    train_model(
+        input,
+        max_rows=max_rows,
+        sample_mode=sample_mode,
+        seed=seed,
+        strata=_parse_list(strata),
+        labeling_functions=_parse_functions(labeling_functions),
+    )
+
+
+@app.command("label-dataset")
+def label_dataset_command(
+    input: str = typer.Option(..., "--input", help="Path to Parquet dataset."),
+    output: str = typer.Option(..., "--output", help="Parquet file for the labels."),
+    functions: str = typer.Option(
+        "all", "--functions", help="Comma-separated labeling functions ('all' for every one)."
+    ),
+    max_rows: int | None = typer.Option(None, "--max-rows", help="Max rows to label."),
 ) -> None:
-    train_model(input, max_rows=max_rows)
+    label_dataset(
+        input,
+        output,
+        functions=_parse_functions(functions) or None,
+        max_rows=max_rows,
+    )
 
 
 @app.command("analyze-text-ml")
@@ -79,11 +403,71 @@ def analyze_text_ml_command(
 def audit_ml_command(
     input: str = typer.Option(..., "--input", help="Path to Parquet dataset."),
     model: str = typer.Option(..., "--model", help="Path to model artifact or folder."),
-    out: str = typer.Option(..., "--out", help="Output CSV path."),
+    out: str = typer.Option(..., "--out", help="Output .csv, .parquet or .arrow path."),
     max_rows: int | None = typer.Option(None, "--max-rows", help="Max rows to scan."),
     seed: int = typer.Option(0, "--seed", help="Seed for reproducibility."),
+    sample_mode: str = typer.Option("head", "--sample-mode", help=SAMPLE_MODE_HELP),
+    strata: str = typer.Option("platform", "--strata", help=STRATA_HELP),
+    batch_size: int = typer.Option(
+        DEFAULT_AUDIT_BATCH_ROWS, "--batch-size", help="Records per audit batch."
+    ),
+    workers: int = typer.Option(1, "--workers", help="Processes for rule analysis."),
+    file_format: str | None = typer.Option(
+        None, "--format", help="csv, parquet or arrow; inferred from --out by default."
+    ),
+    partition_by: str = typer.Option(
+        "", "--partition-by", help="Comma-separated: bucket,community (parquet/arrow)."
+    ),
+    text: bool = typer.Option(True, "--text/--no-text", help="Write the raw text."),
+    redacted_text: bool = typer.Option(
+        True, "--redacted-text/--no-redacted-text", help="Write the redacted text."
+    ),
+    summary_only: bool = typer.Option(
+        False, "--summary-only", help="Write only a JSON summary to --out."
+    ),
+    top_k: int = typer.Option(
+        DEFAULT_TOP_K, "--top-k", help="False positives/negatives kept for review."
+    ),
+    threshold: float = typer.Option(
+        DEFAULT_THRESHOLD, "--threshold", help="p_risk cutoff for pred_risk."
+    ),
+    sweep: str | None = typer.Option(
+        None, "--sweep", help="Thresholds to evaluate, e.g. 0.3,0.5 or 0.05:0.95:0.05."
+    ),
+    sweep_out: str | None = typer.Option(
+        None, "--sweep-out", help="Write the threshold curve (.csv, .parquet or .arrow)."
+    ),
+    checkpoint_every: float = typer.Option(
+        DEFAULT_CHECKPOINT_SECONDS,
+        "--checkpoint-every",
+        help="Seconds between progress checkpoints next to --out.",
+    ),
+    resume: bool = typer.Option(
+        False, "--resume", help="Continue an interrupted audit from its checkpoint."
+    ),
 ) -> None:
-    audit_records(input, model, out, max_rows=max_rows, seed=seed)
+    audit_records(
+        input,
+        model,
+        out,
+        max_rows=max_rows,
+        seed=seed,
+        sample_mode=sample_mode,
+        strata=_parse_list(strata),
+        batch_size=batch_size,
+        workers=workers,
+        file_format=file_format,
+        partition_by=_parse_list(partition_by),
+        include_text=text,
+        include_redacted=redacted_text,
+        summary_only=summary_only,
+        top_k=top_k,
+        threshold=threshold,
+        thresholds=parse_thresholds(sweep) if sweep else None,
+        sweep_path=sweep_out,
+        checkpoint_seconds=checkpoint_every,
+        resume=resume,
+    )
 
 
 def main() -> None:
@@ -0,0 +1 @@
+"""Data access utilities for partitioned Parquet datasets."""
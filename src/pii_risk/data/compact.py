@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pii_risk.ingest.manifest import IngestManifest
+
+
+DEFAULT_TARGET_FILE_BYTES = 256 * 1024 * 1024
+DEFAULT_ROW_GROUP_ROWS = 128 * 1024
+DEFAULT_SORT_RUN_ROWS = 1024 * 1024
+MERGE_READ_FRACTION = 64
+DICTIONARY_COLUMNS = ("platform", "record_type", "community")
+SORT_COLUMN = "created_at"
+COMPACT_PREFIX = "compact-"
+
+
+def compact_dataset(
+    input_dir: str,
+    target_file_bytes: int = DEFAULT_TARGET_FILE_BYTES,
+    row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+    measure_scan: bool = True,
+    sort_run_rows: int = DEFAULT_SORT_RUN_ROWS,
+) -> dict:
+    """Rewrite every leaf partition of a hive dataset into few sorted files.
+
+    Each partition is rewritten into files of roughly ``target_file_bytes``
+    sorted by ``created_at``, with ``row_group_rows`` rows per row group,
+    dictionary encoding for low-cardinality columns and column statistics so
+    ``created_at`` range filters can skip row groups. A partition larger
+    than ``sort_run_rows`` is sorted externally: sorted runs are written to
+    disk and merged, so memory holds about one run at a time.
+
+    The new files are staged in a sibling directory that replaces the
+    partition by two renames. A reader never sees a mix of old and new
+    files, but may briefly find the partition missing. Files other than
+    the data parts (and any sub-directories) are carried over, and an
+    interrupted run is repaired on the next one. ``measure_scan`` times a
+    streaming scan of ``created_at`` before and after.
+    """
+    if sort_run_rows <= 0:
+        raise ValueError("sort_run_rows must be positive")
+    root = Path(input_dir)
+    pending = [
+        entry["path"]
+        for entry in IngestManifest.load(root).data["inputs"].values()
+        if IngestManifest.interrupted(entry)
+    ]
+    if pending:
+        # Unfinished ingests may own uncheckpointed part files that a resume
+        # deletes; folding them into compacted files would duplicate rows.
+        raise ValueError(f"Finish or discard interrupted ingests first: {pending}")
+
+    partitions = _leaf_partitions(root)
+    files_before = sum(len(_data_files(partition)) for partition in partitions)
+    scan_before = _time_scan(root) if measure_scan else None
+
+    compacted = 0
+    for partition in partitions:
+        if _compact_partition(partition, target_file_bytes, row_group_rows, sort_run_rows):
+            compacted += 1
+
+    files_after = sum(len(_data_files(partition)) for partition in _leaf_partitions(root))
+    scan_after = _time_scan(root) if measure_scan else None
+
+    print(f"partitions: {len(partitions)} compacted: {compacted}")
+    print(f"files_before: {files_before} files_after: {files_after}")
+    if scan_before is not None and scan_after is not None:
+        print(f"scan_seconds_before: {scan_before:.3f} scan_seconds_after: {scan_after:.3f}")
+
+    return {
+        "partitions": len(partitions),
+        "compacted_partitions": compacted,
+        "files_before": files_before,
+        "files_after": files_after,
+        "scan_seconds_before": scan_before,
+        "scan_seconds_after": scan_after,
+    }
+
+
+def _data_files(directory: Path) -> list[Path]:
+    return sorted(
+        path
+        for path in directory.glob("*.parquet")
+        if path.is_file() and not path.name.startswith((".", "_"))
+    )
+
+
+def _leaf_partitions(root: Path) -> list[Path]:
+    _recover_interrupted_swaps(root)
+    partitions = set()
+    for path in root.rglob("*.parquet"):
+        relative = path.relative_to(root).parts
+        if any(part.startswith((".", "_")) for part in relative):
+            continue
+        partitions.add(path.parent)
+    return sorted(partitions)
+
+
+def _recover_interrupted_swaps(root: Path) -> None:
+    for backup in root.rglob(".*.compact-old"):
+        target = backup.with_name(backup.name[1 : -len(".compact-old")])
+        if target.exists():
+            # The compacted files are in place; finish the swap.
+            _move_extras(backup, target)
+            shutil.rmtree(backup)
+        else:
+            os.rename(backup, target)
+    for staging in root.rglob(".*.compact-new"):
+        shutil.rmtree(staging)
+
+
+def _move_extras(source: Path, target: Path) -> None:
+    """Move everything but the data parts of ``source`` into ``target``."""
+    data_files = set(_data_files(source))
+    for path in source.iterdir():
+        if path not in data_files and not (target / path.name).exists():
+            os.rename(path, target / path.name)
+
+
+def _compact_partition(
+    partition: Path, target_file_bytes: int, row_group_rows: int, sort_run_rows: int
+) -> bool:
+    files = _data_files(partition)
+    if not files or (len(files) == 1 and files[0].name.startswith(COMPACT_PREFIX)):
+        return False
+
+    dataset = ds.dataset(files, format="parquet")
+    num_rows = dataset.count_rows()
+    input_bytes = sum(path.stat().st_size for path in files)
+    bytes_per_row = max(1.0, input_bytes / max(1, num_rows))
+    rows_per_file = max(row_group_rows, int(target_file_bytes / bytes_per_row))
+    dictionary_columns = [name for name in DICTIONARY_COLUMNS if name in dataset.schema.names]
+
+    staging = partition.with_name(f".{partition.name}.compact-new")
+    backup = partition.with_name(f".{partition.name}.compact-old")
+    staging.mkdir()
+    writer = None
+    file_rows = files_written = 0
+    for row_group in _row_groups(
+        _sorted_tables(dataset, sort_run_rows, staging / ".runs"), row_group_rows
+    ):
+        if writer is None or file_rows >= rows_per_file:
+            if writer is not None:
+                writer.close()
+            writer = pq.ParquetWriter(
+                staging / f"{COMPACT_PREFIX}{files_written:05d}.parquet",
+                row_group.schema,
+                use_dictionary=dictionary_columns,
+                write_statistics=True,
+            )
+            file_rows = 0
+            files_written += 1
+        writer.write_table(row_group, row_group_size=row_group_rows)
+        file_rows += row_group.num_rows
+    if writer is None:
+        pq.write_table(dataset.schema.empty_table(), staging / f"{COMPACT_PREFIX}00000.parquet")
+    else:
+        writer.close()
+    shutil.rmtree(staging / ".runs", ignore_errors=True)
+
+    os.rename(partition, backup)
+    os.rename(staging, partition)
+    _move_extras(backup, partition)
+    shutil.rmtree(backup)
+    return True
+
+
+def _sorted_tables(dataset: ds.Dataset, run_rows: int, runs_dir: Path) -> Iterator[pa.Table]:
+    """The rows of ``dataset`` in ``SORT_COLUMN`` order, a table at a time.
+
+    Up to ``run_rows`` rows are sorted in memory. Larger inputs are cut into
+    sorted runs on disk and merged: each round emits every buffered row at
+    or below the smallest last buffered key of any run, which no unread row
+    can undercut, and refills the runs it drained.
+    """
+    batches = dataset.to_batches(batch_size=min(run_rows, DEFAULT_ROW_GROUP_ROWS))
+    if SORT_COLUMN not in dataset.schema.names:
+        yield from (pa.Table.from_batches([batch]) for batch in batches)
+        return
+
+    runs: list[Iterator[pa.Table]] = []
+    pending: list[pa.RecordBatch] = []
+    pending_rows = 0
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows >= run_rows:
+            runs_dir.mkdir(exist_ok=True)
+            path = runs_dir / f"run-{len(runs):05d}.parquet"
+            pq.write_table(
+                _sort(pa.Table.from_batches(pending, dataset.schema)),
+                path,
+                row_group_size=max(1, run_rows // MERGE_READ_FRACTION),
+            )
+            runs.append(_read_run(path))
+            pending, pending_rows = [], 0
+    runs.append(iter([_sort(pa.Table.from_batches(pending, dataset.schema))]))
+    if len(runs) == 1:
+        yield from runs[0]
+        return
+
+    buffers = [_next_rows(run) for run in runs]
+    while any(buffer is not None for buffer in buffers):
+        watermark = min(
+            _sort_key(buffer)[-1].as_py() for buffer in buffers if buffer is not None
+        )
+        emitted = []
+        for index, buffer in enumerate(buffers):
+            if buffer is None:
+                continue
+            split = pc.sum(pc.less_equal(_sort_key(buffer), watermark)).as_py() or 0
+            emitted.append(buffer.slice(0, split))
+            rest = buffer.slice(split)
+            buffers[index] = rest if rest.num_rows else _next_rows(runs[index])
+        yield _sort(pa.concat_tables(emitted))
+
+
+def _read_run(path: Path) -> Iterator[pa.Table]:
+    with pq.ParquetFile(path) as source:
+        for index in range(source.num_row_groups):
+            yield source.read_row_group(index)
+
+
+def _next_rows(run: Iterator[pa.Table]) -> pa.Table | None:
+    """The next non-empty table of ``run``, or ``None`` once it is exhausted."""
+    for table in run:
+        if table.num_rows:
+            return table
+    return None
+
+
+def _sort(table: pa.Table) -> pa.Table:
+    return table.sort_by([(SORT_COLUMN, "ascending", "at_start")])
+
+
+def _sort_key(table: pa.Table) -> pa.ChunkedArray:
+    # Nulls sort first, like the empty string they are compared as.
+    return pc.fill_null(table.column(SORT_COLUMN), "")
+
+
+def _row_groups(tables: Iterator[pa.Table], rows: int) -> Iterator[pa.Table]:
+    """Re-chunk ``tables`` into tables of exactly ``rows`` rows, bar the last."""
+    pending: list[pa.Table] = []
+    pending_rows = 0
+    for table in tables:
+        pending.append(table)
+        pending_rows += table.num_rows
+        if pending_rows < rows:
+            continue
+        merged = pa.concat_tables(pending)
+        offset = 0
+        while merged.num_rows - offset >= rows:
+            yield merged.slice(offset, rows)
+            offset += rows
+        pending = [merged.slice(offset)]
+        pending_rows = merged.num_rows - offset
+    if pending_rows:
+        yield pa.concat_tables(pending)
+
+
+def _time_scan(root: Path) -> float:
+    """Seconds to stream the ``created_at`` column of every file, batch by batch."""
+    started = time.perf_counter()
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+    columns = [SORT_COLUMN] if SORT_COLUMN in dataset.schema.names else []
+    for _ in dataset.to_batches(columns=columns):
+        pass
+    return time.perf_counter() - started
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+
+DEFAULT_BATCH_ROWS = 10_000
+DEFAULT_READAHEAD_BATCHES = 4
+DEFAULT_READAHEAD_FILES = 2
+
+FilterValue = str | Sequence[str] | None
+
+
+def open_dataset(input_dir: str | Path) -> ds.Dataset:
+    """Open a hive-partitioned Parquet dataset with string partition keys.
+
+    Discovery would otherwise infer ``year=2024/month=01`` as integers; the
+    ingest writes them as strings and filters compare them as such.
+    """
+    probe = ds.dataset(str(input_dir), format="parquet", partitioning="hive")
+    partition_schema = probe.partitioning.schema
+    if all(pa.types.is_string(field.type) for field in partition_schema):
+        return probe
+    partitioning = ds.partitioning(
+        pa.schema([(name, pa.string()) for name in partition_schema.names]), flavor="hive"
+    )
+    return ds.dataset(
+        probe.files,
+        format="parquet",
+        partitioning=partitioning,
+        partition_base_dir=str(input_dir),
+    )
+
+
+def iter_parquet_batches(
+    input_dir: str | Path,
+    columns: Sequence[str] | None = None,
+    max_rows: int | None = None,
+    platform: FilterValue = None,
+    record_type: FilterValue = None,
+    year: FilterValue = None,
+    month: FilterValue = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+    batch_size: int = DEFAULT_BATCH_ROWS,
+    readahead_batches: int = DEFAULT_READAHEAD_BATCHES,
+    readahead_files: int = DEFAULT_READAHEAD_FILES,
+    skip_rows: int = 0,
+) -> Iterator[pa.RecordBatch]:
+    """Yield record batches of ``input_dir`` in a stable order.
+
+    Only ``columns`` are read. ``platform``/``record_type``/``year``/``month``
+    take one value or a list and prune whole partition directories;
+    ``created_from`` (inclusive) and ``created_to`` (exclusive) compare ISO
+    prefixes such as ``"2024-03"`` against ``created_at`` and also prune
+    ``year``/``month`` partitions. At most about ``readahead_batches *
+    readahead_files`` batches are decoded ahead of the consumer.
+
+    ``skip_rows`` resumes a scan after that many matching rows: files it
+    covers entirely are dropped using their row counts and are never read.
+    ``max_rows`` still counts from the start of the scan.
+    """
+    dataset = open_dataset(input_dir)
+    if columns is not None:
+        missing = [name for name in columns if name not in dataset.schema.names]
+        if missing:
+            raise ValueError(f"Columns not in dataset: {missing}")
+    expression = dataset_filter(
+        dataset.schema,
+        platform=platform,
+        record_type=record_type,
+        year=year,
+        month=month,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    remaining = max_rows
+    if skip_rows:
+        if remaining is not None:
+            remaining -= skip_rows
+        dataset, skip_rows = _skip_fragments(dataset, expression, skip_rows)
+    scanner = dataset.scanner(
+        columns=list(columns) if columns is not None else None,
+        filter=expression,
+        batch_size=batch_size,
+        batch_readahead=readahead_batches,
+        fragment_readahead=readahead_files,
+    )
+    for batch in scanner.to_batches():
+        if skip_rows:
+            if batch.num_rows <= skip_rows:
+                skip_rows -= batch.num_rows
+                continue
+            batch = batch.slice(skip_rows)
+            skip_rows = 0
+        if remaining is not None:
+            if remaining <= 0:
+                break
+            batch = batch.slice(0, remaining)
+            remaining -= batch.num_rows
+        if batch.num_rows:
+            yield batch
+
+
+def iter_parquet_records(
+    input_dir: str | Path,
+    max_rows: int | None = None,
+    columns: Sequence[str] | None = None,
+    **filters: Any,
+) -> Iterator[dict[str, Any]]:
+    """Yield rows of ``input_dir`` as dicts; accepts ``iter_parquet_batches`` options."""
+    for batch in iter_parquet_batches(input_dir, columns=columns, max_rows=max_rows, **filters):
+        yield from batch.to_pylist()
+
+
+def dataset_filter(
+    schema: pa.Schema,
+    platform: FilterValue = None,
+    record_type: FilterValue = None,
+    year: FilterValue = None,
+    month: FilterValue = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+) -> ds.Expression | None:
+    """Build the scan filter for the options of ``iter_parquet_batches``."""
+    values = {"platform": platform, "record_type": record_type, "year": year, "month": month}
+    terms: list[ds.Expression] = []
+    for name, value in values.items():
+        if value is None:
+            continue
+        options = [value] if isinstance(value, str) else list(value)
+        terms.append(_key_field(schema, name).isin(options))
+
+    has_month = "year" in schema.names and "month" in schema.names
+    if created_from is not None:
+        terms.append(ds.field("created_at") >= created_from)
+        if has_month:
+            year, month = created_from[:4], created_from[5:7]
+            terms.append(
+                (ds.field("year") > year)
+                | ((ds.field("year") == year) & (ds.field("month") >= month))
+            )
+    if created_to is not None:
+        terms.append(ds.field("created_at") < created_to)
+        if has_month:
+            year, month = created_to[:4], created_to[5:7]
+            terms.append(
+                (ds.field("year") < year)
+                | ((ds.field("year") == year) & (ds.field("month") <= month))
+            )
+
+    if not terms:
+        return None
+    expression = terms[0]
+    for term in terms[1:]:
+        expression = expression & term
+    return expression
+
+
+def _skip_fragments(
+    dataset: ds.Dataset, expression: ds.Expression | None, skip_rows: int
+) -> tuple[ds.Dataset, int]:
+    """Drop the leading files holding ``skip_rows`` rows; return the rows left to skip."""
+    fragments = list(dataset.get_fragments(filter=expression))
+    start = 0
+    while start < len(fragments):
+        scanner = fragments[start].scanner(schema=dataset.schema, filter=expression, columns=[])
+        rows = scanner.count_rows()
+        if rows > skip_rows:
+            break
+        skip_rows -= rows
+        start += 1
+    remaining = ds.FileSystemDataset(
+        fragments[start:], dataset.schema, dataset.format, dataset.filesystem
+    )
+    return remaining, skip_rows
+
+
+def _key_field(schema: pa.Schema, name: str) -> ds.Expression:
+    if name in schema.names:
+        return ds.field(name)
+    # Datasets partitioned without year/month still carry created_at.
+    if name == "year":
+        return pc.utf8_slice_codeunits(ds.field("created_at"), 0, 4)
+    if name == "month":
+        return pc.utf8_slice_codeunits(ds.field("created_at"), 5, 7)
+    raise ValueError(f"Cannot filter on {name!r}: not in dataset")
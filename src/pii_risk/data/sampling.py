@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from pii_risk.data.loader import (
+    DEFAULT_BATCH_ROWS,
+    dataset_filter,
+    iter_parquet_batches,
+    open_dataset,
+)
+
+
+SAMPLE_MODES = ("head", "fragment", "row-group", "reservoir", "stratified")
+STRATA_KEYS = ("platform", "community", "month")
+DEFAULT_STRATA = ("platform",)
+_STRATUM_SEPARATOR = "\x1f"
+
+
+def iter_sample_batches(
+    input_dir: str | Path,
+    sample_rows: int | None,
+    mode: str = "head",
+    seed: int = 0,
+    columns: Sequence[str] | None = None,
+    strata: Sequence[str] = DEFAULT_STRATA,
+    batch_size: int = DEFAULT_BATCH_ROWS,
+    skip_rows: int = 0,
+    **filters: Any,
+) -> Iterator[pa.RecordBatch]:
+    """Yield a seeded sample of ``sample_rows`` rows of ``input_dir``.
+
+    ``head`` takes the first rows in scan order. ``fragment`` and
+    ``row-group`` read whole files or row groups in a seeded random order
+    until enough rows are collected; partition and statistics pruning come
+    from Parquet metadata and unpicked units are never read. ``reservoir``
+    scans everything but keeps an exact uniform sample in memory bounded by
+    ``sample_rows``. ``stratified`` does the same per stratum of ``strata``
+    (``platform``, ``community`` and/or ``month``), splitting the sample as
+    evenly as the strata sizes allow. The same seed always gives the same
+    sample; without ``sample_rows`` the whole dataset is returned, and with
+    ``sample_rows=0`` nothing is.
+    ``skip_rows`` resumes the same sample after its first rows.
+    """
+    if mode not in SAMPLE_MODES:
+        raise ValueError(f"Unknown sample mode {mode!r}; use one of {SAMPLE_MODES}")
+    if sample_rows is not None and sample_rows < 0:
+        raise ValueError("sample_rows must not be negative")
+    if sample_rows == 0:
+        return
+    if mode == "head" or sample_rows is None:
+        yield from iter_parquet_batches(
+            input_dir,
+            columns=columns,
+            max_rows=sample_rows,
+            batch_size=batch_size,
+            skip_rows=skip_rows,
+            **filters,
+        )
+        return
+    if skip_rows:
+        # Sampled units are only known after drawing them; redraw and drop.
+        for batch in iter_sample_batches(
+            input_dir, sample_rows, mode, seed, columns, strata, batch_size, **filters
+        ):
+            if batch.num_rows <= skip_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.slice(skip_rows)
+            skip_rows = 0
+        return
+
+    dataset = open_dataset(input_dir)
+    if columns is not None:
+        missing = [name for name in columns if name not in dataset.schema.names]
+        if missing:
+            raise ValueError(f"Columns not in dataset: {missing}")
+    expression = dataset_filter(dataset.schema, **filters)
+    rng = np.random.default_rng(seed)
+
+    if mode in ("fragment", "row-group"):
+        yield from _sample_units(
+            dataset, expression, columns, sample_rows, rng, mode == "row-group", batch_size
+        )
+        return
+    if mode == "reservoir":
+        scanner = dataset.scanner(columns=columns, filter=expression, batch_size=batch_size)
+        sample = _bottom_k(scanner.to_batches(), sample_rows, rng)
+    else:
+        sample = _stratified_sample(dataset, expression, columns, strata, sample_rows, rng)
+    yield from sample.to_batches(max_chunksize=batch_size)
+
+
+def iter_sample_records(
+    input_dir: str | Path,
+    sample_rows: int | None,
+    mode: str = "head",
+    seed: int = 0,
+    columns: Sequence[str] | None = None,
+    strata: Sequence[str] = DEFAULT_STRATA,
+    **filters: Any,
+) -> Iterator[dict[str, Any]]:
+    for batch in iter_sample_batches(
+        input_dir, sample_rows, mode, seed, columns, strata, **filters
+    ):
+        yield from batch.to_pylist()
+
+
+def _sample_units(
+    dataset: ds.Dataset,
+    expression: ds.Expression | None,
+    columns: Sequence[str] | None,
+    sample_rows: int,
+    rng: np.random.Generator,
+    row_groups: bool,
+    batch_size: int,
+) -> Iterator[pa.RecordBatch]:
+    units = sorted(dataset.get_fragments(filter=expression), key=lambda fragment: fragment.path)
+    if row_groups:
+        units = [
+            row_group
+            for fragment in units
+            for row_group in fragment.split_by_row_group(filter=expression, schema=dataset.schema)
+        ]
+    remaining = sample_rows
+    for index in rng.permutation(len(units)):
+        table = units[index].to_table(schema=dataset.schema, columns=columns, filter=expression)
+        table = table.slice(0, remaining)
+        remaining -= table.num_rows
+        yield from table.to_batches(max_chunksize=batch_size)
+        if remaining <= 0:
+            break
+
+
+def _bottom_k(
+    batches: Iterator[pa.RecordBatch], sample_rows: int, rng: np.random.Generator
+) -> pa.Table:
+    """Keep the rows with the ``sample_rows`` smallest random keys, in scan order."""
+    kept: pa.Table | None = None
+    kept_keys = np.empty(0)
+    kept_positions = np.empty(0, dtype=np.int64)
+    position = 0
+    for batch in batches:
+        keys = rng.random(batch.num_rows)
+        positions = np.arange(position, position + batch.num_rows)
+        position += batch.num_rows
+        if len(kept_keys) >= sample_rows:
+            candidates = keys < kept_keys.max()
+            if not candidates.any():
+                continue
+            batch = batch.filter(pa.array(candidates))
+            keys, positions = keys[candidates], positions[candidates]
+        table = pa.Table.from_batches([batch])
+        kept = table if kept is None else pa.concat_tables([kept, table])
+        kept_keys = np.concatenate([kept_keys, keys])
+        kept_positions = np.concatenate([kept_positions, positions])
+        if len(kept_keys) > sample_rows:
+            chosen = np.sort(np.argpartition(kept_keys, sample_rows - 1)[:sample_rows])
+            kept = kept.take(chosen)
+            kept_keys, kept_positions = kept_keys[chosen], kept_positions[chosen]
+    if kept is None:
+        return pa.table({})
+    return kept.take(np.argsort(kept_positions, kind="stable"))
+
+
+def _stratified_sample(
+    dataset: ds.Dataset,
+    expression: ds.Expression | None,
+    columns: Sequence[str] | None,
+    strata: Sequence[str],
+    sample_rows: int,
+    rng: np.random.Generator,
+) -> pa.Table:
+    unknown = [name for name in strata if name not in STRATA_KEYS]
+    if unknown or not strata:
+        raise ValueError(f"Strata must be chosen from {STRATA_KEYS}, got {list(strata)}")
+    sources = [
+        name for name in ("platform", "community", "created_at")
+        if name in dataset.schema.names
+        and (name in strata or (name == "created_at" and "month" in strata))
+    ]
+
+    counts: Counter[str] = Counter()
+    for batch in dataset.scanner(columns=sources, filter=expression).to_batches():
+        labels = _stratum_labels(batch, strata)
+        for value in pc.value_counts(labels).to_pylist():
+            counts[value["values"]] += value["counts"]
+    quotas = _balanced_quotas(counts, sample_rows)
+    names = sorted(quotas)
+    quota_array = np.array([quotas[name] for name in names])
+    value_set = pa.array(names, pa.string())
+
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys([*columns, *sources]))
+    kept: pa.Table | None = None
+    kept_keys = np.empty(0)
+    kept_codes = np.empty(0, dtype=np.int64)
+    kept_positions = np.empty(0, dtype=np.int64)
+    position = 0
+    for batch in dataset.scanner(columns=read_columns, filter=expression).to_batches():
+        keys = rng.random(batch.num_rows)
+        positions = np.arange(position, position + batch.num_rows)
+        position += batch.num_rows
+        codes = pc.index_in(_stratum_labels(batch, strata), value_set=value_set)
+        codes = codes.to_numpy(zero_copy_only=False).astype(np.int64)
+        candidates = keys < _stratum_thresholds(kept_keys, kept_codes, quota_array)[codes]
+        if not candidates.any():
+            continue
+        table = pa.Table.from_batches([batch.filter(pa.array(candidates))])
+        kept = table if kept is None else pa.concat_tables([kept, table])
+        kept_keys = np.concatenate([kept_keys, keys[candidates]])
+        kept_codes = np.concatenate([kept_codes, codes[candidates]])
+        kept_positions = np.concatenate([kept_positions, positions[candidates]])
+
+        order = np.lexsort((kept_keys, kept_codes))
+        sorted_codes = kept_codes[order]
+        group_starts = np.searchsorted(sorted_codes, sorted_codes, side="left")
+        ranks = np.arange(len(order)) - group_starts
+        chosen = np.sort(order[ranks < quota_array[sorted_codes]])
+        if len(chosen) < len(order):
+            kept = kept.take(chosen)
+            kept_keys, kept_codes = kept_keys[chosen], kept_codes[chosen]
+            kept_positions = kept_positions[chosen]
+
+    if kept is None:
+        return pa.table({})
+    kept = kept.take(np.argsort(kept_positions, kind="stable"))
+    return kept if columns is None else kept.select(list(columns))
+
+
+def _stratum_labels(batch: pa.RecordBatch, strata: Sequence[str]) -> pa.Array:
+    parts = []
+    for name in strata:
+        if name == "month":
+            values = pc.utf8_slice_codeunits(batch.column("created_at"), 0, 7)
+        elif name in batch.schema.names:
+            values = batch.column(name)
+        else:
+            values = pa.nulls(batch.num_rows, pa.string())
+        parts.append(pc.fill_null(values.cast(pa.string()), ""))
+    if len(parts) == 1:
+        return parts[0]
+    return pc.binary_join_element_wise(*parts, _STRATUM_SEPARATOR)
+
+
+def _stratum_thresholds(
+    kept_keys: np.ndarray, kept_codes: np.ndarray, quota_array: np.ndarray
+) -> np.ndarray:
+    """Largest kept key of each full stratum; infinity where a stratum has room."""
+    thresholds = np.full(len(quota_array), np.inf)
+    thresholds[quota_array == 0] = -np.inf
+    if len(kept_keys) == 0:
+        return thresholds
+    filled = np.bincount(kept_codes, minlength=len(quota_array))
+    largest = np.full(len(quota_array), -np.inf)
+    np.maximum.at(largest, kept_codes, kept_keys)
+    full = filled >= quota_array
+    thresholds[full] = largest[full]
+    return thresholds
+
+
+def _balanced_quotas(counts: Counter[str], sample_rows: int) -> dict[str, int]:
+    """Split ``sample_rows`` evenly across strata, giving spare room to larger ones."""
+    quotas = {name: 0 for name in counts}
+    remaining = dict(counts)
+    budget = min(sample_rows, sum(counts.values()))
+    while remaining and budget > 0:
+        share = budget // len(remaining)
+        small = {name: count for name, count in remaining.items() if count <= share}
+        if not small:
+            extra = budget - share * len(remaining)
+            for index, name in enumerate(sorted(remaining)):
+                quotas[name] = share + (1 if index < extra else 0)
+            break
+        for name, count in small.items():
+            quotas[name] = count
+            budget -= count
+            del remaining[name]
+    return quotas
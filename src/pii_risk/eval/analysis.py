@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pii_risk.labels.weak import weak_label_from_spans
+from pii_risk.ml.features import build_numeric_features
+from pii_risk.pii.detector import detect_pii_spans, redact_text
+
+
+@dataclass
+class BatchAnalysis:
+    """Rule-based results for a batch of texts, one entry per text."""
+
+    rule_scores: list[int]
+    y_risk: list[int]
+    pii_types: list[list[str]]
+    redacted: list[str]
+    numeric: np.ndarray
+
+
+def analyze_texts(texts: list[str]) -> BatchAnalysis:
+    """Detect PII once per text and derive the label, features and redaction."""
+    spans = [detect_pii_spans(text) for text in texts]
+    labels = [weak_label_from_spans(found) for found in spans]
+    return BatchAnalysis(
+        rule_scores=[int(label["rule_score"]) for label in labels],
+        y_risk=[int(label["y_risk"]) for label in labels],
+        pii_types=[[str(pii) for pii in label["pii_types"]] for label in labels],
+        redacted=[redact_text(text, found) for text, found in zip(texts, spans)],
+        numeric=build_numeric_features(texts, spans),
+    )
+
+
+def batch_texts(batch: pa.RecordBatch, column: str = "text") -> list[str]:
+    return pc.fill_null(batch.column(column), "").to_pylist()
+
+
+def iter_analyzed_batches(
+    batches: Iterable[pa.RecordBatch], workers: int = 1
+) -> Iterator[tuple[pa.RecordBatch, list[str], BatchAnalysis]]:
+    """Yield ``(batch, texts, analysis)`` in input order.
+
+    With several ``workers``, batches are analyzed in a process pool while
+    the caller keeps reading and consuming; at most ``workers + 1`` batches
+    are in flight, which bounds memory.
+    """
+    if workers <= 1:
+        for batch in batches:
+            texts = batch_texts(batch)
+            yield batch, texts, analyze_texts(texts)
+        return
+
+    pending: deque[tuple[pa.RecordBatch, list[str], Future[BatchAnalysis]]] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in batches:
+            texts = batch_texts(batch)
+            pending.append((batch, texts, executor.submit(analyze_texts, texts)))
+            if len(pending) > workers:
+                done_batch, done_texts, future = pending.popleft()
+                yield done_batch, done_texts, future.result()
+        while pending:
+            done_batch, done_texts, future = pending.popleft()
+            yield done_batch, done_texts, future.result()
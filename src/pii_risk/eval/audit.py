@@ -1,18 +1,25 @@
 from __future__ import annotations
 
-import csv
+import json
 import random
+import time
 from pathlib import Path
 
 import numpy as np
+import pyarrow as pa
 
-from pii_risk.data.loader import iter_parquet_records
-from pii_risk.labels.weak import weak_label_from_rules
-from pii_risk.ml.predict import predict_risk
-from pii_risk.pii.detector import detect_pii_spans, redact_text
+from pii_risk.data.sampling import DEFAULT_STRATA, iter_sample_batches
+from pii_risk.eval.analysis import BatchAnalysis, iter_analyzed_batches
+from pii_risk.eval.checkpoint import DEFAULT_CHECKPOINT_SECONDS, AuditCheckpoint, checkpoint_path
+from pii_risk.eval.summary import BUCKET_LABELS, DEFAULT_TOP_K, AuditSummary
+from pii_risk.eval.sweep import ThresholdSweep
+from pii_risk.eval.writers import AUDIT_SCHEMA, AuditWriter, output_format
+from pii_risk.ml.predict import predict_risk_batch
 
 
-BUCKET_LABELS = ("TP", "FP", "TN", "FN")
+AUDIT_COLUMNS = ("record_id", "created_at", "text", "community")
+DEFAULT_AUDIT_BATCH_ROWS = 2_000
+DEFAULT_THRESHOLD = 0.5
 
 
 def bucket(pred: int, y: int) -> str:
@@ -25,6 +32,38 @@ def bucket(pred: int, y: int) -> str:
     return "FN"
 
 
+def audit_table(
+    batch: pa.RecordBatch,
+    texts: list[str],
+    analysis: BatchAnalysis,
+    p_risk: np.ndarray,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> pa.Table:
+    """Assemble the ``AUDIT_SCHEMA`` rows of one scored batch."""
+    pred = (p_risk >= threshold).astype(np.int8)
+    y = np.asarray(analysis.y_risk, dtype=np.int8)
+    # Index into BUCKET_LABELS, matching bucket(pred, y).
+    codes = np.where(pred == 1, np.where(y == 1, 0, 1), np.where(y == 0, 2, 3))
+    return pa.table(
+        {
+            "record_id": batch.column("record_id"),
+            "created_at": batch.column("created_at"),
+            "bucket": pa.DictionaryArray.from_arrays(
+                pa.array(codes, pa.int8()), pa.array(BUCKET_LABELS)
+            ),
+            "y_risk": pa.array(y),
+            "pred_risk": pa.array(pred),
+            "p_risk": pa.array(p_risk, pa.float64()),
+            "rule_score": pa.array(analysis.rule_scores, pa.int16()),
+            "pii_types": pa.array(analysis.pii_types, pa.list_(pa.string())),
+            "text": pa.array(texts, pa.string()),
+            "redacted_text": pa.array(analysis.redacted, pa.string()),
+            "community": batch.column("community"),
+        },
+        schema=AUDIT_SCHEMA,
+    )
+
+
 def _normalize_models_dir(model_path: str) -> Path:
     path = Path(model_path)
     if path.is_file():
@@ -38,81 +77,166 @@ def audit_records(
     out_path: str,
     max_rows: int | None = None,
     seed: int = 0,
+    sample_mode: str = "head",
+    strata: tuple[str, ...] = DEFAULT_STRATA,
+    batch_size: int = DEFAULT_AUDIT_BATCH_ROWS,
+    workers: int = 1,
+    file_format: str | None = None,
+    partition_by: tuple[str, ...] = (),
+    include_text: bool = True,
+    include_redacted: bool = True,
+    summary_only: bool = False,
+    top_k: int = DEFAULT_TOP_K,
+    threshold: float = DEFAULT_THRESHOLD,
+    thresholds: list[float] | None = None,
+    sweep_path: str | None = None,
+    checkpoint_seconds: float | None = None,
+    resume: bool = False,
 ) -> dict:
+    """Audit a dataset batch by batch and export one row per record.
+
+    Rule analysis (detection, weak labels, features, redaction) runs in
+    ``workers`` processes while the next batch is read; the model scores
+    each batch in one call. Rows are written in input order, as CSV,
+    Parquet or Arrow IPC (``file_format``, inferred from ``out_path`` by
+    default), optionally partitioned and without the text columns. With
+    ``summary_only``, no rows are written and ``out_path`` receives the
+    ``AuditSummary`` as JSON instead.
+
+    Buckets use ``p_risk >= threshold``. Confusion counts for every value in
+    ``thresholds`` are gathered in the same pass and returned (and written
+    to ``sweep_path``, if given) as a precision/recall curve.
+
+    With ``checkpoint_seconds``, progress is saved about that often to
+    ``<out_path>.checkpoint.json``; ``resume`` continues from it with the
+    same options and produces the same output as an uninterrupted run.
+    """
+    if not 0.0 <= threshold <= 1.0:
+        raise ValueError(f"Threshold must be within [0, 1], got {threshold}")
     random.seed(seed)
     np.random.seed(seed)
+    started = time.perf_counter()
 
     models_dir = _normalize_models_dir(model_path)
-    output_path = Path(out_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
-    bucket_counts = {label: 0 for label in BUCKET_LABELS}
-    total_rows = 0
-    p_risk_values: list[float] = []
-
-    fieldnames = [
-        "record_id",
-        "created_at",
-        "bucket",
-        "y_risk",
-        "pred_risk",
-        "p_risk",
-        "rule_score",
-        "pii_types",
-        "text",
-        "redacted_text",
-        "community",
+    columns = [
+        name
+        for name in AUDIT_SCHEMA.names
+        if not (name == "text" and not include_text)
+        and not (name == "redacted_text" and not include_redacted)
     ]
-
-    with output_path.open("w", encoding="utf-8", newline="") as handle:
-        writer = csv.DictWriter(handle, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for record in iter_parquet_records(input_dir, max_rows=max_rows):
-            text = record.get("text", "")
-            label = weak_label_from_rules(text)
-            ml_result = predict_risk(text, models_dir=models_dir)
-            p_risk = float(ml_result["p_risk"])
-            pred = 1 if p_risk >= 0.5 else 0
-            y = int(label["y_risk"])
-            bucket_str = bucket(pred, y)
-            spans = detect_pii_spans(text)
-            redacted = redact_text(text, spans)
-
-            pii_types = label.get("pii_types", [])
-            pii_str = "|".join(sorted({str(pii) for pii in pii_types}))
-
-            community = record.get("community") or ""
-
-            writer.writerow(
-                {
-                    "record_id": record.get("record_id", ""),
-                    "created_at": record.get("created_at", ""),
-                    "bucket": bucket_str,
-                    "y_risk": y,
-                    "pred_risk": pred,
-                    "p_risk": p_risk,
-                    "rule_score": int(label["rule_score"]),
-                    "pii_types": pii_str,
-                    "text": text,
-                    "redacted_text": redacted,
-                    "community": community,
-                }
-            )
-
-            bucket_counts[bucket_str] += 1
-            total_rows += 1
-            p_risk_values.append(p_risk)
-
-    mean_p_risk = float(np.mean(p_risk_values)) if p_risk_values else 0.0
-
-    print(f"total_rows: {total_rows}")
+    file_format = None if summary_only else output_format(out_path, file_format)
+
+    checkpoint = None
+    state: dict | None = None
+    if checkpoint_seconds is not None or resume:
+        if checkpoint_seconds is None:
+            checkpoint_seconds = DEFAULT_CHECKPOINT_SECONDS
+        options = {
+            "input_dir": str(Path(input_dir).resolve()),
+            "models_dir": str(models_dir.resolve()),
+            "max_rows": max_rows,
+            "seed": seed,
+            "sample_mode": sample_mode,
+            "strata": strata,
+            "batch_size": batch_size,
+            "file_format": file_format,
+            "partition_by": partition_by,
+            "columns": columns,
+            "summary_only": summary_only,
+            "top_k": top_k,
+            "threshold": threshold,
+            "thresholds": thresholds,
+        }
+        checkpoint = AuditCheckpoint(checkpoint_path(out_path), options)
+        if resume:
+            state = checkpoint.load()
+            print(f"resuming_from_row: {state['rows']}")
+
+    if state is not None:
+        summary = AuditSummary.from_state(state["summary"])
+        sweep = ThresholdSweep.from_state(state["sweep"]) if state["sweep"] else None
+    else:
+        summary = AuditSummary(top_k=top_k)
+        sweep = ThresholdSweep(thresholds) if thresholds else None
+    rows_done = state["rows"] if state is not None else 0
+    elapsed_before = state["elapsed"] if state is not None else 0.0
+
+    writer = None
+    if file_format is not None:
+        writer = AuditWriter(
+            out_path,
+            file_format,
+            columns,
+            partition_by,
+            resumable=checkpoint is not None,
+            resume_state=state["writer"] if state is not None else None,
+        )
+    completed = False
+    try:
+        batches = iter_sample_batches(
+            input_dir,
+            max_rows,
+            mode=sample_mode,
+            seed=seed,
+            columns=AUDIT_COLUMNS,
+            strata=strata,
+            batch_size=batch_size,
+            skip_rows=rows_done,
+        )
+        saved_at = time.perf_counter()
+        for batch, texts, analysis in iter_analyzed_batches(batches, workers):
+            p_risk = predict_risk_batch(texts, models_dir=models_dir, numeric=analysis.numeric)
+            table = audit_table(batch, texts, analysis, p_risk, threshold)
+            if writer is not None:
+                writer.write(table)
+            summary.update(table)
+            if sweep is not None:
+                sweep.update(p_risk, np.asarray(analysis.y_risk))
+            rows_done += batch.num_rows
+
+            now = time.perf_counter()
+            if checkpoint is not None and now - saved_at >= checkpoint_seconds:
+                writer_state = writer.checkpoint() if writer is not None else {}
+                if writer_state is not None:
+                    checkpoint.save(
+                        {
+                            "rows": rows_done,
+                            "elapsed": elapsed_before + now - started,
+                            "writer": writer_state,
+                            "summary": summary.state(),
+                            "sweep": sweep.state() if sweep is not None else None,
+                        }
+                    )
+                    saved_at = now
+        completed = True
+    finally:
+        if writer is not None:
+            writer.close(complete=completed)
+
+    elapsed = elapsed_before + time.perf_counter() - started
+    result = summary.to_dict()
+    result["threshold"] = threshold
+    if sweep is not None:
+        result["threshold_curve"] = sweep.to_records()
+        if sweep_path is not None:
+            sweep.write(sweep_path)
+    if summary_only:
+        output_path = Path(out_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with output_path.open("w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+
+    print(f"total_rows: {summary.count}")
     for label in BUCKET_LABELS:
-        print(f"{label}: {bucket_counts[label]}")
-    print(f"mean_p_risk: {mean_p_risk:.4f}")
-
-    return {
-        "total_rows": total_rows,
-        "bucket_counts": bucket_counts,
-        "mean_p_risk": mean_p_risk,
-    }
+        print(f"{label}: {result['bucket_counts'][label]}")
+    print(f"mean_p_risk: {summary.mean:.4f}")
+    print(f"std_p_risk: {result['p_risk']['std']:.4f}")
+    if sweep is not None:
+        best = max(result["threshold_curve"], key=lambda row: (row["f1"], -row["threshold"]))
+        print(f"best_f1_threshold: {best['threshold']:.3f} f1: {best['f1']:.4f}")
+    print(f"rows_per_sec: {summary.count / elapsed if elapsed > 0 else 0.0:.1f}")
+
+    if checkpoint is not None:
+        checkpoint.remove()
+    result["mean_p_risk"] = summary.mean
+    return result
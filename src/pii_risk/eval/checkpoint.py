@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+CHECKPOINT_VERSION = 1
+DEFAULT_CHECKPOINT_SECONDS = 300.0
+
+
+def checkpoint_path(out_path: str | Path) -> Path:
+    """Checkpoint file of an audit writing to ``out_path`` (a file or directory)."""
+    path = Path(out_path)
+    return path.with_name(path.name + CHECKPOINT_SUFFIX)
+
+
+class AuditCheckpoint:
+    """Progress of an audit run, saved atomically next to its output.
+
+    Records the options the run was started with, how many sampled rows
+    have been audited, the writer's resume state and the running summary
+    and threshold sweep, so a resumed run continues exactly where the last
+    checkpoint left off. Resuming with different options is refused because
+    the sample or the output would no longer match.
+    """
+
+    def __init__(self, path: Path, options: dict[str, Any]) -> None:
+        self.path = path
+        # Round-trip so tuples compare equal to the lists read back from disk.
+        self.options = json.loads(json.dumps(options))
+
+    def load(self) -> dict[str, Any]:
+        if not self.path.exists():
+            raise ValueError(f"No audit checkpoint at {self.path}; nothing to resume")
+        with self.path.open("r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported audit checkpoint version in {self.path}")
+        changed = sorted(
+            name
+            for name in set(self.options) | set(data["options"])
+            if self.options.get(name) != data["options"].get(name)
+        )
+        if changed:
+            raise ValueError(f"Cannot resume: options differ from the checkpoint: {changed}")
+        return data["state"]
+
+    def save(self, state: dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        data = {"version": CHECKPOINT_VERSION, "options": self.options, "state": state}
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(data, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
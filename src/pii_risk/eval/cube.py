@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from pii_risk.data.loader import DEFAULT_BATCH_ROWS, open_dataset
+from pii_risk.ml.score_manifest import ScoreManifest, partition_dirs
+
+
+CUBE_MANIFEST_NAME = "_cube_manifest.json"
+CUBE_FILE_NAME = "cube.parquet"
+ALL_PII_TYPES = "*"
+SCORE_BUCKET_EDGES = (25, 50, 75)
+SCORE_BUCKETS = ("0-24", "25-49", "50-74", "75-100")
+CUBE_INPUT_COLUMNS = ("community", "final_score", "p_risk", "pii_types")
+CELL_KEYS = ("community", "score_bucket", "pii_type")
+PARTITION_KEYS = ("platform", "record_type", "year", "month")
+DIMENSIONS = (*PARTITION_KEYS, *CELL_KEYS)
+MEASURES = (
+    ("records", "sum"),
+    ("pii_records", "sum"),
+    ("final_score_sum", "sum"),
+    ("final_score_max", "max"),
+    ("p_risk_sum", "sum"),
+)
+CUBE_SCHEMA = pa.schema(
+    [
+        ("community", pa.string()),
+        ("score_bucket", pa.string()),
+        ("pii_type", pa.string()),
+        ("records", pa.int64()),
+        ("pii_records", pa.int64()),
+        ("final_score_sum", pa.int64()),
+        ("final_score_max", pa.int64()),
+        ("p_risk_sum", pa.float64()),
+    ]
+)
+MERGE_PARTIALS = 64
+
+
+def cube_config_fingerprint() -> str:
+    config = {"edges": SCORE_BUCKET_EDGES, "buckets": SCORE_BUCKETS, "all": ALL_PII_TYPES}
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CubeManifest(ScoreManifest):
+    """Which scored input files each cube slice was built from."""
+
+    name = CUBE_MANIFEST_NAME
+
+    def outputs(self, partition: str, entry: dict[str, Any]) -> list[Path]:
+        return [self.output_dir / partition / CUBE_FILE_NAME]
+
+
+def update_cube(
+    scored_dir: str,
+    cube_dir: str,
+    force: bool = False,
+    batch_size: int = DEFAULT_BATCH_ROWS,
+) -> dict:
+    """Bring the rollup cube of a scored dataset up to date.
+
+    The cube holds, per ``platform``/``record_type``/``year``/``month``
+    partition of ``scored_dir``, one small Parquet slice of counts and sums
+    keyed by ``community``, ``score_bucket`` (``final_score`` bands) and
+    ``pii_type``. Rows with ``pii_type`` ``"*"`` count every record; the
+    others count records containing that PII type. Only slices whose scored
+    input files changed since the last update are rebuilt (all of them with
+    ``force``), and slices of vanished partitions are removed, so refreshing
+    after ``score-dataset`` costs a scan of the re-scored partitions only.
+    """
+    root = Path(scored_dir)
+    out_root = Path(cube_dir)
+    started = time.perf_counter()
+    manifest = CubeManifest.load(out_root)
+    config = cube_config_fingerprint()
+    partitions = partition_dirs(root)
+
+    built = rows = 0
+    for partition in partitions:
+        entry = {
+            "inputs": manifest.input_fingerprints(partition, root / partition),
+            "config": config,
+        }
+        if not force and not manifest.stale_reasons(partition, entry):
+            manifest.data["partitions"][partition]["inputs"] = entry["inputs"]
+            continue
+        files = [root / partition / name for name in entry["inputs"]]
+        cube = _partition_cube(files, batch_size)
+        out_dir = out_root / partition
+        out_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = out_dir / f".{CUBE_FILE_NAME}.tmp"
+        pq.write_table(cube, tmp_path)
+        os.replace(tmp_path, out_dir / CUBE_FILE_NAME)
+        partition_rows = int(pc.sum(_all_types(cube).column("records")).as_py() or 0)
+        manifest.data["partitions"][partition] = {**entry, "rows": partition_rows}
+        manifest.save()
+        built += 1
+        rows += partition_rows
+
+    removed = sorted(set(manifest.data["partitions"]) - set(partitions))
+    for partition in removed:
+        shutil.rmtree(out_root / partition, ignore_errors=True)
+        del manifest.data["partitions"][partition]
+    manifest.save()
+
+    elapsed = time.perf_counter() - started
+    print(f"partitions: {len(partitions)} rebuilt: {built} removed: {len(removed)}")
+    print(f"rows_scanned: {rows}")
+    print(f"rows_per_sec: {rows / elapsed if elapsed > 0 else 0.0:.1f}")
+    return {
+        "partitions": len(partitions),
+        "rebuilt_partitions": built,
+        "removed_partitions": len(removed),
+        "rows_scanned": rows,
+    }
+
+
+class RiskCube:
+    """An in-memory rollup cube answering dashboard queries without a scan.
+
+    ``open`` reads every slice of a cube directory; ``query`` then filters
+    and re-aggregates the cube cells, which are far fewer than the records
+    they summarize.
+    """
+
+    def __init__(self, table: pa.Table) -> None:
+        self.table = table
+
+    @classmethod
+    def open(cls, cube_dir: str | Path) -> RiskCube:
+        if not any(Path(cube_dir).rglob(CUBE_FILE_NAME)):
+            empty = pa.schema([(name, pa.string()) for name in PARTITION_KEYS])
+            return cls(pa.unify_schemas([CUBE_SCHEMA, empty]).empty_table())
+        return cls(open_dataset(cube_dir).to_table())
+
+    def query(
+        self,
+        by: Sequence[str] = (),
+        pii_type: str | None = None,
+        **filters: str | Sequence[str],
+    ) -> pa.Table:
+        """Measures per ``by`` group, over the cells matching ``filters``.
+
+        ``filters`` map dimensions (``platform``, ``community``, ``year``,
+        ``score_bucket``, ...) to one value or a list. Without ``pii_type``,
+        ``records`` counts every record and ``pii_records`` those with any
+        PII; with it (or with ``pii_type`` in ``by``), ``pii_records`` and
+        the score measures cover the records containing that type; with
+        ``pii_type``, groups holding none of it are kept with zero
+        ``pii_records`` and null means. Each group also gets
+        ``final_score_mean``, ``p_risk_mean`` and
+        ``pii_rate = pii_records / records``.
+        """
+        unknown = [name for name in [*by, *filters] if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {unknown}; expected {list(DIMENSIONS)}")
+        if "pii_type" in filters:
+            raise ValueError("Select a PII type with pii_type=, not as a filter")
+        table = self.table
+        for name, value in filters.items():
+            values = [value] if isinstance(value, str) else list(value)
+            table = table.filter(pc.is_in(table.column(name), pa.array(values, pa.string())))
+
+        by = list(by)
+        totals_by = [name for name in by if name != "pii_type"]
+        totals = _group(_all_types(table), totals_by)
+        typed_query = pii_type is not None or "pii_type" in by
+        if not typed_query:
+            result = totals
+        else:
+            typed = table.filter(pc.not_equal(table.column("pii_type"), ALL_PII_TYPES))
+            if pii_type is not None:
+                typed = typed.filter(pc.equal(typed.column("pii_type"), pii_type))
+            # Each typed group lies within one totals group, which supplies
+            # the number of records the rate is taken over. Arrow's join never
+            # matches null keys, and a null community is an ordinary group.
+            keys = [*totals_by, "_group"]
+            join_keys = [*keys, *(f"_{name}_is_null" for name in totals_by)]
+            typed_groups = _with_null_keys(_group(typed, by).drop_columns(["records"]), totals_by)
+            totals_groups = _with_null_keys(totals.select([*keys, "records"]), totals_by)
+            if pii_type is None:
+                result = typed_groups.join(totals_groups, keys=join_keys)
+            else:
+                # Groups without a record of the requested type still count,
+                # with no PII records.
+                result = totals_groups.join(typed_groups, keys=join_keys, join_type="left outer")
+                for name, _ in MEASURES[1:]:
+                    index = result.schema.get_field_index(name)
+                    result = result.set_column(index, name, pc.fill_null(result.column(name), 0))
+                if "pii_type" in by:
+                    result = result.set_column(
+                        result.schema.get_field_index("pii_type"),
+                        "pii_type",
+                        pc.fill_null(result.column("pii_type"), pii_type),
+                    )
+            result = _restore_null_keys(result, totals_by)
+
+        records = result.column("records").cast(pa.float64())
+        pii_records = result.column("pii_records").cast(pa.float64())
+        score_count = pii_records if typed_query else records
+        # Groups with nothing to average get a null mean rather than NaN.
+        score_count = pc.if_else(pc.equal(score_count, 0), None, score_count)
+        result = result.append_column(
+            "final_score_mean", pc.divide(result.column("final_score_sum"), score_count)
+        )
+        result = result.append_column(
+            "p_risk_mean", pc.divide(result.column("p_risk_sum"), score_count)
+        )
+        result = result.append_column("pii_rate", pc.divide(pii_records, records))
+        columns = [
+            *by,
+            "records",
+            "pii_records",
+            "pii_rate",
+            "final_score_mean",
+            "final_score_max",
+            "p_risk_mean",
+        ]
+        if by:
+            result = result.sort_by([(name, "ascending") for name in by])
+        return result.select(columns)
+
+
+def _partition_cube(files: list[Path], batch_size: int) -> pa.Table:
+    partials: list[pa.Table] = []
+    for path in files:
+        with pq.ParquetFile(path) as source:
+            for batch in source.iter_batches(batch_size=batch_size, columns=CUBE_INPUT_COLUMNS):
+                partials.append(_combine(_cells(batch)))
+                if len(partials) >= MERGE_PARTIALS:
+                    partials = [_combine(pa.concat_tables(partials))]
+    if not partials:
+        return CUBE_SCHEMA.empty_table()
+    return _combine(pa.concat_tables(partials))
+
+
+def _cells(batch: pa.RecordBatch) -> pa.Table:
+    """One cell row per record (``pii_type`` ``"*"``) and per PII type it contains."""
+    final_score = pc.fill_null(batch.column("final_score"), 0).cast(pa.int64())
+    p_risk = pc.fill_null(batch.column("p_risk"), 0.0).cast(pa.float64())
+    bucket = pa.DictionaryArray.from_arrays(
+        pa.array(np.searchsorted(SCORE_BUCKET_EDGES, final_score.to_numpy(), side="right")),
+        pa.array(SCORE_BUCKETS),
+    ).cast(pa.string())
+    community = batch.column("community").cast(pa.string())
+    pii_types = batch.column("pii_types")
+    has_pii = pc.greater(pc.fill_null(pc.list_value_length(pii_types), 0), 0)
+    totals = pa.table(
+        {
+            "community": community,
+            "score_bucket": bucket,
+            "pii_type": pa.repeat(ALL_PII_TYPES, batch.num_rows),
+            "records": pa.repeat(1, batch.num_rows),
+            "pii_records": has_pii.cast(pa.int64()),
+            "final_score_sum": final_score,
+            "final_score_max": final_score,
+            "p_risk_sum": p_risk,
+        }
+    )
+    parents = pc.list_parent_indices(pii_types)
+    typed = pa.table(
+        {
+            "community": community.take(parents),
+            "score_bucket": bucket.take(parents),
+            "pii_type": pc.list_flatten(pii_types).cast(pa.string()),
+            "records": pa.repeat(1, len(parents)),
+            "pii_records": pa.repeat(1, len(parents)),
+            "final_score_sum": final_score.take(parents),
+            "final_score_max": final_score.take(parents),
+            "p_risk_sum": p_risk.take(parents),
+        }
+    )
+    return pa.concat_tables([totals, typed])
+
+
+def _combine(table: pa.Table) -> pa.Table:
+    grouped = table.group_by(list(CELL_KEYS)).aggregate(list(MEASURES))
+    grouped = grouped.select(
+        list(CELL_KEYS) + [f"{name}_{function}" for name, function in MEASURES]
+    )
+    return grouped.rename_columns(CUBE_SCHEMA.names).cast(CUBE_SCHEMA)
+
+
+def _all_types(table: pa.Table) -> pa.Table:
+    return table.filter(pc.equal(table.column("pii_type"), ALL_PII_TYPES))
+
+
+def _group(table: pa.Table, by: list[str]) -> pa.Table:
+    # A constant key lets "no grouping" go through the same hash aggregation.
+    table = table.append_column("_group", pa.repeat(0, table.num_rows))
+    grouped = table.group_by([*by, "_group"]).aggregate(list(MEASURES))
+    keys = {*by, "_group"}
+    return grouped.rename_columns(
+        [name if name in keys else name.rsplit("_", 1)[0] for name in grouped.column_names]
+    )
+
+
+def _with_null_keys(table: pa.Table, names: list[str]) -> pa.Table:
+    """Replace nulls in ``names`` by ``""`` plus a flag column, so joins match them."""
+    for name in names:
+        column = table.column(name)
+        table = table.append_column(f"_{name}_is_null", pc.is_null(column))
+        table = table.set_column(table.schema.get_field_index(name), name, pc.fill_null(column, ""))
+    return table
+
+
+def _restore_null_keys(table: pa.Table, names: list[str]) -> pa.Table:
+    for name in names:
+        flag = table.column(f"_{name}_is_null")
+        column = pc.if_else(flag, pa.scalar(None, pa.string()), table.column(name))
+        table = table.set_column(table.schema.get_field_index(name), name, column)
+        table = table.drop_columns([f"_{name}_is_null"])
+    return table
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import shutil
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pandas.util import hash_array
+
+from pii_risk.data.loader import DEFAULT_BATCH_ROWS, iter_parquet_batches
+from pii_risk.pii.detector import PII_PATTERNS
+
+
+ROLLUP_KEYS = ("author_id_hash", "thread_id", "community")
+DEFAULT_HIGH_RISK_SCORE = 50
+DEFAULT_MAX_GROUPS = 1_000_000
+SPILL_BUCKET_BITS = 6
+SPILL_BUCKETS = 1 << SPILL_BUCKET_BITS
+SPILL_LEVELS = 64 // SPILL_BUCKET_BITS
+PLATFORM_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+PII_COUNT_COLUMNS = tuple(f"pii_{name.lower()}" for name in PII_PATTERNS)
+SUM_COLUMNS = (
+    "records",
+    "high_risk_records",
+    "pii_records",
+    "final_score_sum",
+    *PII_COUNT_COLUMNS,
+)
+INPUT_COLUMNS = ("platform", "created_at", "final_score", "pii_types")
+
+
+def aggregate_exposure(
+    input_dir: str,
+    output_dir: str,
+    keys: Sequence[str] = ROLLUP_KEYS,
+    high_risk_score: int = DEFAULT_HIGH_RISK_SCORE,
+    max_groups: int = DEFAULT_MAX_GROUPS,
+    batch_size: int = DEFAULT_BATCH_ROWS,
+    platform: str | None = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+) -> dict:
+    """Roll a scored dataset up per author, thread and community in one scan.
+
+    For each of ``keys`` (grouped together with ``platform``) the output has
+    the record count, records with ``final_score >= high_risk_score``,
+    records with any PII, one count per PII type, the sum, mean and max of
+    ``final_score`` and the first and last ``created_at``. Rows without a
+    key value are left out of that key's rollup. Results are written as
+    Parquet parts under ``output_dir/<key>/``, each sorted by high-risk
+    records.
+
+    Batches are hash-aggregated with Arrow and partial results are merged
+    as they accumulate. Once a key holds more than ``max_groups`` groups,
+    its partial results are spilled to disk in ``SPILL_BUCKETS`` hash
+    buckets, and each bucket is merged on its own at the end. A bucket
+    that still holds more than ``max_groups`` groups is split again on the
+    next bits of the hash, so memory stays within a small multiple of
+    ``max_groups`` however large the key space is.
+    """
+    unknown = [key for key in keys if key not in ROLLUP_KEYS]
+    if unknown or not keys:
+        raise ValueError(f"Rollup keys must be among {list(ROLLUP_KEYS)}, got {list(keys)}")
+    if max_groups <= 0:
+        raise ValueError("max_groups must be positive")
+    out_root = Path(output_dir)
+    started = time.perf_counter()
+    accumulators = {
+        key: _GroupAccumulator(key, out_root / f".spill-{key}", max_groups) for key in keys
+    }
+
+    rows = 0
+    batches = iter_parquet_batches(
+        input_dir,
+        columns=[*INPUT_COLUMNS, *keys],
+        platform=platform,
+        created_from=created_from,
+        created_to=created_to,
+        batch_size=batch_size,
+    )
+    for batch in batches:
+        table = _measures(pa.Table.from_batches([batch]), high_risk_score)
+        for key, accumulator in accumulators.items():
+            accumulator.add(table.filter(pc.is_valid(table.column(key))))
+        rows += batch.num_rows
+
+    groups = {key: accumulator.finish(out_root / key) for key, accumulator in accumulators.items()}
+    spilled = {key: accumulator.spilled for key, accumulator in accumulators.items()}
+    elapsed = time.perf_counter() - started
+    print(f"rows: {rows}")
+    for key in keys:
+        print(f"{key}: groups={groups[key]} spilled_rows={spilled[key]}")
+    print(f"rows_per_sec: {rows / elapsed if elapsed > 0 else 0.0:.1f}")
+    return {"rows": rows, "groups": groups, "spilled_rows": spilled}
+
+
+def _measures(table: pa.Table, high_risk_score: int) -> pa.Table:
+    """Per-record columns named after the aggregates they feed."""
+    final_score = pc.fill_null(table.column("final_score"), 0).cast(pa.int64())
+    pii_types = table.column("pii_types").combine_chunks()
+    flat = pc.list_flatten(pii_types)
+    parents = pc.list_parent_indices(pii_types).to_numpy()
+    columns = {
+        "records": pa.repeat(1, table.num_rows),
+        "high_risk_records": pc.greater_equal(final_score, high_risk_score).cast(pa.int64()),
+        "pii_records": pc.greater(
+            pc.fill_null(pc.list_value_length(pii_types), 0), 0
+        ).cast(pa.int64()),
+        "final_score_sum": final_score,
+        "final_score_max": final_score,
+        "first_created_at": table.column("created_at"),
+        "last_created_at": table.column("created_at"),
+    }
+    for name, column in zip(PII_PATTERNS, PII_COUNT_COLUMNS):
+        rows = parents[pc.fill_null(pc.equal(flat, name), False).to_numpy(zero_copy_only=False)]
+        counts = np.zeros(table.num_rows, dtype=np.int64)
+        counts[np.unique(rows)] = 1
+        columns[column] = pa.array(counts)
+    for name in table.column_names:
+        if name not in INPUT_COLUMNS:
+            columns[name] = table.column(name)
+    columns["platform"] = table.column("platform")
+    return pa.table(columns)
+
+
+def _combine(table: pa.Table, key: str) -> pa.Table:
+    """Group ``table`` by ``(platform, key)``; works on records and partials alike."""
+    aggregations = [(name, "sum") for name in SUM_COLUMNS]
+    aggregations += [
+        ("final_score_max", "max"),
+        ("first_created_at", "min"),
+        ("last_created_at", "max"),
+    ]
+    grouped = table.group_by(["platform", key]).aggregate(aggregations)
+    grouped = grouped.select(
+        [f"{name}_{function}" for name, function in aggregations] + ["platform", key]
+    )
+    return grouped.rename_columns([name for name, _ in aggregations] + ["platform", key])
+
+
+def _finalize(table: pa.Table, key: str) -> pa.Table:
+    mean = pc.divide(table.column("final_score_sum").cast(pa.float64()), table.column("records"))
+    table = table.append_column("final_score_mean", mean)
+    order = [
+        "platform",
+        key,
+        "records",
+        "high_risk_records",
+        "pii_records",
+        "final_score_sum",
+        "final_score_mean",
+        "final_score_max",
+        "first_created_at",
+        "last_created_at",
+        *PII_COUNT_COLUMNS,
+    ]
+    return table.select(order).sort_by(
+        [("high_risk_records", "descending"), ("records", "descending"), (key, "ascending")]
+    )
+
+
+class _GroupAccumulator:
+    """Partial aggregates for one key, spilled to hash buckets past ``max_groups``."""
+
+    def __init__(self, key: str, spill_dir: Path, max_groups: int) -> None:
+        self.key = key
+        self.spill_dir = spill_dir
+        self.max_groups = max_groups
+        self.spilled = 0
+        self._pending: list[pa.Table] = []
+        self._pending_rows = 0
+        self._spill_files = 0
+        shutil.rmtree(spill_dir, ignore_errors=True)  # left over by an interrupted run
+
+    def add(self, table: pa.Table) -> None:
+        if table.num_rows == 0:
+            return
+        partial = _combine(table, self.key)
+        self._pending.append(partial)
+        self._pending_rows += partial.num_rows
+        if self._pending_rows > self.max_groups:
+            merged = _combine(pa.concat_tables(self._pending), self.key)
+            self._pending = [merged]
+            self._pending_rows = merged.num_rows
+            # Merging must free at least half the budget, or the key space is
+            # too large to hold and the groups go to disk.
+            if merged.num_rows > self.max_groups // 2:
+                self._spill()
+
+    def finish(self, out_dir: Path) -> int:
+        """Write the final rollup parts to ``out_dir`` and return the group count."""
+        shutil.rmtree(out_dir, ignore_errors=True)
+        out_dir.mkdir(parents=True)
+        if not self.spilled:
+            if not self._pending:
+                return 0
+            result = _finalize(_combine(pa.concat_tables(self._pending), self.key), self.key)
+            pq.write_table(result, out_dir / "part-00000.parquet")
+            return result.num_rows
+
+        self._spill()
+        groups = 0
+        for bucket in sorted(self.spill_dir.iterdir()):
+            groups += self._merge_bucket(bucket, 0, out_dir, bucket.name[len("bucket-") :])
+        shutil.rmtree(self.spill_dir)
+        return groups
+
+    def _merge_bucket(self, directory: Path, level: int, out_dir: Path, name: str) -> int:
+        files = sorted(directory.glob("*.parquet"))
+        pending: list[pa.Table] = []
+        pending_rows = 0
+        for path in files:
+            table = pq.read_table(path, partitioning=None)
+            pending.append(table)
+            pending_rows += table.num_rows
+            if pending_rows > self.max_groups:
+                merged = _combine(pa.concat_tables(pending), self.key)
+                pending, pending_rows = [merged], merged.num_rows
+                if merged.num_rows > self.max_groups and level + 1 < SPILL_LEVELS:
+                    break
+        else:
+            if not pending:
+                return 0
+            result = _finalize(_combine(pa.concat_tables(pending), self.key), self.key)
+            pq.write_table(result, out_dir / f"part-{name}.parquet")
+            return result.num_rows
+
+        # Too many groups to merge at once: split the bucket on the next
+        # bits of the hash and merge each sub-bucket on its own.
+        del pending
+        for path in files:
+            table = pq.read_table(path, partitioning=None)
+            self._write_buckets(table, directory, level + 1, path.name)
+            path.unlink()
+        return sum(
+            self._merge_bucket(sub, level + 1, out_dir, f"{name}-{sub.name[len('bucket-') :]}")
+            for sub in sorted(directory.glob("bucket-*"))
+        )
+
+    def _spill(self) -> None:
+        if not self._pending:
+            return
+        table = pa.concat_tables(self._pending)
+        self._write_buckets(table, self.spill_dir, 0, f"spill-{self._spill_files:05d}.parquet")
+        self._spill_files += 1
+        self.spilled += table.num_rows
+        self._pending = []
+        self._pending_rows = 0
+
+    def _write_buckets(self, table: pa.Table, directory: Path, level: int, file_name: str) -> None:
+        shift = np.uint64(level * SPILL_BUCKET_BITS)
+        hashes = _key_hashes(table.column("platform"), table.column(self.key))
+        buckets = (hashes >> shift) & np.uint64(SPILL_BUCKETS - 1)
+        for bucket in np.unique(buckets):
+            bucket_dir = directory / f"bucket-{bucket:05d}"
+            bucket_dir.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table.filter(pa.array(buckets == bucket)), bucket_dir / file_name)
+
+
+def _key_hashes(platform: pa.ChunkedArray, key: pa.ChunkedArray) -> np.ndarray:
+    """64-bit hashes of ``(platform, key)`` pairs, vectorized over rows.
+
+    pandas' SipHash is keyed with a constant, so unlike Python's ``hash``
+    every partial of a group gets the same hash in any process, and its
+    bits are mixed well enough to take each level's bucket from the next
+    ``SPILL_BUCKET_BITS`` of them.
+    """
+    key_hashes = hash_array(key.to_numpy(zero_copy_only=False), categorize=False)
+    return key_hashes ^ (hash_array(platform.to_numpy(zero_copy_only=False)) * PLATFORM_MULTIPLIER)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+BUCKET_LABELS = ("TP", "FP", "TN", "FN")
+HISTOGRAM_BINS = 100
+QUANTILES = (0.5, 0.9, 0.99)
+DEFAULT_TOP_K = 20
+MAX_COMMUNITIES = 10_000
+OTHER_COMMUNITY = "__other__"
+REVIEW_COLUMNS = ("record_id", "created_at", "community", "p_risk", "rule_score", "pii_types")
+
+
+class AuditSummary:
+    """Constant-memory statistics over scored audit batches.
+
+    Tracks the p_risk mean/variance (Chan's parallel update of Welford's
+    algorithm), a fixed-bin histogram over [0, 1] from which quantiles are
+    interpolated, bucket counts per community and per ``YYYY-MM`` month, and
+    min-heaps holding the ``top_k`` most confident false positives and false
+    negatives. Past ``MAX_COMMUNITIES`` distinct communities, further ones
+    are counted under ``__other__``.
+    """
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K) -> None:
+        self.top_k = top_k
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        self.bucket_counts = np.zeros(len(BUCKET_LABELS), dtype=np.int64)
+        self.by_community: dict[str, np.ndarray] = {}
+        self.by_month: dict[str, np.ndarray] = {}
+        # Heap entries are (priority, -sequence, row): the smallest priority is
+        # evicted first and, among ties, the later row, so earlier rows win.
+        self._false_positives: list[tuple[float, int, dict[str, Any]]] = []
+        self._false_negatives: list[tuple[float, int, dict[str, Any]]] = []
+        self._sequence = 0
+
+    def update(self, table: pa.Table) -> None:
+        """Fold one ``AUDIT_SCHEMA`` batch into the summary."""
+        if table.num_rows == 0:
+            return
+        p_risk = table.column("p_risk").to_numpy()
+        codes = table.column("bucket").combine_chunks().indices.to_numpy().astype(np.int64)
+
+        batch_count = len(p_risk)
+        batch_mean = float(p_risk.mean())
+        batch_m2 = float(((p_risk - batch_mean) ** 2).sum())
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / total
+        self.m2 += batch_m2 + delta * delta * self.count * batch_count / total
+        self.count = total
+
+        bins = np.clip((p_risk * HISTOGRAM_BINS).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+        self.histogram += np.bincount(bins, minlength=HISTOGRAM_BINS)
+        self.bucket_counts += np.bincount(codes, minlength=len(BUCKET_LABELS))
+
+        community = pc.fill_null(table.column("community"), "").to_pylist()
+        month = pc.utf8_slice_codeunits(
+            pc.fill_null(table.column("created_at"), ""), 0, 7
+        ).to_pylist()
+        self._count_groups(self.by_community, community, codes, MAX_COMMUNITIES)
+        self._count_groups(self.by_month, month, codes, None)
+
+        self._push_top(self._false_positives, table, codes == 1, p_risk)
+        self._push_top(self._false_negatives, table, codes == 3, -p_risk)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Approximate p_risk quantile, interpolated within a histogram bin."""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = np.cumsum(self.histogram)
+        index = int(np.searchsorted(cumulative, target, side="left"))
+        index = min(index, HISTOGRAM_BINS - 1)
+        before = cumulative[index - 1] if index else 0
+        inside = self.histogram[index]
+        fraction = (target - before) / inside if inside else 0.0
+        return (index + fraction) / HISTOGRAM_BINS
+
+    def to_dict(self) -> dict[str, Any]:
+        def counts(values: np.ndarray) -> dict[str, int]:
+            return {label: int(value) for label, value in zip(BUCKET_LABELS, values)}
+
+        return {
+            "total_rows": self.count,
+            "bucket_counts": counts(self.bucket_counts),
+            "p_risk": {
+                "mean": self.mean,
+                "std": math.sqrt(self.variance),
+                "quantiles": {str(q): self.quantile(q) for q in QUANTILES},
+                "histogram": self.histogram.tolist(),
+            },
+            "by_community": {
+                name: counts(values) for name, values in sorted(self.by_community.items())
+            },
+            "by_month": {name: counts(values) for name, values in sorted(self.by_month.items())},
+            "top_false_positives": _ranked(self._false_positives),
+            "top_false_negatives": _ranked(self._false_negatives),
+        }
+
+    def state(self) -> dict[str, Any]:
+        """JSON-serializable internal state, restored by ``from_state``."""
+        return {
+            "top_k": self.top_k,
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "histogram": self.histogram.tolist(),
+            "bucket_counts": self.bucket_counts.tolist(),
+            "by_community": {name: values.tolist() for name, values in self.by_community.items()},
+            "by_month": {name: values.tolist() for name, values in self.by_month.items()},
+            "false_positives": [list(entry) for entry in self._false_positives],
+            "false_negatives": [list(entry) for entry in self._false_negatives],
+            "sequence": self._sequence,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any]) -> AuditSummary:
+        summary = cls(top_k=state["top_k"])
+        summary.count = state["count"]
+        summary.mean = state["mean"]
+        summary.m2 = state["m2"]
+        summary.histogram = np.asarray(state["histogram"], dtype=np.int64)
+        summary.bucket_counts = np.asarray(state["bucket_counts"], dtype=np.int64)
+        for name in ("by_community", "by_month"):
+            groups = {key: np.asarray(values, dtype=np.int64) for key, values in state[name].items()}
+            setattr(summary, name, groups)
+        summary._false_positives = [tuple(entry) for entry in state["false_positives"]]
+        summary._false_negatives = [tuple(entry) for entry in state["false_negatives"]]
+        summary._sequence = state["sequence"]
+        return summary
+
+    def _count_groups(
+        self,
+        groups: dict[str, np.ndarray],
+        keys: list[str],
+        codes: np.ndarray,
+        limit: int | None,
+    ) -> None:
+        encoded = pa.array(keys, pa.string()).dictionary_encode()
+        indices = encoded.indices.to_numpy()
+        for index, key in enumerate(encoded.dictionary.to_pylist()):
+            if limit is not None and key not in groups and len(groups) >= limit:
+                key = OTHER_COMMUNITY
+            counts = groups.setdefault(key, np.zeros(len(BUCKET_LABELS), dtype=np.int64))
+            counts += np.bincount(codes[indices == index], minlength=len(BUCKET_LABELS))
+
+    def _push_top(
+        self,
+        heap: list[tuple[float, int, dict[str, Any]]],
+        table: pa.Table,
+        mask: np.ndarray,
+        priority: np.ndarray,
+    ) -> None:
+        if self.top_k <= 0:
+            return
+        candidates = np.flatnonzero(mask)
+        if len(heap) >= self.top_k:
+            candidates = candidates[priority[candidates] > heap[0][0]]
+        if len(candidates) > self.top_k:
+            best = np.lexsort((candidates, -priority[candidates]))[: self.top_k]
+            candidates = np.sort(candidates[best])
+        if len(candidates) == 0:
+            return
+        review = [name for name in (*REVIEW_COLUMNS, "redacted_text") if name in table.column_names]
+        rows = table.select(review).take(pa.array(candidates)).to_pylist()
+        for index, row in zip(candidates, rows):
+            entry = (float(priority[index]), -self._sequence, row)
+            self._sequence += 1
+            if len(heap) < self.top_k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+
+def _ranked(heap: list[tuple[float, int, dict[str, Any]]]) -> list[dict[str, Any]]:
+    return [row for _, _, row in sorted(heap, key=lambda entry: (-entry[0], -entry[1]))]
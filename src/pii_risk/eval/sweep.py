@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from pii_risk.eval.writers import output_format
+
+
+def parse_thresholds(spec: str) -> list[float]:
+    """Parse ``"0.3,0.5,0.7"`` and/or ``"start:stop:step"`` ranges (stop included)."""
+    values: set[float] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if ":" in part:
+                start, stop, step = (float(value) for value in part.split(":"))
+                if step <= 0:
+                    raise ValueError
+                count = int(np.floor((stop - start) / step + 1e-9)) + 1
+                values.update(round(start + index * step, 10) for index in range(count))
+            else:
+                values.add(float(part))
+        except ValueError as exc:
+            raise ValueError(f"Invalid threshold spec {part!r}") from exc
+    if not values or any(not 0.0 <= value <= 1.0 for value in values):
+        raise ValueError(f"Thresholds must be within [0, 1], got {spec!r}")
+    return sorted(values)
+
+
+class ThresholdSweep:
+    """Confusion counts at many thresholds from a single pass over p_risk.
+
+    Each batch's scores are sorted per weak label and every threshold is
+    located with a binary search, so the counts of ``p_risk >= threshold``
+    are exact and the cost per batch is ``O(n log n + t log n)``.
+    """
+
+    def __init__(self, thresholds: Sequence[float]) -> None:
+        self.thresholds = np.asarray(sorted(thresholds), dtype=float)
+        self.positives = 0
+        self.negatives = 0
+        self.positives_at = np.zeros(len(self.thresholds), dtype=np.int64)
+        self.negatives_at = np.zeros(len(self.thresholds), dtype=np.int64)
+
+    def update(self, p_risk: np.ndarray, y_risk: np.ndarray) -> None:
+        for label in (1, 0):
+            scores = np.sort(p_risk[y_risk == label])
+            at_or_above = len(scores) - np.searchsorted(scores, self.thresholds, side="left")
+            if label:
+                self.positives += len(scores)
+                self.positives_at += at_or_above
+            else:
+                self.negatives += len(scores)
+                self.negatives_at += at_or_above
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "thresholds": self.thresholds.tolist(),
+            "positives": self.positives,
+            "negatives": self.negatives,
+            "positives_at": self.positives_at.tolist(),
+            "negatives_at": self.negatives_at.tolist(),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any]) -> ThresholdSweep:
+        sweep = cls(state["thresholds"])
+        sweep.positives = state["positives"]
+        sweep.negatives = state["negatives"]
+        sweep.positives_at = np.asarray(state["positives_at"], dtype=np.int64)
+        sweep.negatives_at = np.asarray(state["negatives_at"], dtype=np.int64)
+        return sweep
+
+    def to_table(self) -> pa.Table:
+        tp = self.positives_at
+        fp = self.negatives_at
+        fn = self.positives - tp
+        tn = self.negatives - fp
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+            recall = np.where(self.positives > 0, tp / max(self.positives, 1), 0.0)
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+            fpr = np.where(self.negatives > 0, fp / max(self.negatives, 1), 0.0)
+        return pa.table(
+            {
+                "threshold": self.thresholds,
+                "tp": tp,
+                "fp": fp,
+                "tn": tn,
+                "fn": fn,
+                "precision": precision,
+                "recall": recall,
+                "f1": f1,
+                "fpr": fpr,
+            }
+        )
+
+    def to_records(self) -> list[dict[str, Any]]:
+        return self.to_table().to_pylist()
+
+    def write(self, out_path: str | Path) -> None:
+        path = Path(out_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = self.to_table()
+        file_format = output_format(path)
+        if file_format == "csv":
+            pa_csv.write_csv(table, path)
+        elif file_format == "parquet":
+            pq.write_table(table, path)
+        else:
+            with pa.ipc.new_file(str(path), table.schema) as writer:
+                writer.write_table(table)
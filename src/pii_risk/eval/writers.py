@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import csv
+import os
+import shutil
+from collections.abc import Sequence
+from pathlib import Path
+from typing import IO, Any
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+AUDIT_SCHEMA = pa.schema(
+    [
+        ("record_id", pa.string()),
+        ("created_at", pa.string()),
+        ("bucket", pa.dictionary(pa.int8(), pa.string())),
+        ("y_risk", pa.int8()),
+        ("pred_risk", pa.int8()),
+        ("p_risk", pa.float64()),
+        ("rule_score", pa.int16()),
+        ("pii_types", pa.list_(pa.string())),
+        ("text", pa.string()),
+        ("redacted_text", pa.string()),
+        ("community", pa.string()),
+    ]
+)
+OUTPUT_FORMATS = ("csv", "parquet", "arrow")
+PARTITION_KEYS = ("bucket", "community")
+TEXT_COLUMNS = ("text", "redacted_text")
+WRITE_ROW_GROUP_ROWS = 64 * 1024
+_SUFFIX_FORMATS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+
+def output_format(out_path: str | Path, requested: str | None = None) -> str:
+    """Return the audit output format, inferring it from the suffix by default."""
+    if requested is None:
+        requested = _SUFFIX_FORMATS.get(Path(out_path).suffix.lower())
+        if requested is None:
+            raise ValueError(
+                f"Cannot infer the output format of {out_path}; use .csv, .parquet or .arrow"
+            )
+    if requested not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {requested!r}; use one of {OUTPUT_FORMATS}")
+    return requested
+
+
+class AuditWriter:
+    """Stream audit batches to CSV, Parquet or Arrow IPC.
+
+    Batches are buffered up to ``WRITE_ROW_GROUP_ROWS`` rows so columnar
+    outputs get reasonably sized row groups while memory stays flat. With
+    ``partition_by``, ``out_path`` is a directory of hive partitions
+    (``bucket=TP/community=.../``) written incrementally.
+
+    A ``resumable`` writer can report a ``checkpoint()`` state and later be
+    reopened with it, discarding anything written after that state. A
+    single Parquet or Arrow file cannot be reopened for appending, so a
+    resumable writer stages each flush as a part file next to ``out_path``
+    and assembles the file on ``close()``.
+    """
+
+    def __init__(
+        self,
+        out_path: str | Path,
+        file_format: str = "csv",
+        columns: Sequence[str] | None = None,
+        partition_by: Sequence[str] = (),
+        resumable: bool = False,
+        resume_state: dict[str, Any] | None = None,
+    ) -> None:
+        self.out_path = Path(out_path)
+        self.file_format = file_format
+        names = list(columns) if columns is not None else AUDIT_SCHEMA.names
+        self.schema = pa.schema([AUDIT_SCHEMA.field(name) for name in names])
+        self.partition_by = list(partition_by)
+        unknown = [name for name in self.partition_by if name not in PARTITION_KEYS]
+        if unknown:
+            raise ValueError(f"Can only partition by {PARTITION_KEYS}, got {unknown}")
+        if self.partition_by and file_format == "csv":
+            raise ValueError("Partitioned output needs the parquet or arrow format")
+        missing = [name for name in self.partition_by if name not in names]
+        if missing:
+            raise ValueError(f"Partition columns are not written: {missing}")
+
+        self._pending: list[pa.Table] = []
+        self._pending_rows = 0
+        self._parts = 0
+        self._csv_handle: IO[str] | None = None
+        self._csv_writer: Any = None
+        self._writer: pq.ParquetWriter | pa.ipc.RecordBatchFileWriter | None = None
+        self._stage_dir: Path | None = None
+        resumable = resumable or resume_state is not None
+
+        if self.partition_by:
+            if resume_state is not None:
+                self._parts = int(resume_state["parts"])
+                self._discard_parts(self.out_path.rglob("part-*"))
+            elif self.out_path.exists() and any(self.out_path.iterdir()):
+                raise ValueError(f"Output directory {self.out_path} is not empty")
+            self.out_path.mkdir(parents=True, exist_ok=True)
+            return
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
+        if file_format == "csv":
+            if resume_state is not None:
+                os.truncate(self.out_path, int(resume_state["bytes"]))
+                self._csv_handle = self.out_path.open("a", encoding="utf-8", newline="")
+                self._csv_writer = csv.writer(self._csv_handle)
+            else:
+                self._csv_handle = self.out_path.open("w", encoding="utf-8", newline="")
+                self._csv_writer = csv.writer(self._csv_handle)
+                self._csv_writer.writerow(self.schema.names)
+        elif resumable:
+            self._stage_dir = self.out_path.with_name(f".{self.out_path.name}.parts")
+            if resume_state is not None:
+                self._parts = int(resume_state["parts"])
+                self._discard_parts(self._stage_dir.glob("part-*"))
+            elif self._stage_dir.exists():
+                shutil.rmtree(self._stage_dir)
+            self._stage_dir.mkdir(parents=True, exist_ok=True)
+        elif file_format == "parquet":
+            self._writer = pq.ParquetWriter(self.out_path, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(str(self.out_path), self.schema)
+
+    def write(self, table: pa.Table) -> None:
+        table = table.select(self.schema.names).cast(self.schema)
+        if self._csv_writer is not None:
+            self._csv_writer.writerows(_csv_rows(table))
+            return
+        self._pending.append(table)
+        self._pending_rows += table.num_rows
+        if self._pending_rows >= WRITE_ROW_GROUP_ROWS:
+            self._flush()
+
+    @property
+    def pending_rows(self) -> int:
+        return self._pending_rows
+
+    def checkpoint(self) -> dict[str, Any] | None:
+        """Sync written rows and return the state to resume from.
+
+        Returns ``None`` while rows are buffered: checkpointing only between
+        flushes keeps the row groups of a resumed run identical.
+        """
+        if self._pending_rows:
+            return None
+        if self._csv_handle is not None:
+            self._csv_handle.flush()
+            os.fsync(self._csv_handle.fileno())
+            return {"bytes": self._csv_handle.tell()}
+        return {"parts": self._parts}
+
+    def close(self, complete: bool = True) -> None:
+        """Finish the output; an incomplete resumable writer keeps its parts."""
+        if self._csv_handle is not None:
+            self._csv_handle.close()
+            return
+        if self._stage_dir is not None and not complete:
+            return
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+        if self._stage_dir is not None:
+            self._assemble()
+
+    def __enter__(self) -> AuditWriter:
+        return self
+
+    def __exit__(self, exc_type: object, *exc_info: object) -> None:
+        self.close(complete=exc_type is None)
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        table = pa.concat_tables(self._pending).combine_chunks()
+        self._pending = []
+        self._pending_rows = 0
+        if self._writer is not None:
+            self._writer.write_table(table)
+            return
+        extension = "parquet" if self.file_format == "parquet" else "arrow"
+        if self._stage_dir is not None:
+            _write_file(table, self._stage_dir / f"part-{self._parts:05d}.{extension}")
+            self._parts += 1
+            return
+        ds.write_dataset(
+            table,
+            base_dir=str(self.out_path),
+            format="parquet" if self.file_format == "parquet" else "ipc",
+            partitioning=ds.partitioning(
+                pa.schema([(name, pa.string()) for name in self.partition_by]), flavor="hive"
+            ),
+            basename_template=f"part-{self._parts:05d}-{{i}}.{extension}",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self._parts += 1
+
+    def _discard_parts(self, paths: Any) -> None:
+        """Delete part files flushed after the checkpoint being resumed."""
+        for path in list(paths):
+            if int(path.name.split("-")[1].split(".")[0]) >= self._parts:
+                path.unlink()
+
+    def _assemble(self) -> None:
+        assert self._stage_dir is not None
+        parts = sorted(self._stage_dir.glob("part-*"))
+        tmp_path = self.out_path.with_name(f".{self.out_path.name}.tmp")
+        if self.file_format == "parquet":
+            writer: Any = pq.ParquetWriter(tmp_path, self.schema)
+            for path in parts:
+                writer.write_table(pq.read_table(path, schema=self.schema))
+        else:
+            writer = pa.ipc.new_file(str(tmp_path), self.schema)
+            for path in parts:
+                with pa.memory_map(str(path)) as source:
+                    writer.write_table(pa.ipc.open_file(source).read_all())
+        writer.close()
+        os.replace(tmp_path, self.out_path)
+        shutil.rmtree(self._stage_dir)
+
+
+def _write_file(table: pa.Table, path: Path) -> None:
+    if path.suffix == ".parquet":
+        pq.write_table(table, path)
+        return
+    with pa.ipc.new_file(str(path), table.schema) as writer:
+        writer.write_table(table)
+
+
+def _csv_rows(table: pa.Table) -> list[list[Any]]:
+    columns = []
+    for name in table.column_names:
+        values = table.column(name).to_pylist()
+        if name == "pii_types":
+            values = ["|".join(value or []) for value in values]
+        columns.append(["" if value is None else value for value in values])
+    return [list(row) for row in zip(*columns)]
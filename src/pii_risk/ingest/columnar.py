@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Callable
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+# Same character set as ``str.split()``/``str.strip()`` without arguments.
+WHITESPACE_CLASS = r"[\t\n\x0b\x0c\r\x1c-\x1f\x85\p{Z}]"
+_WHITESPACE_RUN_RE = WHITESPACE_CLASS + "+"
+_WHITESPACE_EDGES_RE = f"^{WHITESPACE_CLASS}+|{WHITESPACE_CLASS}+$"
+_OFFSET_SUFFIX_RE = r"(?:Z|[+-]\d{2}:?\d{2})$"
+_FRACTION_ZERO_RE = r"\.0{6}$"
+_NETLOC_RE = r"^(?:[A-Za-z][A-Za-z0-9+.\-]*:)?//(?P<netloc>[^/?#]*)"
+ARROW_ERRORS = (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError)
+
+
+class ColumnarFallback(Exception):
+    """Raised when a batch needs the per-row reference normalization."""
+
+
+def column(table: pa.Table, name: str) -> pa.ChunkedArray:
+    if name in table.column_names:
+        return table.column(name)
+    return pa.chunked_array([pa.nulls(table.num_rows, pa.string())])
+
+
+def as_string(values: pa.ChunkedArray, allow_cast: bool = True) -> pa.ChunkedArray:
+    """Return ``values`` as strings, matching ``str(value)`` for the types cast.
+
+    Only string, null and integer columns are handled; anything else (floats,
+    booleans, nested values) formats differently from Python and must go
+    through the reference path.
+    """
+    value_type = values.type
+    if pa.types.is_string(value_type) or pa.types.is_large_string(value_type):
+        return values.cast(pa.string())
+    if pa.types.is_null(value_type):
+        return values.cast(pa.string())
+    if allow_cast and pa.types.is_integer(value_type):
+        return values.cast(pa.string())
+    raise ColumnarFallback(f"cannot vectorize column of type {value_type}")
+
+
+def null_if_empty(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    return pc.if_else(pc.equal(values, ""), pa.scalar(None, pa.string()), values)
+
+
+def strip_whitespace(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    return pc.replace_substring_regex(values, _WHITESPACE_EDGES_RE, "")
+
+
+def collapse_whitespace(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    collapsed = pc.replace_substring_regex(values, _WHITESPACE_RUN_RE, " ")
+    return strip_whitespace(collapsed)
+
+
+def hash_authors(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    """SHA-256 author identifiers, hashing each distinct value once per batch."""
+    identifiers = pc.fill_null(null_if_empty(as_string(values)), "unknown")
+    encoded = identifiers.combine_chunks().dictionary_encode()
+    digests = pa.array(
+        [
+            hashlib.sha256(value.encode("utf-8")).hexdigest()
+            for value in encoded.dictionary.to_pylist()
+        ],
+        type=pa.string(),
+    )
+    return pa.chunked_array([pc.take(digests, encoded.indices)])
+
+
+def map_unique(
+    values: pa.ChunkedArray, func: Callable[[Any], str | None]
+) -> pa.ChunkedArray:
+    """Apply a Python function once per distinct value and broadcast the result."""
+    encoded = values.combine_chunks().dictionary_encode()
+    mapped = pa.array([func(value) for value in encoded.dictionary.to_pylist()], pa.string())
+    return pa.chunked_array([pc.take(mapped, encoded.indices)])
+
+
+def timestamps_to_iso(timestamps: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Format UTC timestamps like ``datetime.isoformat()`` with a ``Z`` suffix."""
+    utc = timestamps.cast(pa.timestamp("us", tz="UTC"))
+    formatted = pc.strftime(utc, format="%Y-%m-%dT%H:%M:%S")
+    formatted = pc.replace_substring_regex(formatted, _FRACTION_ZERO_RE, "")
+    return pc.binary_join_element_wise(formatted, "Z", "")
+
+
+def epoch_seconds_to_iso(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Vectorized ``datetime.fromtimestamp(float(v), tz=utc).isoformat()``."""
+    value_type = values.type
+    if pa.types.is_integer(value_type):
+        micros = pc.multiply(values.cast(pa.int64()), 1_000_000)
+    else:
+        if pa.types.is_string(value_type) or pa.types.is_large_string(value_type):
+            values = null_if_empty(values.cast(pa.string()))
+        elif not (pa.types.is_floating(value_type) or pa.types.is_null(value_type)):
+            raise ColumnarFallback(f"cannot parse epoch seconds of type {value_type}")
+        try:
+            seconds = values.cast(pa.float64())
+        except ARROW_ERRORS as exc:
+            raise ColumnarFallback(str(exc)) from exc
+        # Mirror datetime.fromtimestamp: split whole seconds and round the
+        # fractional part to microseconds with round-half-even.
+        whole = pc.trunc(seconds)
+        fraction = pc.round(
+            pc.multiply(pc.subtract(seconds, whole), 1e6), round_mode="half_to_even"
+        )
+        micros = pc.add(
+            pc.multiply(whole.cast(pa.int64()), 1_000_000), fraction.cast(pa.int64())
+        )
+    return timestamps_to_iso(micros.cast(pa.timestamp("us", tz="UTC")))
+
+
+def iso_strings_to_iso(
+    values: pa.ChunkedArray, reference: Callable[[Any], str | None]
+) -> pa.ChunkedArray:
+    """Normalize ISO-8601 strings to UTC, assuming UTC for naive values.
+
+    Arrow's string casts cover the common ISO forms; if any value in a group
+    fails to parse, that group is handed to ``reference`` one distinct value
+    at a time so the result always matches the per-row function.
+    """
+    cleaned = strip_whitespace(values)
+    has_offset = pc.fill_null(pc.match_substring_regex(cleaned, _OFFSET_SUFFIX_RE), False)
+    result = pa.nulls(len(values), pa.string())
+
+    for mask, target in (
+        (has_offset, pa.timestamp("us", tz="UTC")),
+        (pc.invert(has_offset), pa.timestamp("us")),
+    ):
+        subset = pc.filter(cleaned, mask)
+        if len(subset) == 0:
+            continue
+        try:
+            parsed = subset.cast(target)
+            if target.tz is None:
+                parsed = pc.assume_timezone(parsed, "UTC")
+            formatted = timestamps_to_iso(parsed)
+        except ARROW_ERRORS:
+            formatted = map_unique(pc.filter(values, mask), reference)
+        result = pc.replace_with_mask(
+            result, mask.combine_chunks(), formatted.combine_chunks()
+        )
+    return pa.chunked_array([result])
+
+
+def url_netloc(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Extract the ``urlparse(...).netloc`` of each value, null when empty."""
+    extracted = pc.extract_regex(as_string(values, allow_cast=False), _NETLOC_RE)
+    netloc = pc.struct_field(extracted, "netloc")
+    return null_if_empty(pc.if_else(pc.is_valid(extracted), netloc, None))
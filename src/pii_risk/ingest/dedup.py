@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+INDEX_DIR_NAME = "_record_index"
+DEFAULT_CAPACITY = 100_000_000
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+MERGE_CHUNK_KEYS = 4_000_000
+RUN_MERGE_RATIO = 4
+
+
+def record_keys(platform: pa.ChunkedArray, record_id: pa.ChunkedArray) -> np.ndarray:
+    """Hash ``(platform, record_id)`` pairs into 64-bit keys.
+
+    Keys are the first 8 bytes of a BLAKE2b digest; the chance of any two of
+    500 million distinct ids colliding is below one percent.
+    """
+    joined = pc.binary_join_element_wise(platform, record_id, "\x1f")
+    return np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            for value in joined.to_pylist()
+        ),
+        dtype=np.uint64,
+        count=len(joined),
+    )
+
+
+def _mix(keys: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, used to derive the second Bloom hash."""
+    z = keys + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class RecordIdIndex:
+    """Persistent, memory-bounded set of ingested record keys.
+
+    A memory-mapped Bloom filter answers "never seen" for most new keys
+    without touching the key store. Keys the filter flags as possibly seen are
+    confirmed exactly against sorted runs of keys, stored as memory-mapped
+    ``.npy`` files and merged LSM-style so lookups stay logarithmic. Resident
+    memory is the pages the OS keeps hot plus an in-memory buffer of the keys
+    added since the last ``flush``.
+
+    ``add`` never writes keys to disk: callers ``flush`` at their checkpoint,
+    after the manifest lists the part files holding those records. Keys of
+    parts a resume discards are then never persisted, so re-read records are
+    not mistaken for duplicates.
+
+    A ``readonly`` index (used by parallel ingest workers) never writes to
+    disk; keys added to it only live in the buffer.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        capacity: int = DEFAULT_CAPACITY,
+        false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+        readonly: bool = False,
+    ) -> None:
+        self.directory = directory
+        self.readonly = readonly
+        meta_path = directory / "meta.json"
+        if meta_path.exists():
+            with meta_path.open("r", encoding="utf-8") as handle:
+                self.meta = json.load(handle)
+        else:
+            bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+            hashes = max(1, round(bits / capacity * math.log(2)))
+            self.meta = {"bits": bits, "hashes": hashes, "runs": [], "next_run": 0, "count": 0}
+        self._bits = int(self.meta["bits"])
+        self._hashes = int(self.meta["hashes"])
+        self._bloom = self._open_bloom()
+        self._runs = [
+            np.load(directory / name, mmap_mode="r") for name in self.meta["runs"]
+        ]
+        # Sorted, disjoint arrays of unflushed keys, merged LSM-style like
+        # the runs on disk so buffering a long range stays O(n log n).
+        self._buffers: list[np.ndarray] = []
+
+    @classmethod
+    def open(cls, output_dir: str | Path, readonly: bool = False) -> RecordIdIndex:
+        directory = Path(output_dir) / INDEX_DIR_NAME
+        if not readonly:
+            directory.mkdir(parents=True, exist_ok=True)
+        return cls(directory, readonly=readonly)
+
+    def __len__(self) -> int:
+        return int(self.meta["count"]) + sum(len(buffer) for buffer in self._buffers)
+
+    def filter_new(self, keys: np.ndarray) -> np.ndarray:
+        """Return a mask of keys not in the index, keeping the first of repeats."""
+        mask = np.zeros(len(keys), dtype=bool)
+        if len(keys) == 0:
+            return mask
+        _, first = np.unique(keys, return_index=True)
+        mask[first] = True
+        candidates = np.flatnonzero(mask)
+        if self._bloom is not None:
+            maybe_seen = self._bloom_contains(keys[candidates])
+        else:
+            maybe_seen = np.zeros(len(candidates), dtype=bool)
+        seen = self._buffered_contains(keys[candidates])
+        confirm = candidates[maybe_seen & ~seen]
+        for run in self._runs:
+            if len(confirm) == 0:
+                break
+            found = _sorted_contains(run, keys[confirm])
+            seen[np.searchsorted(candidates, confirm[found])] = True
+            confirm = confirm[~found]
+        mask[candidates[seen]] = False
+        return mask
+
+    def add(self, keys: np.ndarray) -> None:
+        if len(keys) == 0:
+            return
+        if self._bloom is not None and not self.readonly:
+            positions = self._bloom_positions(keys).ravel()
+            np.bitwise_or.at(
+                self._bloom,
+                (positions >> np.uint64(3)).astype(np.int64),
+                (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)),
+            )
+        keys = np.unique(keys.astype(np.uint64))
+        keys = keys[~self._buffered_contains(keys)]
+        if len(keys) == 0:
+            return
+        self._buffers.append(keys)
+        while len(self._buffers) >= 2 and (
+            len(self._buffers[-2]) <= RUN_MERGE_RATIO * len(self._buffers[-1])
+        ):
+            newer = self._buffers.pop()
+            self._buffers[-1] = np.sort(np.concatenate([self._buffers[-1], newer]))
+
+    def buffered_keys(self) -> np.ndarray:
+        """The unflushed keys as one sorted array."""
+        if len(self._buffers) > 1:
+            self._buffers = [np.sort(np.concatenate(self._buffers))]
+        return self._buffers[0] if self._buffers else np.empty(0, dtype=np.uint64)
+
+    def _buffered_contains(self, keys: np.ndarray) -> np.ndarray:
+        seen = np.zeros(len(keys), dtype=bool)
+        for buffer in self._buffers:
+            seen |= _sorted_contains(buffer, keys)
+        return seen
+
+    def flush(self) -> None:
+        """Persist buffered keys as a new sorted run and merge similar-sized runs."""
+        if self.readonly:
+            return
+        buffered = self.buffered_keys()
+        if len(buffered):
+            name = self._save_run(buffered)
+            self.meta["runs"].append(name)
+            self.meta["count"] = int(self.meta["count"]) + len(buffered)
+            self._runs.append(np.load(self.directory / name, mmap_mode="r"))
+            self._buffers = []
+            self._merge_runs()
+        if self._bloom is not None:
+            self._bloom.flush()
+        self._save_meta()
+
+    def _open_bloom(self) -> np.memmap | None:
+        path = self.directory / "bloom.bin"
+        size = (self._bits + 7) // 8
+        if path.exists():
+            return np.memmap(path, dtype=np.uint8, mode="r" if self.readonly else "r+")
+        if self.readonly:
+            return None
+        # A fresh memmap is a sparse file: untouched pages cost no disk or RAM.
+        return np.memmap(path, dtype=np.uint8, mode="w+", shape=(size,))
+
+    def _bloom_positions(self, keys: np.ndarray) -> np.ndarray:
+        first = keys.astype(np.uint64)
+        second = _mix(first) | np.uint64(1)
+        steps = np.arange(self._hashes, dtype=np.uint64)
+        return (first[:, None] + steps[None, :] * second[:, None]) % np.uint64(self._bits)
+
+    def _bloom_contains(self, keys: np.ndarray) -> np.ndarray:
+        if len(keys) == 0:
+            return np.zeros(0, dtype=bool)
+        positions = self._bloom_positions(keys)
+        bytes_ = np.asarray(self._bloom[(positions >> np.uint64(3)).astype(np.int64)])
+        bits = (bytes_ >> (positions & np.uint64(7)).astype(np.uint8)) & np.uint8(1)
+        return bits.all(axis=1)
+
+    def _save_run(self, keys: np.ndarray) -> str:
+        name = f"run-{int(self.meta['next_run']):06d}.npy"
+        self.meta["next_run"] = int(self.meta["next_run"]) + 1
+        tmp_path = self.directory / f".{name}.tmp"
+        with tmp_path.open("wb") as handle:
+            np.save(handle, keys)
+        os.replace(tmp_path, self.directory / name)
+        return name
+
+    def _merge_runs(self) -> None:
+        while len(self._runs) >= 2 and (
+            len(self._runs[-2]) <= RUN_MERGE_RATIO * len(self._runs[-1])
+        ):
+            older, newer = self._runs[-2], self._runs[-1]
+            old_names = self.meta["runs"][-2:]
+            name = f"run-{int(self.meta['next_run']):06d}.npy"
+            self.meta["next_run"] = int(self.meta["next_run"]) + 1
+            tmp_path = self.directory / f".{name}.tmp"
+            merged = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=np.uint64, shape=(len(older) + len(newer),)
+            )
+            _merge_sorted(older, newer, merged)
+            merged.flush()
+            del merged
+            os.replace(tmp_path, self.directory / name)
+            self._runs[-2:] = [np.load(self.directory / name, mmap_mode="r")]
+            self.meta["runs"][-2:] = [name]
+            self._save_meta()
+            for old_name in old_names:
+                (self.directory / old_name).unlink(missing_ok=True)
+
+    def _save_meta(self) -> None:
+        meta_path = self.directory / "meta.json"
+        tmp_path = self.directory / ".meta.json.tmp"
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(self.meta, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, meta_path)
+
+
+def _sorted_contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    if len(sorted_keys) == 0 or len(keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    positions = np.searchsorted(sorted_keys, keys)
+    positions = np.minimum(positions, len(sorted_keys) - 1)
+    return np.asarray(sorted_keys[positions]) == keys
+
+
+def _merge_sorted(left: np.ndarray, right: np.ndarray, out: np.ndarray) -> None:
+    """Merge two sorted arrays into ``out`` holding at most a few chunks in memory."""
+    i = j = k = 0
+    while i < len(left) or j < len(right):
+        if i >= len(left):
+            pivot = right[min(j + MERGE_CHUNK_KEYS, len(right)) - 1]
+        elif j >= len(right):
+            pivot = left[min(i + MERGE_CHUNK_KEYS, len(left)) - 1]
+        else:
+            pivot = min(
+                left[min(i + MERGE_CHUNK_KEYS, len(left)) - 1],
+                right[min(j + MERGE_CHUNK_KEYS, len(right)) - 1],
+            )
+        i_end = i + int(np.searchsorted(left[i : i + MERGE_CHUNK_KEYS], pivot, side="right"))
+        j_end = j + int(np.searchsorted(right[j : j + MERGE_CHUNK_KEYS], pivot, side="right"))
+        chunk = np.sort(np.concatenate([left[i:i_end], right[j:j_end]]))
+        out[k : k + len(chunk)] = chunk
+        k += len(chunk)
+        i, j = i_end, j_end
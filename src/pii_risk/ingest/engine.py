@@ -0,0 +1,569 @@
+from __future__ import annotations
+
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pii_risk.ingest.columnar import ARROW_ERRORS, ColumnarFallback
+from pii_risk.ingest.dedup import RecordIdIndex, record_keys
+from pii_risk.ingest.manifest import (
+    IngestManifest,
+    fingerprint_input,
+    range_part_prefix,
+)
+from pii_risk.ingest.readers import RawBatch, expand_inputs, input_format, iter_raw_batches
+from pii_risk.ingest.sharding import offset_after_rows, plan_byte_ranges
+from pii_risk.schema import Record
+
+
+INGEST_PARQUET_SCHEMA = pa.schema(
+    [
+        ("platform", pa.string()),
+        ("record_type", pa.string()),
+        ("record_id", pa.string()),
+        ("author_id_hash", pa.string()),
+        ("created_at", pa.string()),
+        ("text", pa.string()),
+        ("community", pa.string()),
+        ("parent_record_id", pa.string()),
+        ("thread_id", pa.string()),
+        ("year", pa.string()),
+        ("month", pa.string()),
+    ]
+)
+PARTITION_SCHEMA = pa.schema(
+    [
+        ("platform", pa.string()),
+        ("record_type", pa.string()),
+        ("year", pa.string()),
+        ("month", pa.string()),
+    ]
+)
+DEFAULT_BATCH_SIZE = 10_000
+REQUIRED_FIELDS = (
+    "platform",
+    "record_type",
+    "record_id",
+    "author_id_hash",
+    "created_at",
+    "text",
+)
+RECORD_SCHEMA = pa.schema(
+    [field for field in INGEST_PARQUET_SCHEMA if field.name not in ("year", "month")]
+)
+
+
+class PlatformAdapter(ABC):
+    """Platform-specific normalization plugged into the ingest engine.
+
+    Adapters only map raw source records onto the ``Record`` fields; reading,
+    validation, partitioning and writing are handled by ``IngestEngine``.
+    ``normalize`` is the per-row reference implementation and is abstract, so
+    an incomplete adapter fails when it is instantiated rather than in the
+    middle of an ingest. ``normalize_table`` is the optional columnar
+    equivalent: it maps a whole Arrow batch of raw records onto
+    ``RECORD_SCHEMA`` columns, leaving a required field null for rows
+    ``normalize`` would reject. ``raw_schema`` pins known raw fields to their
+    source types when JSON is decoded by Arrow, which would otherwise infer
+    ISO-8601 strings as timestamps.
+    """
+
+    platform: str = ""
+    raw_schema: pa.Schema | None = None
+
+    @abstractmethod
+    def normalize(self, raw: dict[str, Any]) -> dict[str, Any] | None:
+        """Map one raw record onto ``Record`` fields, or ``None`` to skip it."""
+
+    def normalize_table(self, table: pa.Table) -> pa.Table:
+        raise ColumnarFallback(f"{type(self).__name__} has no columnar normalization")
+
+
+@dataclass
+class IngestStats:
+    total_read: int = 0
+    total_written: int = 0
+    total_skipped: int = 0
+    total_duplicates: int = 0
+    bytes_read: int = 0
+    elapsed_seconds: float = field(default=0.0, compare=False)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, int]) -> IngestStats:
+        return cls(**{name: int(value) for name, value in data.items()})
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "total_read": self.total_read,
+            "total_written": self.total_written,
+            "total_skipped": self.total_skipped,
+            "total_duplicates": self.total_duplicates,
+            "bytes_read": self.bytes_read,
+        }
+
+    def merge(self, other: IngestStats) -> None:
+        self.total_read += other.total_read
+        self.total_written += other.total_written
+        self.total_skipped += other.total_skipped
+        self.total_duplicates += other.total_duplicates
+        self.bytes_read += other.bytes_read
+
+    @property
+    def throughput_mb_s(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.bytes_read / 1_000_000 / self.elapsed_seconds
+
+    def summary(self) -> str:
+        return (
+            f"total_read={self.total_read} total_written={self.total_written} "
+            f"total_skipped={self.total_skipped} "
+            f"total_duplicates={self.total_duplicates} "
+            f"throughput_mb_s={self.throughput_mb_s:.2f}"
+        )
+
+
+class IngestEngine:
+    def __init__(
+        self,
+        adapter: PlatformAdapter,
+        output_dir: str,
+        max_rows: int | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        columnar: bool = True,
+        part_prefix: str = "",
+        checkpoint: Callable[[IngestEngine, int | None], None] | None = None,
+        index: RecordIdIndex | None = None,
+        on_write: Callable[[pa.Table, str], None] | None = None,
+    ) -> None:
+        self.adapter = adapter
+        self.output_dir = output_dir
+        self.max_rows = max_rows
+        self.batch_size = max(1, batch_size)
+        self.columnar = columnar
+        self.part_prefix = part_prefix
+        self.checkpoint = checkpoint
+        self.index = index
+        self.on_write = on_write
+        self.stats = IngestStats()
+        self.parts: list[str] = []
+        self._file_counter = 0
+
+    def run(
+        self,
+        input_path: str,
+        start: int = 0,
+        end: int | None = None,
+        skip_rows: int = 0,
+    ) -> IngestStats:
+        started = time.perf_counter()
+        batches = iter_raw_batches(
+            Path(input_path),
+            self.batch_size,
+            max_rows=self.max_rows,
+            start=start,
+            end=end,
+            raw_schema=self.adapter.raw_schema,
+            skip_rows=skip_rows,
+        )
+        for batch in batches:
+            self.process_batch(batch)
+            if self.checkpoint is not None:
+                self.checkpoint(self, batch.end_offset)
+        self.stats.elapsed_seconds += time.perf_counter() - started
+        return self.stats
+
+    def process_batch(self, batch: RawBatch) -> None:
+        self.stats.total_read += batch.num_rows + batch.skipped
+        self.stats.total_skipped += batch.skipped
+        self.stats.bytes_read += batch.nbytes
+        if batch.num_rows == 0:
+            return
+        table = self._normalize_batch(batch.records)
+        self.stats.total_skipped += batch.num_rows - table.num_rows
+        if self.index is None:
+            self._write(table)
+            return
+        keys = record_keys(table.column("platform"), table.column("record_id"))
+        new = self.index.filter_new(keys)
+        self.stats.total_duplicates += int(len(keys) - new.sum())
+        self._write(table.filter(pa.array(new)))
+        self.index.add(keys[new])
+
+    def _normalize_batch(self, records: pa.Table | list[dict[str, Any]]) -> pa.Table:
+        if self.columnar:
+            try:
+                raw_table = records
+                if not isinstance(raw_table, pa.Table):
+                    raw_table = pa.Table.from_struct_array(pa.array(records))
+                return validate_table(self.adapter.normalize_table(raw_table))
+            except (ColumnarFallback, *ARROW_ERRORS):
+                pass
+        if isinstance(records, pa.Table):
+            records = records.to_pylist()
+        rows = [row for row in (self._validate(raw) for raw in records) if row is not None]
+        return pa.Table.from_pylist(rows, schema=INGEST_PARQUET_SCHEMA)
+
+    def _validate(self, raw: dict[str, Any]) -> dict[str, Any] | None:
+        normalized = self.adapter.normalize(raw)
+        if normalized is None:
+            return None
+        try:
+            record = Record(**normalized)
+        except Exception:
+            return None
+        if hasattr(record, "model_dump"):
+            row = record.model_dump()
+        else:
+            row = record.dict()
+        created = datetime.fromisoformat(record.created_at.replace("Z", "+00:00"))
+        row["year"] = f"{created.year:04d}"
+        row["month"] = f"{created.month:02d}"
+        return row
+
+    def _write(self, table: pa.Table) -> None:
+        if table.num_rows == 0:
+            return
+        basename_template = f"part-{self.part_prefix}{self._file_counter:05d}-{{i}}.parquet"
+        write_partitioned(
+            table,
+            self.output_dir,
+            basename_template=basename_template,
+            file_visitor=lambda written: self.parts.append(written.path),
+        )
+        if self.on_write is not None:
+            self.on_write(table, basename_template)
+        self.stats.total_written += table.num_rows
+        self._file_counter += 1
+
+
+def validate_table(table: pa.Table) -> pa.Table:
+    """Validate a normalized batch against the Parquet schema.
+
+    Batch-level counterpart of ``Record`` validation: columns are cast to
+    ``RECORD_SCHEMA``, rows missing a required field are dropped and the
+    ``year``/``month`` partition keys are sliced from ``created_at``.
+    """
+    table = table.select(RECORD_SCHEMA.names).cast(RECORD_SCHEMA)
+    valid = pc.is_valid(table.column(REQUIRED_FIELDS[0]))
+    for name in REQUIRED_FIELDS[1:]:
+        valid = pc.and_(valid, pc.is_valid(table.column(name)))
+    table = table.filter(valid)
+    created_at = table.column("created_at")
+    table = table.append_column("year", pc.utf8_slice_codeunits(created_at, 0, 4))
+    return table.append_column("month", pc.utf8_slice_codeunits(created_at, 5, 7))
+
+
+def write_partitioned(
+    table: pa.Table,
+    output_dir: str,
+    basename_template: str,
+    file_visitor: Callable[[Any], None] | None = None,
+) -> None:
+    ds.write_dataset(
+        table,
+        base_dir=output_dir,
+        format="parquet",
+        partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+        existing_data_behavior="overwrite_or_ignore",
+        basename_template=basename_template,
+        file_visitor=file_visitor,
+    )
+
+
+def run_ingest(
+    adapter: PlatformAdapter,
+    input_path: str,
+    output_dir: str,
+    max_rows: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    columnar: bool = True,
+    workers: int = 1,
+    dedup: bool = True,
+) -> IngestStats:
+    """Ingest ``input_path`` into ``output_dir``, resuming from the manifest.
+
+    Inputs already fully ingested into ``output_dir`` are skipped without
+    being read; an interrupted ingest continues from its last checkpoint.
+    ``max_rows`` caps the rows read from the inputs, counting those earlier
+    runs already read: rerunning with the same cap does nothing, and with a
+    larger cap or none continues where the capped run stopped.
+    With ``dedup``, records whose ``(platform, record_id)`` is already in the
+    dataset's ``RecordIdIndex`` are dropped and counted as duplicates.
+    A directory is ingested file by file, each with its own manifest entry.
+    Returns the counters for the work done by this call.
+    """
+    started = time.perf_counter()
+    stats = IngestStats()
+    remaining = max_rows
+    for input_file in expand_inputs(Path(input_path)):
+        if remaining is not None and remaining <= 0:
+            break
+        file_stats, rows_read = _ingest_file(
+            adapter, input_file, output_dir, remaining, batch_size, columnar, workers, dedup
+        )
+        stats.merge(file_stats)
+        if remaining is not None:
+            remaining -= rows_read
+    stats.elapsed_seconds = time.perf_counter() - started
+    print(stats.summary())
+    return stats
+
+
+def _ingest_file(
+    adapter: PlatformAdapter,
+    input_file: Path,
+    output_dir: str,
+    max_rows: int | None,
+    batch_size: int,
+    columnar: bool,
+    workers: int,
+    dedup: bool,
+) -> tuple[IngestStats, int]:
+    """Ingest one input file; returns this call's counters and the rows read by all runs."""
+    input_path = str(input_file)
+    file_format, compression = input_format(input_file)
+    # Byte-range sharding needs random access, so compressed inputs, CSV
+    # (whose quoted fields may contain newlines) and Arrow/Parquet files are
+    # ingested sequentially.
+    parallel = workers > 1 and (file_format, compression) == ("jsonl", None)
+
+    manifest = IngestManifest.load(output_dir)
+    fingerprint = fingerprint_input(input_file)
+    entry = manifest.entry(fingerprint)
+    if entry is not None and entry["complete"]:
+        print(f"skipping {input_path}: already ingested into {output_dir}")
+        return IngestStats(), manifest.rows_read(entry)
+
+    if entry is None:
+        end = None
+        if parallel:
+            end = None if max_rows is None else offset_after_rows(input_file, max_rows)
+            ranges: list[tuple[int, int | None]] = list(
+                plan_byte_ranges(input_file, workers, end=end)
+            )
+        else:
+            ranges = [(0, None)]
+        entry = manifest.add_entry(fingerprint, input_file, adapter.platform, ranges, end)
+    else:
+        removed = manifest.discard_orphans(entry)
+        print(f"resuming {input_path}: removed {removed} uncheckpointed part files")
+        if entry.get("end") is not None:
+            # The ranges stop where an earlier --max-rows cap ended; plan the
+            # bytes this run's cap (or the end of the file) adds.
+            end = None if max_rows is None else offset_after_rows(input_file, max_rows)
+            if end is None or end > entry["end"]:
+                ranges = plan_byte_ranges(input_file, workers, end=end, start=entry["end"])
+                manifest.extend_ranges(entry, list(ranges), end)
+        # Workers only take byte-bounded ranges; an open-ended one is read
+        # sequentially so the cap applies to it.
+        parallel = parallel and all(
+            item["end"] is not None for item in entry["ranges"] if not item["done"]
+        )
+    run = manifest.start_run(entry)
+    manifest.save()
+
+    index = RecordIdIndex.open(output_dir) if dedup else None
+    options = (adapter, input_path, output_dir, batch_size, columnar, run)
+    if parallel:
+        stats = _run_ranges_parallel(manifest, entry, options, workers, index)
+    else:
+        remaining = None if max_rows is None else max_rows - manifest.rows_read(entry)
+        stats = _run_ranges_sequential(manifest, entry, options, file_format, index, remaining)
+    # Complete only once the input was read to its end, not merely up to a cap.
+    manifest.finish_run(
+        entry,
+        complete=all(item["done"] for item in entry["ranges"])
+        and (entry.get("end") is None or entry["end"] >= input_file.stat().st_size),
+    )
+    manifest.save()
+    return stats, manifest.rows_read(entry)
+
+
+def _run_ranges_sequential(
+    manifest: IngestManifest,
+    entry: dict[str, Any],
+    options: tuple[PlatformAdapter, str, str, int, bool, int],
+    file_format: str,
+    index: RecordIdIndex | None,
+    max_rows: int | None,
+) -> IngestStats:
+    """Ingest pending ranges in order, reading at most ``max_rows`` rows.
+
+    A range is done once it was read to its end; one stopped by ``max_rows``
+    keeps its offset so a later run continues from there.
+    """
+    adapter, input_path, output_dir, batch_size, columnar, run = options
+    stats = IngestStats()
+    for range_index, item in enumerate(entry["ranges"]):
+        if item["done"]:
+            continue
+        if max_rows is not None and max_rows <= 0:
+            break
+        previous = IngestStats.from_dict(item["stats"])
+        previous_parts = list(item["parts"])
+
+        def checkpoint(engine: IngestEngine, end_offset: int | None) -> None:
+            merged = IngestStats.from_dict(previous.to_dict())
+            merged.merge(engine.stats)
+            item["stats"] = merged.to_dict()
+            item["parts"] = previous_parts + manifest.relative_parts(engine.parts)
+            if end_offset is not None:
+                item["offset"] = end_offset
+            manifest.save()
+            if index is not None:
+                index.flush()
+
+        engine = IngestEngine(
+            adapter,
+            output_dir,
+            max_rows=max_rows,
+            batch_size=batch_size,
+            columnar=columnar,
+            part_prefix=range_part_prefix(run, range_index),
+            checkpoint=checkpoint,
+            index=index,
+        )
+        skip_rows = previous.total_read if file_format != "jsonl" else 0
+        range_stats = engine.run(
+            input_path, start=item["offset"], end=item["end"], skip_rows=skip_rows
+        )
+        stats.merge(range_stats)
+        if max_rows is not None:
+            max_rows -= range_stats.total_read
+            if max_rows <= 0:
+                # Stopped by the cap, which may or may not be the range end;
+                # a later run without one finds out.
+                break
+        item["done"] = True
+        manifest.save()
+    return stats
+
+
+def _run_ranges_parallel(
+    manifest: IngestManifest,
+    entry: dict[str, Any],
+    options: tuple[PlatformAdapter, str, str, int, bool, int],
+    workers: int,
+    index: RecordIdIndex | None,
+) -> IngestStats:
+    """Ingest pending byte ranges of a JSONL file in worker processes.
+
+    ``max_rows`` was resolved to a byte offset when the ranges were planned,
+    so sequential and parallel modes ingest the same records. Each range
+    writes part files under its own prefix, so workers never collide on file
+    names; a range is checkpointed once its worker finishes.
+
+    Workers deduplicate against a read-only snapshot of the index plus the
+    keys of their own range. Duplicates that span two ranges of the same run
+    are found when the parent merges a finished range's keys into the index:
+    the parent rewrites that range's part files without them before the
+    range is checkpointed, so the copy of whichever range finished first is
+    kept and the others count as duplicates.
+    """
+    adapter, input_path, output_dir, batch_size, columnar, run = options
+    stats = IngestStats()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _ingest_range,
+                adapter,
+                input_path,
+                output_dir,
+                item["offset"],
+                item["end"],
+                range_part_prefix(run, range_index),
+                batch_size,
+                columnar,
+                index is not None,
+            ): item
+            for range_index, item in enumerate(entry["ranges"])
+            if not item["done"]
+        }
+        for future in as_completed(futures):
+            item = futures[future]
+            range_stats, parts, keys = future.result()
+            if index is not None:
+                new = index.filter_new(keys)
+                if not new.all():
+                    parts, dropped = _drop_records(parts, output_dir, keys[~new])
+                    range_stats.total_written -= dropped
+                    range_stats.total_duplicates += dropped
+            stats.merge(range_stats)
+            merged = IngestStats.from_dict(item["stats"])
+            merged.merge(range_stats)
+            item["stats"] = merged.to_dict()
+            item["parts"] = item["parts"] + manifest.relative_parts(parts)
+            item["offset"] = item["end"]
+            item["done"] = True
+            manifest.save()
+            if index is not None:
+                index.add(keys[new])
+                index.flush()
+    return stats
+
+
+def _drop_records(parts: list[str], output_dir: str, keys: np.ndarray) -> tuple[list[str], int]:
+    """Rewrite ``parts`` without the records whose key is in ``keys``.
+
+    Returns the part files still holding records and the number of records
+    dropped. ``platform`` is a partition key, so it is read from the path.
+    """
+    partitioning = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+    kept: list[str] = []
+    dropped = 0
+    for part in parts:
+        path = Path(part)
+        relative = path.parent.relative_to(output_dir).as_posix()
+        platform = ds.get_partition_keys(partitioning.parse(f"/{relative}"))["platform"]
+        table = pq.read_table(path, partitioning=None)
+        part_keys = record_keys(pa.repeat(platform, table.num_rows), table.column("record_id"))
+        duplicate = np.isin(part_keys, keys)
+        if not duplicate.any():
+            kept.append(part)
+            continue
+        dropped += int(duplicate.sum())
+        if duplicate.all():
+            path.unlink()
+            continue
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        pq.write_table(table.filter(pa.array(~duplicate)), tmp_path)
+        os.replace(tmp_path, path)
+        kept.append(part)
+    return kept, dropped
+
+
+def _ingest_range(
+    adapter: PlatformAdapter,
+    input_path: str,
+    output_dir: str,
+    start: int,
+    end: int | None,
+    prefix: str,
+    batch_size: int,
+    columnar: bool,
+    dedup: bool,
+) -> tuple[IngestStats, list[str], np.ndarray]:
+    index = RecordIdIndex.open(output_dir, readonly=True) if dedup else None
+    engine = IngestEngine(
+        adapter,
+        output_dir,
+        batch_size=batch_size,
+        columnar=columnar,
+        part_prefix=prefix,
+        index=index,
+    )
+    stats = engine.run(input_path, start=start, end=end)
+    keys = index.buffered_keys() if index is not None else np.empty(0, dtype=np.uint64)
+    return stats, engine.parts, keys
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+
+MANIFEST_NAME = "_ingest_manifest.json"
+MANIFEST_VERSION = 1
+FINGERPRINT_SAMPLE_BYTES = 1 << 20
+
+
+def fingerprint_input(input_file: Path) -> str:
+    """Identify an input by its size and first/last megabyte of content.
+
+    Cheap enough to run on every invocation without reading whole dumps, and
+    independent of the file's path or modification time.
+    """
+    size = input_file.stat().st_size
+    digest = hashlib.sha256(str(size).encode("utf-8"))
+    with input_file.open("rb") as handle:
+        digest.update(handle.read(FINGERPRINT_SAMPLE_BYTES))
+        if size > FINGERPRINT_SAMPLE_BYTES:
+            handle.seek(max(FINGERPRINT_SAMPLE_BYTES, size - FINGERPRINT_SAMPLE_BYTES))
+            digest.update(handle.read())
+    return digest.hexdigest()
+
+
+def part_pattern(run: int) -> str:
+    return f"part-r{run:05d}-*.parquet"
+
+
+def range_part_prefix(run: int, range_index: int) -> str:
+    return f"r{run:05d}-s{range_index:05d}-"
+
+
+class IngestManifest:
+    """Checkpoint state of an ingest output directory.
+
+    The manifest lives next to the hive-partitioned data (the leading
+    underscore keeps it out of ``pyarrow.dataset`` scans). Each input file is
+    keyed by its fingerprint and records the byte ranges it was split into,
+    how far each range has been ingested, the part files written and the
+    counters, so an interrupted or ``--max-rows`` capped ingest resumes where
+    it stopped and a completed input (one read to its end) is never read
+    again.
+    """
+
+    def __init__(self, output_dir: Path, data: dict[str, Any]) -> None:
+        self.output_dir = output_dir
+        self.data = data
+
+    @classmethod
+    def load(cls, output_dir: str | Path) -> IngestManifest:
+        output_path = Path(output_dir)
+        manifest_path = output_path / MANIFEST_NAME
+        if manifest_path.exists():
+            with manifest_path.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        else:
+            data = {"version": MANIFEST_VERSION, "next_run": 0, "inputs": {}}
+        return cls(output_path, data)
+
+    def save(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.output_dir / MANIFEST_NAME
+        tmp_path = manifest_path.with_suffix(".json.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(self.data, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+    def entry(self, fingerprint: str) -> dict[str, Any] | None:
+        return self.data["inputs"].get(fingerprint)
+
+    def add_entry(
+        self,
+        fingerprint: str,
+        input_file: Path,
+        platform: str,
+        ranges: list[tuple[int, int | None]],
+        end: int | None = None,
+    ) -> dict[str, Any]:
+        """Record a new input whose byte ranges cover ``input_file[:end]``.
+
+        ``end`` is ``None`` when the ranges reach the end of the file; a
+        ``--max-rows`` cap plans them only up to the byte after its last row,
+        and ``extend_ranges`` adds the rest when a later run asks for more.
+        """
+        entry = {
+            "path": str(input_file),
+            "platform": platform,
+            "end": end,
+            "complete": False,
+            "runs": [],
+            "ranges": [],
+        }
+        self.extend_ranges(entry, ranges, end)
+        self.data["inputs"][fingerprint] = entry
+        return entry
+
+    def extend_ranges(
+        self, entry: dict[str, Any], ranges: list[tuple[int, int | None]], end: int | None
+    ) -> None:
+        entry["ranges"].extend(
+            {
+                "start": start,
+                "end": range_end,
+                "offset": start,
+                "done": False,
+                "parts": [],
+                "stats": {},
+            }
+            for start, range_end in ranges
+        )
+        entry["end"] = end
+
+    @staticmethod
+    def rows_read(entry: dict[str, Any]) -> int:
+        """Rows of the input read by every run so far, across its ranges."""
+        return sum(int(item["stats"].get("total_read", 0)) for item in entry["ranges"])
+
+    def reserve_run(self) -> int:
+        """Allocate a run number, which keeps part file names unique."""
+        run = int(self.data["next_run"])
+        self.data["next_run"] = run + 1
+        return run
+
+    def start_run(self, entry: dict[str, Any]) -> int:
+        """Allocate a run for ``entry``, which stays ``running`` until ``finish_run``."""
+        run = self.reserve_run()
+        entry["runs"].append(run)
+        entry["running"] = True
+        return run
+
+    def finish_run(self, entry: dict[str, Any], complete: bool) -> None:
+        entry["complete"] = complete
+        entry["running"] = False
+
+    @staticmethod
+    def interrupted(entry: dict[str, Any]) -> bool:
+        """Whether a run of ``entry`` stopped without finishing.
+
+        Its part files after the last checkpoint are not recorded yet. A
+        ``--max-rows`` capped run finishes cleanly but leaves the entry
+        incomplete; manifests without the flag only knew ``complete``.
+        """
+        return bool(entry.get("running", not entry["complete"]))
+
+    def discard_orphans(self, entry: dict[str, Any]) -> int:
+        """Delete part files of earlier runs that no checkpoint recorded.
+
+        These are batches written after the last checkpoint of an interrupted
+        run; they will be ingested again, so keeping them would duplicate
+        rows.
+        """
+        recorded = {part for item in entry["ranges"] for part in item["parts"]}
+        removed = 0
+        for run in entry["runs"]:
+            for path in self.output_dir.rglob(part_pattern(run)):
+                if path.relative_to(self.output_dir).as_posix() not in recorded:
+                    path.unlink()
+                    removed += 1
+        return removed
+
+    def relative_parts(self, paths: list[str]) -> list[str]:
+        return [
+            Path(path).resolve().relative_to(self.output_dir.resolve()).as_posix()
+            for path in paths
+        ]
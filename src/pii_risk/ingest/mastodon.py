@@ -5,122 +5,148 @@ import json
 import re
 from datetime import datetime, timezone
 from html import unescape
-from pathlib import Path
-from typing import Any, Iterable
+from typing import Any
 from urllib.parse import urlparse
 
-import pandas as pd
 import pyarrow as pa
-import pyarrow.dataset as ds
-
-from pii_risk.schema import Record
+import pyarrow.compute as pc
+
+from pii_risk.ingest.columnar import (
+    ColumnarFallback,
+    as_string,
+    collapse_whitespace,
+    column,
+    hash_authors,
+    iso_strings_to_iso,
+    map_unique,
+    null_if_empty,
+    url_netloc,
+)
+from pii_risk.ingest.engine import (
+    INGEST_PARQUET_SCHEMA,
+    IngestStats,
+    PlatformAdapter,
+    run_ingest,
+)
+from pii_risk.ingest.stream import (
+    DEFAULT_MICRO_BATCH_ROWS,
+    DEFAULT_MICRO_BATCH_SECONDS,
+    open_event_source,
+    run_stream_ingest,
+)
 
 
 HTML_TAG_RE = re.compile(r"<[^>]+>")
-MASTODON_PARQUET_SCHEMA = pa.schema(
-    [
-        ("platform", pa.string()),
-        ("record_type", pa.string()),
-        ("record_id", pa.string()),
-        ("author_id_hash", pa.string()),
-        ("created_at", pa.string()),
-        ("text", pa.string()),
-        ("community", pa.string()),
-        ("parent_record_id", pa.string()),
-        ("thread_id", pa.string()),
-        ("year", pa.string()),
-        ("month", pa.string()),
-    ]
-)
+ACCOUNT_KEYS = ("id", "acct", "username")
+MASTODON_PARQUET_SCHEMA = INGEST_PARQUET_SCHEMA
+
+
+class MastodonAdapter(PlatformAdapter):
+    platform = "mastodon"
+    raw_schema = pa.schema(
+        [
+            (name, pa.string())
+            for name in (
+                "id",
+                "created_at",
+                "created_at_utc",
+                "content",
+                "text",
+                "uri",
+                "url",
+                "in_reply_to_id",
+                "conversation_id",
+            )
+        ]
+    )
 
+    def __init__(self, default_created_at: str | None = None) -> None:
+        # Some exports (e.g. Hugging Face datasets) carry no timestamps; a
+        # default keeps those posts instead of rejecting every row.
+        if default_created_at is not None and _created_at_iso(default_created_at) is None:
+            raise ValueError(f"Invalid default created_at: {default_created_at!r}")
+        self.default_created_at = default_created_at
+
+    def normalize(self, raw: dict[str, Any]) -> dict[str, Any] | None:
+        if self.default_created_at is not None and raw.get("created_at") in (None, ""):
+            if raw.get("created_at_utc") in (None, ""):
+                raw = {**raw, "created_at": self.default_created_at}
+        return _normalize_record(raw)
+
+    def normalize_table(self, table: pa.Table) -> pa.Table:
+        created_at = pc.coalesce(
+            null_if_empty(as_string(column(table, "created_at"), allow_cast=False)),
+            null_if_empty(as_string(column(table, "created_at_utc"), allow_cast=False)),
+        )
+        if self.default_created_at is not None:
+            created_at = pc.coalesce(created_at, self.default_created_at)
+        selected_text = pc.coalesce(
+            null_if_empty(as_string(column(table, "content"), allow_cast=False)),
+            null_if_empty(as_string(column(table, "text"), allow_cast=False)),
+        )
 
-def ingest_mastodon(input_path: str, output_dir: str, max_rows: int | None = None) -> None:
-    input_file = Path(input_path)
-    suffix = input_file.suffix.lower()
-    total_read = 0
-    total_written = 0
-    total_skipped = 0
-    file_counter = 0
-
-    def process_records(records: Iterable[dict[str, Any]]) -> None:
-        nonlocal total_read, total_written, total_skipped, file_counter
-        rows: list[dict[str, Any]] = []
-        for raw in records:
-            if max_rows is not None and total_read >= max_rows:
-                break
-            total_read += 1
-            normalized = _normalize_record(raw)
-            if normalized is None:
-                total_skipped += 1
-                continue
-            try:
-                record = Record(**normalized)
-            except Exception:
-                total_skipped += 1
-                continue
-            if hasattr(record, "model_dump"):
-                row = record.model_dump()
-            else:
-                row = record.dict()
-            created = datetime.fromisoformat(record.created_at.replace("Z", "+00:00"))
-            row["year"] = f"{created.year:04d}"
-            row["month"] = f"{created.month:02d}"
-            rows.append(row)
-
-        if not rows:
-            return
-
-        table = pa.Table.from_pylist(rows, schema=MASTODON_PARQUET_SCHEMA)
-        ds.write_dataset(
-            table,
-            base_dir=output_dir,
-            format="parquet",
-            partitioning=ds.partitioning(
-                pa.schema(
-                    [
-                        ("platform", pa.string()),
-                        ("record_type", pa.string()),
-                        ("year", pa.string()),
-                        ("month", pa.string()),
-                    ]
+        return pa.table(
+            {
+                "platform": pa.repeat(self.platform, table.num_rows),
+                "record_type": pa.repeat("post", table.num_rows),
+                "record_id": as_string(column(table, "id")),
+                "author_id_hash": hash_authors(_account_identifiers(table)),
+                "created_at": iso_strings_to_iso(created_at, _created_at_iso),
+                "community": pc.coalesce(
+                    url_netloc(column(table, "uri")), url_netloc(column(table, "url"))
                 ),
-                flavor="hive",
-            ),
-            existing_data_behavior="overwrite_or_ignore",
-            basename_template=f"part-{file_counter:03d}-{{i}}.parquet",
+                "parent_record_id": null_if_empty(as_string(column(table, "in_reply_to_id"))),
+                "thread_id": null_if_empty(as_string(column(table, "conversation_id"))),
+                "text": _normalize_text_column(selected_text),
+            }
         )
-        total_written += len(rows)
-        file_counter += 1
-
-    if suffix == ".csv":
-        for chunk in pd.read_csv(input_file, chunksize=1000, keep_default_na=False):
-            records = chunk.to_dict(orient="records")
-            process_records(records)
-            if max_rows is not None and total_read >= max_rows:
-                break
-    elif suffix == ".jsonl":
-        with input_file.open("r", encoding="utf-8") as handle:
-            for line in handle:
-                if max_rows is not None and total_read >= max_rows:
-                    break
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    raw = json.loads(line)
-                except json.JSONDecodeError:
-                    total_read += 1
-                    total_skipped += 1
-                    continue
-                process_records([raw])
-    else:
-        raise ValueError("Unsupported input format. Use .jsonl or .csv")
-
-    print(
-        f"total_read={total_read} total_written={total_written} total_skipped={total_skipped}"
+
+
+def ingest_mastodon(
+    input_path: str,
+    output_dir: str,
+    max_rows: int | None = None,
+    workers: int = 1,
+    dedup: bool = True,
+    default_created_at: str | None = None,
+) -> IngestStats:
+    return run_ingest(
+        MastodonAdapter(default_created_at),
+        input_path,
+        output_dir,
+        max_rows=max_rows,
+        workers=workers,
+        dedup=dedup,
     )
 
 
+def ingest_mastodon_stream(
+    source: str,
+    output_dir: str,
+    batch_rows: int = DEFAULT_MICRO_BATCH_ROWS,
+    batch_seconds: float = DEFAULT_MICRO_BATCH_SECONDS,
+    max_rows: int | None = None,
+    dedup: bool = True,
+    default_created_at: str | None = None,
+    score_dir: str | None = None,
+    models_dir: str = "models",
+) -> IngestStats:
+    """Ingest a live stream of status events, see ``run_stream_ingest``."""
+    adapter = MastodonAdapter(default_created_at)
+    with open_event_source(source) as handle:
+        return run_stream_ingest(
+            adapter,
+            handle,
+            output_dir,
+            batch_rows=batch_rows,
+            batch_seconds=batch_seconds,
+            max_rows=max_rows,
+            dedup=dedup,
+            score_dir=score_dir,
+            models_dir=models_dir,
+        )
+
+
 def _normalize_record(raw: dict[str, Any]) -> dict[str, Any] | None:
     record_id = raw.get("id")
     created_at = raw.get("created_at") or raw.get("created_at_utc")
@@ -167,7 +193,7 @@ def _extract_account_identifier(raw: dict[str, Any]) -> str:
     account_data = _parse_maybe_json(account)
 
     if isinstance(account_data, dict):
-        for key in ("id", "acct", "username"):
+        for key in ACCOUNT_KEYS:
             value = account_data.get(key)
             if value not in (None, ""):
                 return str(value)
@@ -236,3 +262,48 @@ def _normalize_text(content: Any) -> str:
         text = unescape(text)
     text = " ".join(text.split())
     return text.strip()
+
+
+def _account_identifiers(table: pa.Table) -> pa.ChunkedArray:
+    candidates: list[pa.ChunkedArray] = []
+    if "account" in table.column_names:
+        account = table.column("account")
+        if pa.types.is_struct(account.type):
+            for key in ACCOUNT_KEYS:
+                if account.type.get_field_index(key) >= 0:
+                    field = pc.struct_field(account, key)
+                    candidates.append(null_if_empty(as_string(field)))
+        elif pa.types.is_string(account.type) or pa.types.is_large_string(account.type):
+            candidates.append(map_unique(account, _account_identifier_from_json))
+        elif not pa.types.is_null(account.type):
+            raise ColumnarFallback(f"cannot vectorize account of type {account.type}")
+    for key in ("account.id", "account.acct", "account.username"):
+        if key in table.column_names:
+            candidates.append(null_if_empty(as_string(table.column(key))))
+    if not candidates:
+        return pa.chunked_array([pa.nulls(table.num_rows, pa.string())])
+    return pc.coalesce(*candidates)
+
+
+def _account_identifier_from_json(value: Any) -> str | None:
+    account_data = _parse_maybe_json(value)
+    if isinstance(account_data, dict):
+        for key in ACCOUNT_KEYS:
+            found = account_data.get(key)
+            if found not in (None, ""):
+                return str(found)
+    return None
+
+
+def _normalize_text_column(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    has_markup = pc.and_(pc.match_substring(values, "<"), pc.match_substring(values, ">"))
+    text = pc.if_else(
+        has_markup, pc.replace_substring_regex(values, HTML_TAG_RE.pattern, " "), values
+    )
+    needs_unescape = pc.fill_null(pc.and_(has_markup, pc.match_substring(text, "&")), False)
+    if pc.any(needs_unescape).as_py():
+        unescaped = map_unique(pc.filter(text, needs_unescape), unescape)
+        text = pc.replace_with_mask(
+            text.combine_chunks(), needs_unescape.combine_chunks(), unescaped.combine_chunks()
+        )
+    return collapse_whitespace(text)
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import bz2
+import csv
+import gzip
+import io
+import lzma
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+
+from pii_risk.ingest.columnar import ARROW_ERRORS
+from pii_risk.json_codec import loads
+
+
+CSV_BLOCK_SIZE = 16 << 20
+COMPRESSION_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+TEXT_FORMATS = ("jsonl", "csv")
+COLUMNAR_FORMATS = ("arrow", "parquet")
+ZSTD_MAX_WINDOW_SIZE = 2**31
+
+
+@dataclass
+class RawBatch:
+    """A block of decoded source rows plus the lines that failed to decode."""
+
+    records: pa.Table | list[dict[str, Any]]
+    skipped: int = 0
+    nbytes: int = 0
+    end_offset: int | None = None
+
+    @property
+    def num_rows(self) -> int:
+        if isinstance(self.records, pa.Table):
+            return self.records.num_rows
+        return len(self.records)
+
+
+def input_format(input_file: Path) -> tuple[str, str | None]:
+    """Return ``(format, compression)`` for ``input_file``.
+
+    ``data.jsonl.gz`` is ``("jsonl", ".gz")``; a bare ``.zst`` archive (the
+    Pushshift convention) is treated as compressed JSONL. ``.arrow`` files
+    (Arrow IPC, as in ``datasets`` caches) and ``.parquet`` files are read
+    uncompressed.
+    """
+    suffixes = [suffix.lower() for suffix in input_file.suffixes]
+    compression = None
+    if suffixes and suffixes[-1] in COMPRESSION_SUFFIXES:
+        compression = suffixes.pop()
+    file_format = suffixes[-1].lstrip(".") if suffixes else ""
+    if compression == ".zst" and file_format not in TEXT_FORMATS:
+        file_format = "jsonl"
+    if compression is None and file_format in COLUMNAR_FORMATS:
+        return file_format, None
+    if file_format not in TEXT_FORMATS:
+        raise ValueError(
+            "Unsupported input format. Use .jsonl or .csv, optionally compressed "
+            "with .gz, .bz2, .xz or .zst, or an .arrow or .parquet file"
+        )
+    return file_format, compression
+
+
+def expand_inputs(input_path: Path) -> list[Path]:
+    """Return the ingestible files under ``input_path``, or ``input_path`` itself.
+
+    A directory such as a ``datasets`` cache or ``save_to_disk`` folder
+    expands to its supported files in name order; hidden files and
+    underscore-prefixed metadata are ignored.
+    """
+    if not input_path.is_dir():
+        return [input_path]
+    files = []
+    for path in sorted(input_path.iterdir()):
+        if not path.is_file() or path.name.startswith((".", "_")):
+            continue
+        try:
+            input_format(path)
+        except ValueError:
+            continue
+        files.append(path)
+    if not files:
+        raise ValueError(f"No supported input files in {input_path}")
+    return files
+
+
+def open_input(input_file: Path) -> IO[bytes]:
+    """Open ``input_file`` as a binary stream, decompressing on the fly."""
+    _, compression = input_format(input_file)
+    if compression == ".gz":
+        return gzip.open(input_file, "rb")
+    if compression == ".bz2":
+        return bz2.open(input_file, "rb")
+    if compression == ".xz":
+        return lzma.open(input_file, "rb")
+    if compression == ".zst":
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise ValueError("Reading .zst input requires the zstandard package.") from exc
+        decompressor = zstandard.ZstdDecompressor(max_window_size=ZSTD_MAX_WINDOW_SIZE)
+        return io.BufferedReader(decompressor.stream_reader(input_file.open("rb")))
+    return input_file.open("rb")
+
+
+def iter_raw_batches(
+    input_file: Path,
+    batch_size: int,
+    max_rows: int | None = None,
+    start: int = 0,
+    end: int | None = None,
+    raw_schema: pa.Schema | None = None,
+    skip_rows: int = 0,
+    csv_block_size: int = CSV_BLOCK_SIZE,
+) -> Iterator[RawBatch]:
+    """Yield blocks of at most ``batch_size`` rows from ``input_file``.
+
+    At most ``max_rows`` non-blank lines are consumed, undecodable ones
+    included. For JSONL, ``start``/``end`` restrict reading to a
+    newline-aligned byte range (offsets into the decompressed stream for
+    compressed input) and each batch reports the offset it stopped at. CSV,
+    Arrow and Parquet input have no stable byte offsets and are resumed with
+    ``skip_rows``; CSV is parsed in blocks of ``csv_block_size`` bytes.
+    """
+    file_format, _ = input_format(input_file)
+    if file_format == "csv":
+        yield from _iter_csv_batches(input_file, batch_size, max_rows, skip_rows, csv_block_size)
+        return
+    if file_format in COLUMNAR_FORMATS:
+        batches = (
+            (record_batch, record_batch.nbytes)
+            for record_batch in _iter_record_batches(input_file, file_format, batch_size)
+        )
+        yield from _rebatch(batches, batch_size, max_rows, skip_rows)
+        return
+
+    with open_input(input_file) as handle:
+        if start:
+            handle.seek(start)
+        position = start
+        consumed = 0
+        lines: list[bytes] = []
+        nbytes = 0
+        for raw_line in handle:
+            if end is not None and position >= end:
+                break
+            if max_rows is not None and consumed >= max_rows:
+                break
+            position += len(raw_line)
+            nbytes += len(raw_line)
+            line = raw_line.strip()
+            if not line:
+                continue
+            consumed += 1
+            lines.append(line)
+            if len(lines) >= batch_size:
+                yield _decode_block(lines, nbytes, position, raw_schema)
+                lines = []
+                nbytes = 0
+        if lines or nbytes:
+            yield _decode_block(lines, nbytes, position, raw_schema)
+
+
+def _decode_block(
+    lines: list[bytes], nbytes: int, end_offset: int, raw_schema: pa.Schema | None
+) -> RawBatch:
+    """Decode a block of JSON lines with Arrow, falling back line by line.
+
+    ``pyarrow.json`` parses the whole block in one call. If any line is
+    malformed, or types conflict within the block, each line is decoded
+    separately so that only the bad lines are counted as skipped.
+    """
+    if not lines:
+        return RawBatch(records=[], nbytes=nbytes, end_offset=end_offset)
+    data = b"\n".join(lines)
+    parse_options = pa_json.ParseOptions(
+        explicit_schema=raw_schema, unexpected_field_behavior="infer"
+    )
+    read_options = pa_json.ReadOptions(block_size=max(len(data) + 1, 1 << 20))
+    try:
+        table = pa_json.read_json(
+            io.BytesIO(data), read_options=read_options, parse_options=parse_options
+        )
+    except ARROW_ERRORS:
+        table = None
+    if table is not None and table.num_rows == len(lines):
+        return RawBatch(records=table, nbytes=nbytes, end_offset=end_offset)
+
+    records: list[dict[str, Any]] = []
+    skipped = 0
+    for line in lines:
+        try:
+            decoded = loads(line)
+        except ValueError:
+            skipped += 1
+            continue
+        if not isinstance(decoded, dict):
+            skipped += 1
+            continue
+        records.append(decoded)
+    return RawBatch(
+        records=records, skipped=skipped, nbytes=nbytes, end_offset=end_offset
+    )
+
+
+def _iter_record_batches(
+    input_file: Path, file_format: str, batch_size: int
+) -> Iterator[pa.RecordBatch]:
+    """Yield the record batches of an Arrow or Parquet file.
+
+    Both are memory-mapped, so batches reference the page cache rather than
+    copies: a ``datasets`` cache is read without decoding or re-serializing a
+    single value.
+    """
+    if file_format == "parquet":
+        parquet_file = pq.ParquetFile(input_file, memory_map=True)
+        yield from parquet_file.iter_batches(batch_size=batch_size)
+        return
+    with pa.memory_map(str(input_file), "r") as source:
+        try:
+            reader = pa.ipc.open_file(source)
+        except pa.ArrowInvalid:
+            # ``datasets`` writes its cache in the IPC streaming format.
+            source.seek(0)
+            yield from pa.ipc.open_stream(source)
+            return
+        for index in range(reader.num_record_batches):
+            yield reader.get_batch(index)
+
+
+def _rebatch(
+    batches: Iterator[tuple[pa.RecordBatch, int]],
+    batch_size: int,
+    max_rows: int | None,
+    skip_rows: int,
+    skipped: Callable[[], int] | None = None,
+) -> Iterator[RawBatch]:
+    """Regroup ``(record_batch, source_bytes)`` pairs into ``batch_size`` tables.
+
+    Only slices are taken, so no row data is copied here. ``skipped``
+    reports the running count of source rows the reader had to drop; each
+    yielded batch carries the rows dropped since the previous one.
+    """
+    consumed = 0
+    to_skip = skip_rows
+    pending: list[pa.RecordBatch] = []
+    pending_rows = 0
+    pending_bytes = 0
+    reported_skips = 0
+
+    def emit() -> RawBatch:
+        nonlocal reported_skips
+        total_skips = skipped() if skipped is not None else 0
+        table = pa.Table.from_batches(pending) if pending else []
+        batch = RawBatch(
+            records=table, skipped=total_skips - reported_skips, nbytes=pending_bytes
+        )
+        reported_skips = total_skips
+        return batch
+
+    for record_batch, nbytes in batches:
+        pending_bytes += nbytes
+        if to_skip and skipped is not None:
+            # ``skip_rows`` counts dropped rows too; those met while skipping
+            # were already reported by the run being resumed.
+            absorbed = min(to_skip, skipped() - reported_skips)
+            to_skip -= absorbed
+            reported_skips += absorbed
+        if to_skip:
+            dropped = min(to_skip, record_batch.num_rows)
+            record_batch = record_batch.slice(dropped)
+            to_skip -= dropped
+        if max_rows is not None:
+            record_batch = record_batch.slice(0, max_rows - consumed)
+        consumed += record_batch.num_rows
+        offset = 0
+        while offset < record_batch.num_rows:
+            piece = record_batch.slice(offset, batch_size - pending_rows)
+            pending.append(piece)
+            pending_rows += piece.num_rows
+            offset += piece.num_rows
+            if pending_rows == batch_size:
+                yield emit()
+                pending, pending_rows, pending_bytes = [], 0, 0
+        if max_rows is not None and consumed >= max_rows:
+            break
+    if pending or pending_bytes:
+        yield emit()
+
+
+def _iter_csv_batches(
+    input_file: Path,
+    batch_size: int,
+    max_rows: int | None,
+    skip_rows: int,
+    block_size: int,
+) -> Iterator[RawBatch]:
+    """Stream a CSV file through Arrow's incremental reader.
+
+    Every column is read as a string with empty cells kept as ``""`` (what
+    the adapters expect from CSV), so types never have to be inferred from
+    the first block. Rows with the wrong number of fields are dropped and
+    counted as skipped.
+    """
+    column_names = _csv_column_names(input_file)
+    if not column_names:
+        return
+    invalid_rows = 0
+
+    def skip_invalid_row(row: pa_csv.InvalidRow) -> str:
+        nonlocal invalid_rows
+        invalid_rows += 1
+        return "skip"
+
+    with open_input(input_file) as handle:
+        reader = pa_csv.open_csv(
+            handle,
+            read_options=pa_csv.ReadOptions(block_size=block_size),
+            parse_options=pa_csv.ParseOptions(
+                newlines_in_values=True, invalid_row_handler=skip_invalid_row
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in column_names},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+
+        def with_bytes() -> Iterator[tuple[pa.RecordBatch, int]]:
+            # The reader reads ahead, so offsets are block-accurate only.
+            position = 0
+            for record_batch in reader:
+                offset = handle.tell()
+                yield record_batch, offset - position
+                position = offset
+
+        yield from _rebatch(with_bytes(), batch_size, max_rows, skip_rows, lambda: invalid_rows)
+
+
+def _csv_column_names(input_file: Path) -> list[str]:
+    with open_input(input_file) as handle:
+        text = io.TextIOWrapper(handle, encoding="utf-8", newline="")
+        return next(csv.reader(text), [])
@@ -1,102 +1,81 @@
 from __future__ import annotations
 
 import hashlib
-import json
 from datetime import datetime, timezone
-from pathlib import Path
-from typing import Any, Iterable
+from typing import Any
 
-import pandas as pd
 import pyarrow as pa
-import pyarrow.dataset as ds
-
-from pii_risk.schema import Record
-
-
-def ingest_reddit(input_path: str, output_dir: str, max_rows: int | None = None) -> None:
-    input_file = Path(input_path)
-    suffix = input_file.suffix.lower()
-    total_read = 0
-    total_written = 0
-    total_skipped = 0
-    file_counter = 0
-
-    def process_records(records: Iterable[dict[str, Any]]) -> None:
-        nonlocal total_read, total_written, total_skipped, file_counter
-        rows: list[dict[str, Any]] = []
-        for raw in records:
-            if max_rows is not None and total_read >= max_rows:
-                break
-            total_read += 1
-            normalized = _normalize_record(raw)
-            if normalized is None:
-                total_skipped += 1
-                continue
-            try:
-                record = Record(**normalized)
-            except Exception:
-                total_skipped += 1
-                continue
-            if hasattr(record, "model_dump"):
-                row = record.model_dump()
-            else:
-                row = record.dict()
-            created = datetime.fromisoformat(record.created_at.replace("Z", "+00:00"))
-            row["year"] = f"{created.year:04d}"
-            row["month"] = f"{created.month:02d}"
-            rows.append(row)
-
-        if not rows:
-            return
-
-        table = pa.Table.from_pylist(rows)
-        ds.write_dataset(
-            table,
-            base_dir=output_dir,
-            format="parquet",
-            partitioning=ds.partitioning(
-                pa.schema(
-                    [
-                        ("platform", pa.string()),
-                        ("record_type", pa.string()),
-                        ("year", pa.string()),
-                        ("month", pa.string()),
-                    ]
+import pyarrow.compute as pc
+
+from pii_risk.ingest.columnar import (
+    as_string,
+    column,
+    epoch_seconds_to_iso,
+    hash_authors,
+    null_if_empty,
+    strip_whitespace,
+)
+from pii_risk.ingest.engine import IngestStats, PlatformAdapter, run_ingest
+
+
+class RedditAdapter(PlatformAdapter):
+    platform = "reddit"
+    raw_schema = pa.schema(
+        [
+            (name, pa.string())
+            for name in (
+                "id",
+                "author",
+                "subreddit",
+                "title",
+                "selftext",
+                "body",
+                "parent_id",
+                "link_id",
+            )
+        ]
+    )
+
+    def normalize(self, raw: dict[str, Any]) -> dict[str, Any] | None:
+        return _normalize_record(raw)
+
+    def normalize_table(self, table: pa.Table) -> pa.Table:
+        title = pc.fill_null(as_string(column(table, "title"), allow_cast=False), "")
+        selftext = pc.fill_null(as_string(column(table, "selftext"), allow_cast=False), "")
+        body = pc.fill_null(as_string(column(table, "body"), allow_cast=False), "")
+
+        has_post_text = pc.or_(pc.not_equal(title, ""), pc.not_equal(selftext, ""))
+        post_text = pc.binary_join_element_wise(title, selftext, "\n\n")
+        text = strip_whitespace(pc.if_else(has_post_text, post_text, body))
+        record_type = pc.if_else(has_post_text, "post", "comment")
+        parent_id = as_string(column(table, "parent_id"), allow_cast=False)
+
+        return pa.table(
+            {
+                "platform": pa.repeat(self.platform, table.num_rows),
+                "record_type": record_type,
+                "record_id": as_string(column(table, "id")),
+                "author_id_hash": hash_authors(column(table, "author")),
+                "created_at": epoch_seconds_to_iso(column(table, "created_utc")),
+                "community": null_if_empty(
+                    as_string(column(table, "subreddit"), allow_cast=False)
                 ),
-                flavor="hive",
-            ),
-            existing_data_behavior="overwrite_or_ignore",
-            basename_template=f"part-{file_counter:03d}-{{i}}.parquet",
+                "parent_record_id": pc.if_else(has_post_text, None, parent_id),
+                "thread_id": null_if_empty(as_string(column(table, "link_id"), allow_cast=False)),
+                "text": text,
+            }
         )
-        total_written += len(rows)
-        file_counter += 1
-
-    if suffix == ".csv":
-        for chunk in pd.read_csv(input_file, chunksize=1000, keep_default_na=False):
-            records = chunk.to_dict(orient="records")
-            process_records(records)
-            if max_rows is not None and total_read >= max_rows:
-                break
-    elif suffix == ".jsonl":
-        with input_file.open("r", encoding="utf-8") as handle:
-            for line in handle:
-                if max_rows is not None and total_read >= max_rows:
-                    break
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    raw = json.loads(line)
-                except json.JSONDecodeError:
-                    total_read += 1
-                    total_skipped += 1
-                    continue
-                process_records([raw])
-    else:
-        raise ValueError("Unsupported input format. Use .jsonl or .csv")
 
-    print(
-        f"total_read={total_read} total_written={total_written} total_skipped={total_skipped}"
+
+def ingest_reddit(
+    input_path: str,
+    output_dir: str,
+    max_rows: int | None = None,
+    workers: int = 1,
+    dedup: bool = True,
+) -> IngestStats:
+    return run_ingest(
+        RedditAdapter(), input_path, output_dir, max_rows=max_rows, workers=workers, dedup=dedup
     )
 
 
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import math
+from pathlib import Path
+
+
+SHARD_TARGET_BYTES = 256 * 1024 * 1024
+
+
+def plan_byte_ranges(
+    input_file: Path,
+    shards: int,
+    end: int | None = None,
+    target_bytes: int = SHARD_TARGET_BYTES,
+    start: int = 0,
+) -> list[tuple[int, int]]:
+    """Split ``input_file[start:end]`` into newline-aligned ``(start, end)`` ranges.
+
+    At least ``shards`` ranges are planned (fewer only when the file has fewer
+    lines), more if needed to keep each range near ``target_bytes`` so work
+    stays balanced across workers. ``start`` must be the start of a line.
+    """
+    size = input_file.stat().st_size if end is None else end
+    if size <= start:
+        return []
+    count = max(1, shards, math.ceil((size - start) / target_bytes))
+    step = math.ceil((size - start) / count)
+
+    boundaries = [start]
+    with input_file.open("rb") as handle:
+        for index in range(1, count):
+            target = start + index * step
+            if target >= size:
+                break
+            if target <= boundaries[-1]:
+                continue
+            # Finish the line containing byte ``target - 1`` so the next range
+            # starts exactly at the beginning of a line.
+            handle.seek(target - 1)
+            handle.readline()
+            position = handle.tell()
+            if position >= size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def offset_after_rows(input_file: Path, max_rows: int) -> int:
+    """Return the byte offset just past the first ``max_rows`` non-blank lines.
+
+    Sequential ingest counts every non-blank line towards ``max_rows``
+    (including undecodable ones), so capping the sharded range here keeps
+    ``--max-rows`` selecting exactly the same records.
+    """
+    position = 0
+    count = 0
+    with input_file.open("rb") as handle:
+        for line in handle:
+            if count >= max_rows:
+                break
+            position += len(line)
+            if line.strip():
+                count += 1
+    return position
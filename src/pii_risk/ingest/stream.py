@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import queue
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any
+
+import pyarrow as pa
+
+from pii_risk.ingest.dedup import RecordIdIndex
+from pii_risk.ingest.engine import IngestEngine, IngestStats, PlatformAdapter, write_partitioned
+from pii_risk.ingest.manifest import IngestManifest, range_part_prefix
+from pii_risk.ingest.readers import RawBatch
+from pii_risk.json_codec import loads
+
+
+DEFAULT_MICRO_BATCH_ROWS = 5_000
+DEFAULT_MICRO_BATCH_SECONDS = 10.0
+_EOF = object()
+
+
+def open_event_source(source: str) -> IO[bytes]:
+    """Open ``-`` (stdin), ``tcp://host:port``, ``unix:///path`` or a file/FIFO path."""
+    if source == "-":
+        return sys.stdin.buffer
+    if source.startswith("tcp://"):
+        host, _, port = source[len("tcp://") :].rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Expected tcp://host:port, got {source!r}")
+        connection = socket.create_connection((host, int(port)))
+    elif source.startswith("unix://"):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(source[len("unix://") :])
+    else:
+        return open(source, "rb")
+    # The file object keeps the connection open until it is closed itself.
+    handle = connection.makefile("rb")
+    connection.close()
+    return handle
+
+
+def run_stream_ingest(
+    adapter: PlatformAdapter,
+    source: IO[bytes],
+    output_dir: str,
+    batch_rows: int = DEFAULT_MICRO_BATCH_ROWS,
+    batch_seconds: float = DEFAULT_MICRO_BATCH_SECONDS,
+    max_rows: int | None = None,
+    dedup: bool = True,
+    score_dir: str | None = None,
+    models_dir: str | Path = "models",
+) -> IngestStats:
+    """Ingest newline-delimited events from ``source`` in micro-batches.
+
+    Lines are JSON records, or server-sent events whose ``data:`` lines hold
+    them (``event:`` lines and ``:`` heartbeats are ignored). A batch is
+    normalized by ``adapter``, deduplicated and written into the
+    hive-partitioned layout of ``output_dir`` once it holds ``batch_rows``
+    lines or its first line is ``batch_seconds`` old, and the record index
+    is flushed with it. With ``score_dir``, each written batch is also
+    scored and written there in the ``score-dataset`` layout.
+
+    A reader thread hands lines over through a queue of at most two
+    batches: while a batch is being written the reader stops reading, so a
+    socket producer is throttled by TCP flow control instead of growing
+    memory. Runs until the source ends, ``max_rows`` lines were read or
+    the process is interrupted; the pending batch is written in every case.
+    Micro-batches make small files; ``compact-dataset`` merges them later.
+    """
+    if batch_rows <= 0:
+        raise ValueError("batch_rows must be positive")
+    manifest = IngestManifest.load(output_dir)
+    run = manifest.reserve_run()
+    manifest.save()
+    index = RecordIdIndex.open(output_dir) if dedup else None
+    on_write = None
+    if score_dir is not None:
+        on_write = _scored_writer(score_dir, Path(models_dir))
+    engine = IngestEngine(
+        adapter,
+        output_dir,
+        part_prefix=range_part_prefix(run, 0),
+        index=index,
+        on_write=on_write,
+    )
+
+    lines: queue.Queue[Any] = queue.Queue(maxsize=2 * batch_rows)
+    reader = threading.Thread(target=_read_lines, args=(source, lines, max_rows), daemon=True)
+    reader.start()
+    started = time.perf_counter()
+    batches = 0
+    pending: list[bytes] = []
+    done = False
+    try:
+        while not done:
+            line = lines.get()
+            if line is _EOF:
+                break
+            pending = [line]
+            deadline = time.monotonic() + batch_seconds
+            while len(pending) < batch_rows:
+                try:
+                    line = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if line is _EOF:
+                    done = True
+                    break
+                pending.append(line)
+            _flush(engine, pending, index)
+            pending = []
+            batches += 1
+    except KeyboardInterrupt:
+        _flush(engine, pending, index)
+        batches += bool(pending)
+    engine.stats.elapsed_seconds = time.perf_counter() - started
+    print(f"batches={batches} {engine.stats.summary()}")
+    return engine.stats
+
+
+def _read_lines(source: IO[bytes], lines: queue.Queue[Any], max_rows: int | None) -> None:
+    read = 0
+    try:
+        for line in source:
+            payload = _event_payload(line)
+            if payload is None:
+                continue
+            lines.put(payload)
+            read += 1
+            if max_rows is not None and read >= max_rows:
+                break
+    finally:
+        lines.put(_EOF)
+
+
+def _event_payload(line: bytes) -> bytes | None:
+    line = line.strip()
+    if not line or line.startswith(b":") or line.startswith(b"event:"):
+        return None
+    if line.startswith(b"data:"):
+        line = line[len(b"data:") :].strip()
+    return line
+
+
+def _flush(engine: IngestEngine, pending: list[bytes], index: RecordIdIndex | None) -> None:
+    if not pending:
+        return
+    records = []
+    skipped = 0
+    for line in pending:
+        try:
+            decoded = loads(line)
+        except ValueError:
+            decoded = None
+        if isinstance(decoded, dict):
+            records.append(decoded)
+        else:
+            skipped += 1
+    nbytes = sum(len(line) + 1 for line in pending)
+    engine.process_batch(RawBatch(records=records, skipped=skipped, nbytes=nbytes))
+    if index is not None:
+        index.flush()
+
+
+def _scored_writer(score_dir: str, models_dir: Path) -> Any:
+    from pii_risk.ml.batch_score import SCORE_FIELDS, score_texts
+
+    def write_scored(table: pa.Table, basename_template: str) -> None:
+        scores = score_texts(table.column("text").to_pylist(), models_dir)
+        for field in SCORE_FIELDS:
+            table = table.append_column(field, scores[field.name])
+        write_partitioned(table, score_dir, basename_template)
+
+    return write_scored
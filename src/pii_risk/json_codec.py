@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:  # optional fast codec
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def loads(line: bytes) -> Any:
+    """Decode one JSON document, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # orjson is stricter than json (NaN, huge integers); defer to json
+            # so skip accounting matches the reference decoder.
+            pass
+    return json.loads(line)
+
+
+def dumps(record: dict[str, Any]) -> bytes:
+    """Encode one JSON document as UTF-8, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(record)
+        except TypeError:
+            pass
+    return json.dumps(record, ensure_ascii=False).encode("utf-8")
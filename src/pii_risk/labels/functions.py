@@ -0,0 +1,462 @@
+from __future__ import annotations
+
+import re
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from scipy.sparse import csr_matrix
+
+from pii_risk.data.loader import DEFAULT_BATCH_ROWS, iter_parquet_batches
+from pii_risk.labels.weak import HIGH_SEVERITY_TYPES, weak_label_from_spans
+from pii_risk.pii.detector import PIISpan, PIIType, detect_pii_spans
+
+
+POSITIVE = 1
+NEGATIVE = 0
+ABSTAIN = -1
+RULE_SCORE_THRESHOLD = 25
+OUTPUT_COLUMNS = ("platform", "record_type", "record_id", "community", "created_at")
+
+_WORD_RE = re.compile(r"\w+")
+_FIELD_RE = re.compile(
+    r"^\s*(name|real name|address|addr|phone|cell|email|e-mail|dob|birthday|ssn|employer|"
+    r"workplace)\s*[:=-]",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+@dataclass(frozen=True)
+class LabelingFunction:
+    """A named heuristic voting ``POSITIVE``/``NEGATIVE`` or ``ABSTAIN`` per text."""
+
+    name: str
+    apply: Callable[[LabelContext], np.ndarray]
+    weight: float = 1.0
+
+
+LABELING_FUNCTIONS: dict[str, LabelingFunction] = {}
+
+
+def labeling_function(
+    name: str | None = None, weight: float = 1.0
+) -> Callable[[Callable[[LabelContext], np.ndarray]], Callable[[LabelContext], np.ndarray]]:
+    """Register a function of a ``LabelContext`` returning one vote per text."""
+
+    def register(
+        function: Callable[[LabelContext], np.ndarray],
+    ) -> Callable[[LabelContext], np.ndarray]:
+        key = name or function.__name__
+        if key in LABELING_FUNCTIONS:
+            raise ValueError(f"Labeling function {key!r} is already registered")
+        LABELING_FUNCTIONS[key] = LabelingFunction(key, function, weight)
+        return function
+
+    return register
+
+
+def resolve_functions(names: Sequence[str] | None = None) -> list[LabelingFunction]:
+    """Registered functions by name; all of them for ``None``."""
+    if names is None:
+        return list(LABELING_FUNCTIONS.values())
+    unknown = [name for name in names if name not in LABELING_FUNCTIONS]
+    if unknown:
+        known = list(LABELING_FUNCTIONS)
+        raise ValueError(f"Unknown labeling functions: {unknown}; known: {known}")
+    return [LABELING_FUNCTIONS[name] for name in names]
+
+
+class LabelContext:
+    """Analysis of one batch of texts, computed once and shared by every function.
+
+    Each property is computed on first use, so a run only pays for the
+    analyses its functions need: PII detection runs once per text however
+    many functions look at spans, and keyword functions test a token set
+    instead of rescanning the text.
+    """
+
+    def __init__(
+        self,
+        texts: list[str],
+        communities: list[str | None] | None = None,
+        spans: list[list[PIISpan]] | None = None,
+    ) -> None:
+        self.texts = texts
+        self.communities = communities if communities is not None else [None] * len(texts)
+        if spans is not None:
+            self.__dict__["spans"] = spans
+
+    @classmethod
+    def from_batch(cls, batch: pa.RecordBatch) -> LabelContext:
+        texts = pc.fill_null(batch.column("text"), "").to_pylist()
+        communities = None
+        if "community" in batch.schema.names:
+            communities = batch.column("community").to_pylist()
+        return cls(texts, communities)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @cached_property
+    def spans(self) -> list[list[PIISpan]]:
+        return [detect_pii_spans(text) for text in self.texts]
+
+    @cached_property
+    def weak_labels(self) -> list[dict[str, Any]]:
+        return [weak_label_from_spans(found) for found in self.spans]
+
+    @cached_property
+    def rule_scores(self) -> np.ndarray:
+        return np.array([label["rule_score"] for label in self.weak_labels], dtype=np.int64)
+
+    @cached_property
+    def pii_types(self) -> list[set[str]]:
+        return [{span.type for span in found} for found in self.spans]
+
+    @cached_property
+    def lowered(self) -> list[str]:
+        return [text.lower() for text in self.texts]
+
+    @cached_property
+    def tokens(self) -> list[set[str]]:
+        return [set(_WORD_RE.findall(text)) for text in self.lowered]
+
+    def votes(self, mask: Iterable[bool], label: int) -> np.ndarray:
+        """``label`` where ``mask`` holds, ``ABSTAIN`` elsewhere."""
+        mask = np.fromiter(mask, dtype=bool, count=len(self))
+        return np.where(mask, label, ABSTAIN).astype(np.int8)
+
+    def has_keywords(self, keywords: frozenset[str], phrases: Sequence[str] = ()) -> np.ndarray:
+        """Texts containing any of the single-word ``keywords`` or ``phrases``."""
+        return np.fromiter(
+            (
+                not keywords.isdisjoint(tokens) or any(phrase in text for phrase in phrases)
+                for tokens, text in zip(self.tokens, self.lowered)
+            ),
+            dtype=bool,
+            count=len(self),
+        )
+
+
+@dataclass
+class LabelMatrix:
+    """Sparse votes of a batch: rows are texts, columns are ``functions``.
+
+    Stored values are +1 for ``POSITIVE`` and -1 for ``NEGATIVE``; abstains
+    are not stored.
+    """
+
+    functions: list[LabelingFunction]
+    votes: csr_matrix
+
+    @property
+    def num_rows(self) -> int:
+        return self.votes.shape[0]
+
+    def combine(self) -> np.ndarray:
+        """Weighted majority vote into ``y_risk``; ties and no votes give 0."""
+        weights = np.array([function.weight for function in self.functions], dtype=float)
+        return (np.asarray(self.votes @ weights).ravel() > 0).astype(np.int8)
+
+    def function_names(self, polarity: int) -> list[list[str]]:
+        """Per row, the names of the functions that voted with ``polarity`` (+1/-1)."""
+        names = [function.name for function in self.functions]
+        rows: list[list[str]] = []
+        for row in range(self.num_rows):
+            start, end = self.votes.indptr[row], self.votes.indptr[row + 1]
+            rows.append(
+                [
+                    names[column]
+                    for column, value in zip(
+                        self.votes.indices[start:end], self.votes.data[start:end]
+                    )
+                    if value == polarity
+                ]
+            )
+        return rows
+
+
+def apply_functions(context: LabelContext, functions: Sequence[LabelingFunction]) -> LabelMatrix:
+    """Run ``functions`` over one shared ``context`` into a sparse ``LabelMatrix``."""
+    rows: list[np.ndarray] = []
+    columns: list[np.ndarray] = []
+    values: list[np.ndarray] = []
+    for column, function in enumerate(functions):
+        labels = np.asarray(function.apply(context))
+        if labels.shape != (len(context),):
+            raise ValueError(f"Labeling function {function.name!r} returned {labels.shape} votes")
+        voted = np.flatnonzero(labels != ABSTAIN)
+        rows.append(voted)
+        columns.append(np.full(len(voted), column))
+        values.append(np.where(labels[voted] == POSITIVE, 1, -1).astype(np.int8))
+    votes = csr_matrix(
+        (
+            np.concatenate(values) if values else np.empty(0, np.int8),
+            (
+                np.concatenate(rows) if rows else np.empty(0, int),
+                np.concatenate(columns) if columns else np.empty(0, int),
+            ),
+        ),
+        shape=(len(context), len(functions)),
+        dtype=np.int8,
+    )
+    return LabelMatrix(list(functions), votes)
+
+
+class LabelingStats:
+    """Per-function coverage, overlaps and conflicts, accumulated over batches."""
+
+    def __init__(self, functions: Sequence[LabelingFunction]) -> None:
+        self.names = [function.name for function in functions]
+        size = len(self.names)
+        self.rows = 0
+        self.positives = np.zeros(size, dtype=np.int64)
+        self.negatives = np.zeros(size, dtype=np.int64)
+        self.overlaps = np.zeros(size, dtype=np.int64)
+        self.conflicts = np.zeros(size, dtype=np.int64)
+        self.covered_rows = 0
+        self.conflicted_rows = 0
+        self.positive_labels = 0
+
+    def update(self, matrix: LabelMatrix, y_risk: np.ndarray) -> None:
+        votes = matrix.votes.toarray()
+        voted = votes != 0
+        per_row = voted.sum(axis=1)
+        has_positive = (votes > 0).any(axis=1)
+        has_negative = (votes < 0).any(axis=1)
+        self.rows += matrix.num_rows
+        self.positives += (votes > 0).sum(axis=0)
+        self.negatives += (votes < 0).sum(axis=0)
+        self.overlaps += (voted & (per_row > 1)[:, None]).sum(axis=0)
+        # A function conflicts on a row when some other function voted the
+        # opposite way there.
+        self.conflicts += ((votes > 0) & has_negative[:, None]).sum(axis=0)
+        self.conflicts += ((votes < 0) & has_positive[:, None]).sum(axis=0)
+        self.covered_rows += int((per_row > 0).sum())
+        self.conflicted_rows += int((has_positive & has_negative).sum())
+        self.positive_labels += int(y_risk.sum())
+
+    def to_dict(self) -> dict[str, Any]:
+        rows = max(1, self.rows)
+        return {
+            "rows": self.rows,
+            "coverage": self.covered_rows / rows,
+            "conflict_rate": self.conflicted_rows / rows,
+            "positive_rate": self.positive_labels / rows,
+            "functions": {
+                name: {
+                    "positives": int(self.positives[index]),
+                    "negatives": int(self.negatives[index]),
+                    "coverage": float(self.positives[index] + self.negatives[index]) / rows,
+                    "overlap": float(self.overlaps[index]) / rows,
+                    "conflict": float(self.conflicts[index]) / rows,
+                }
+                for index, name in enumerate(self.names)
+            },
+        }
+
+    def print(self) -> None:
+        summary = self.to_dict()
+        print(
+            f"rows: {summary['rows']} coverage: {summary['coverage']:.3f} "
+            f"conflict_rate: {summary['conflict_rate']:.3f} "
+            f"positive_rate: {summary['positive_rate']:.3f}"
+        )
+        for name, stats in summary["functions"].items():
+            print(
+                f"{name}: coverage={stats['coverage']:.3f} overlap={stats['overlap']:.3f} "
+                f"conflict={stats['conflict']:.3f} "
+                f"positives={stats['positives']} negatives={stats['negatives']}"
+            )
+
+
+def label_texts(
+    texts: list[str], functions: Sequence[LabelingFunction] | None = None
+) -> np.ndarray:
+    """``y_risk`` for ``texts`` from the combined votes of ``functions``."""
+    functions = resolve_functions() if functions is None else functions
+    return apply_functions(LabelContext(texts), functions).combine()
+
+
+def iter_labeled_batches(
+    batches: Iterable[pa.RecordBatch], functions: Sequence[LabelingFunction]
+) -> Iterator[tuple[pa.RecordBatch, LabelMatrix, np.ndarray]]:
+    """Yield ``(batch, matrix, y_risk)``; only one batch is analyzed at a time."""
+    for batch in batches:
+        matrix = apply_functions(LabelContext.from_batch(batch), functions)
+        yield batch, matrix, matrix.combine()
+
+
+def label_dataset(
+    input_dir: str,
+    output_path: str,
+    functions: Sequence[str] | None = None,
+    max_rows: int | None = None,
+    batch_size: int = DEFAULT_BATCH_ROWS,
+) -> dict[str, Any]:
+    """Apply labeling functions to a dataset in one streaming pass.
+
+    Writes one row per record to the Parquet file ``output_path`` with the
+    record's identifying columns, ``y_risk`` and the names of the functions
+    that voted positive and negative (the sparse label matrix), and prints
+    per-function coverage, overlap and conflict rates.
+    """
+    selected = resolve_functions(functions)
+    started = time.perf_counter()
+    stats = LabelingStats(selected)
+    batches = iter_parquet_batches(
+        input_dir, columns=[*OUTPUT_COLUMNS, "text"], max_rows=max_rows, batch_size=batch_size
+    )
+    schema = pa.schema(
+        [(name, pa.string()) for name in OUTPUT_COLUMNS]
+        + [
+            ("y_risk", pa.int8()),
+            ("positive_functions", pa.list_(pa.string())),
+            ("negative_functions", pa.list_(pa.string())),
+        ]
+    )
+    out_path = Path(output_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with pq.ParquetWriter(out_path, schema) as writer:
+        for batch, matrix, y_risk in iter_labeled_batches(batches, selected):
+            stats.update(matrix, y_risk)
+            columns = [batch.column(name).cast(pa.string()) for name in OUTPUT_COLUMNS]
+            columns += [
+                pa.array(y_risk, pa.int8()),
+                pa.array(matrix.function_names(1), pa.list_(pa.string())),
+                pa.array(matrix.function_names(-1), pa.list_(pa.string())),
+            ]
+            writer.write_table(pa.table(columns, schema=schema))
+
+    elapsed = time.perf_counter() - started
+    stats.print()
+    print(f"rows_per_sec: {stats.rows / elapsed if elapsed > 0 else 0.0:.1f}")
+    return stats.to_dict()
+
+
+# Built-in labeling functions. ``rule_score`` and ``high_severity_type``
+# together reproduce ``weak_label_from_rules`` for positives.
+
+DOXXING_KEYWORDS = frozenset({"dox", "doxx", "doxxed", "doxxing", "doxed", "swat", "swatting"})
+DOXXING_PHRASES = (
+    "lives at",
+    "home address",
+    "his address",
+    "her address",
+    "their address",
+    "where he lives",
+    "where she lives",
+    "where they live",
+    "real name is",
+    "phone number is",
+    "leaked",
+)
+SELF_DISCLOSURE_PHRASES = (
+    "my number is",
+    "my phone is",
+    "my email is",
+    "my address is",
+    "text me at",
+    "call me at",
+    "email me at",
+)
+CONTACT_TYPES = frozenset({PIIType.EMAIL, PIIType.PHONE, PIIType.ADDRESS_HINT})
+MIN_FIELD_LINES = 2
+SHORT_TEXT_WORDS = 3
+
+
+@labeling_function()
+def rule_score(context: LabelContext) -> np.ndarray:
+    """Positive at the weak-label threshold, negative when no PII is found at all."""
+    scores = context.rule_scores
+    labels = np.full(len(context), ABSTAIN, dtype=np.int8)
+    labels[scores >= RULE_SCORE_THRESHOLD] = POSITIVE
+    labels[scores == 0] = NEGATIVE
+    return labels
+
+
+@labeling_function(weight=2.0)
+def high_severity_type(context: LabelContext) -> np.ndarray:
+    return context.votes(
+        (not types.isdisjoint(HIGH_SEVERITY_TYPES) for types in context.pii_types), POSITIVE
+    )
+
+
+@labeling_function()
+def doxxing_language(context: LabelContext) -> np.ndarray:
+    return context.votes(context.has_keywords(DOXXING_KEYWORDS, DOXXING_PHRASES), POSITIVE)
+
+
+@labeling_function()
+def self_disclosure(context: LabelContext) -> np.ndarray:
+    """First-person sharing of contact details next to detected contact PII."""
+    mentioned = context.has_keywords(frozenset(), SELF_DISCLOSURE_PHRASES)
+    return context.votes(
+        (
+            flag and not types.isdisjoint(CONTACT_TYPES)
+            for flag, types in zip(mentioned, context.pii_types)
+        ),
+        POSITIVE,
+    )
+
+
+@labeling_function(weight=2.0)
+def profile_fields(context: LabelContext) -> np.ndarray:
+    """Dossier-style ``Name: ... / Address: ...`` lines, a common doxxing template.
+
+    Weighted to outvote ``rule_score``: such dossiers often hold no pattern
+    the detector knows.
+    """
+    return context.votes(
+        (len(_FIELD_RE.findall(text)) >= MIN_FIELD_LINES for text in context.texts), POSITIVE
+    )
+
+
+@labeling_function()
+def link_only(context: LabelContext) -> np.ndarray:
+    """Only a few URLs detected: sharing links is not personal exposure."""
+    return context.votes(
+        (
+            types == {PIIType.URL} and score < RULE_SCORE_THRESHOLD
+            for types, score in zip(context.pii_types, context.rule_scores)
+        ),
+        NEGATIVE,
+    )
+
+
+@labeling_function()
+def short_text(context: LabelContext) -> np.ndarray:
+    return context.votes(
+        (
+            len(tokens) < SHORT_TEXT_WORDS and not spans
+            for tokens, spans in zip(context.tokens, context.spans)
+        ),
+        NEGATIVE,
+    )
+
+
+def community_prior(
+    name: str, communities: dict[str, int], weight: float = 1.0
+) -> LabelingFunction:
+    """A function voting a fixed label for posts in the given communities.
+
+    Not registered: priors are specific to a dataset, so callers build one
+    and pass it alongside the registered functions.
+    """
+    if any(label not in (POSITIVE, NEGATIVE) for label in communities.values()):
+        raise ValueError("Community priors must be POSITIVE or NEGATIVE")
+
+    def apply(context: LabelContext) -> np.ndarray:
+        return np.array(
+            [communities.get(community, ABSTAIN) for community in context.communities],
+            dtype=np.int8,
+        )
+
+    return LabelingFunction(name, apply, weight)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from pii_risk.pii.detector import PIIType, detect_pii_spans
-from pii_risk.pii.scoring import score_record
+from pii_risk.pii.detector import PIISpan, PIIType, detect_pii_spans
+from pii_risk.pii.scoring import score_spans
 
 
 HIGH_SEVERITY_TYPES = {PIIType.SSN, PIIType.CREDIT_CARD}
@@ -14,10 +14,13 @@ def weak_label_from_rules(text: str) -> dict:
     correctness. The definition is centralized here for consistency across
     training and evaluation.
     """
-    scoring = score_record(text)
-    spans = detect_pii_spans(text)
+    return weak_label_from_spans(detect_pii_spans(text))
+
+
+def weak_label_from_spans(spans: list[PIISpan]) -> dict:
+    """``weak_label_from_rules`` for spans that were already detected."""
     pii_types = sorted({span.type for span in spans})
-    rule_score = int(scoring["score"])
+    rule_score = score_spans(spans)
     y_risk = int(rule_score >= 25 or any(t in HIGH_SEVERITY_TYPES for t in pii_types))
 
     return {
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pii_risk.eval.analysis import analyze_texts, batch_texts
+from pii_risk.eval.cube import update_cube
+from pii_risk.ml.combine import INTERPRETATIONS, combined_scores
+from pii_risk.ml.near_dup import DEFAULT_MAX_DISTANCE, NearDuplicateIndex
+from pii_risk.ml.predict import predict_risk_batch
+from pii_risk.ml.score_manifest import (
+    ScoreManifest,
+    model_fingerprint,
+    partition_dirs,
+    scoring_config_fingerprint,
+)
+
+
+DEFAULT_SCORE_BATCH_ROWS = 5_000
+SCORE_FIELDS = [
+    pa.field("rule_score", pa.int16()),
+    pa.field("p_risk", pa.float64()),
+    pa.field("ml_score", pa.int16()),
+    pa.field("final_score", pa.int16()),
+    pa.field("interpretation", pa.dictionary(pa.int8(), pa.string())),
+    pa.field("pii_types", pa.list_(pa.string())),
+    pa.field("redacted_text", pa.string()),
+]
+
+
+def score_texts(
+    texts: list[str], models_dir: Path, near_duplicates: NearDuplicateIndex | None = None
+) -> dict[str, pa.Array]:
+    """Rule, ML and combined scores plus redaction for a batch of texts.
+
+    With ``near_duplicates``, a text whose near-duplicate cluster already
+    has a score reuses its ``p_risk`` instead of running the model. PII
+    detection still runs on every text, so rule scores and redaction stay
+    exact.
+    """
+    analysis = analyze_texts(texts)
+    if near_duplicates is None:
+        p_risk = predict_risk_batch(texts, models_dir=models_dir, numeric=analysis.numeric)
+    else:
+        p_risk = _predict_reusing(texts, models_dir, analysis.numeric, near_duplicates)
+    combined = combined_scores(np.asarray(analysis.rule_scores), p_risk)
+    return {
+        "rule_score": pa.array(combined["rule_score"], pa.int16()),
+        "p_risk": pa.array(p_risk, pa.float64()),
+        "ml_score": pa.array(combined["ml_score"], pa.int16()),
+        "final_score": pa.array(combined["final_score"], pa.int16()),
+        "interpretation": pa.DictionaryArray.from_arrays(
+            pa.array(combined["interpretation"], pa.int8()), pa.array(INTERPRETATIONS)
+        ),
+        "pii_types": pa.array(analysis.pii_types, pa.list_(pa.string())),
+        "redacted_text": pa.array(analysis.redacted, pa.string()),
+    }
+
+
+def _predict_reusing(
+    texts: list[str], models_dir: Path, numeric: np.ndarray, index: NearDuplicateIndex
+) -> np.ndarray:
+    p_risk = np.empty(len(texts), dtype=float)
+    predict: list[int] = []
+    representatives: dict[int, int] = {}
+    followers: list[tuple[int, int]] = []
+    for row, text in enumerate(texts):
+        signature = index.signature(text)
+        if signature is None:
+            predict.append(row)
+            continue
+        cluster = index.find(signature)
+        if cluster is None:
+            representatives[index.add(signature)] = row
+            predict.append(row)
+            continue
+        index.reused += 1
+        score = index.scores[cluster]
+        if score is None:
+            # Represented earlier in this batch; filled in after inference.
+            followers.append((row, cluster))
+        else:
+            p_risk[row] = score
+    p_risk[predict] = predict_risk_batch(
+        [texts[row] for row in predict], models_dir=models_dir, numeric=numeric[predict]
+    )
+    for cluster, row in representatives.items():
+        index.scores[cluster] = float(p_risk[row])
+    for row, cluster in followers:
+        p_risk[row] = index.scores[cluster]
+    return p_risk
+
+
+def score_dataset(
+    input_dir: str,
+    output_dir: str,
+    models_dir: str = "models",
+    workers: int = 1,
+    batch_size: int = DEFAULT_SCORE_BATCH_ROWS,
+    force: bool = False,
+    dry_run: bool = False,
+    near_duplicates: bool = False,
+    near_duplicate_distance: int = DEFAULT_MAX_DISTANCE,
+    cube_dir: str | None = None,
+) -> dict:
+    """Write a scored copy of a hive-partitioned dataset next to it.
+
+    Every data file of ``input_dir`` is streamed in ``batch_size`` batches
+    and written to the same relative path under ``output_dir`` with the
+    ``SCORE_FIELDS`` columns appended, so both datasets share their
+    partitioning. Partitions are scored in ``workers`` processes; each holds
+    one batch at a time.
+
+    A ``ScoreManifest`` in ``output_dir`` records what each partition was
+    scored from, and only partitions whose input files, model artifacts or
+    scoring configuration changed are scored again (all of them with
+    ``force``). Scored partitions whose input partition is gone are
+    removed. ``dry_run`` only prints the plan.
+
+    With ``near_duplicates``, each partition keeps a ``NearDuplicateIndex``
+    and near-identical texts reuse the model score of the first text of
+    their cluster (see ``score_texts``). The index is per partition, so a
+    partition's output never depends on which other partitions were scored
+    in the same run.
+
+    With ``cube_dir``, the rollup cube of the scored dataset is refreshed
+    afterwards; only re-scored partitions are scanned (see ``update_cube``).
+    """
+    root = Path(input_dir)
+    out_root = Path(output_dir)
+    models_path = Path(models_dir)
+    if out_root.resolve() == root.resolve():
+        raise ValueError("The scored dataset must not overwrite its input")
+    started = time.perf_counter()
+
+    manifest = ScoreManifest.load(out_root)
+    model = model_fingerprint(models_path)
+    distance = near_duplicate_distance if near_duplicates else None
+    if distance is not None:
+        NearDuplicateIndex(distance)  # validate before any work is done
+    config = scoring_config_fingerprint(near_duplicate_distance=distance)
+    partitions = partition_dirs(root)
+    plan = []
+    for partition in partitions:
+        entry = {
+            "inputs": manifest.input_fingerprints(partition, root / partition),
+            "model": model,
+            "config": config,
+        }
+        reasons = ["forced"] if force else manifest.stale_reasons(partition, entry)
+        if reasons:
+            plan.append((partition, entry, reasons))
+        else:
+            # Same content; remember new mtimes so the files are not hashed again.
+            manifest.data["partitions"][partition]["inputs"] = entry["inputs"]
+    removed = sorted(set(manifest.data["partitions"]) - set(partitions))
+
+    if dry_run:
+        for partition, _, reasons in plan:
+            print(f"rescore: {partition} ({', '.join(reasons)})")
+        for partition in removed:
+            print(f"remove: {partition}")
+        print(f"partitions: {len(partitions)} to_score: {len(plan)} to_remove: {len(removed)}")
+        return {
+            "partitions": len(partitions),
+            "to_score": [partition for partition, _, _ in plan],
+            "to_remove": removed,
+        }
+
+    for partition in removed:
+        shutil.rmtree(out_root / partition, ignore_errors=True)
+        del manifest.data["partitions"][partition]
+    manifest.save()
+
+    total_rows = 0
+    reuse = {"clusters": 0, "lookups": 0, "reused": 0}
+    if workers > 1 and len(plan) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    _score_partition,
+                    root,
+                    out_root,
+                    partition,
+                    list(entry["inputs"]),
+                    models_path,
+                    batch_size,
+                    distance,
+                ): (partition, entry)
+                for partition, entry, _ in plan
+            }
+            for future in as_completed(futures):
+                total_rows += _record(manifest, *futures[future], *future.result(), reuse)
+    else:
+        for partition, entry, _ in plan:
+            rows, stats = _score_partition(
+                root, out_root, partition, list(entry["inputs"]), models_path, batch_size, distance
+            )
+            total_rows += _record(manifest, partition, entry, rows, stats, reuse)
+
+    elapsed = time.perf_counter() - started
+    print(f"partitions: {len(partitions)} scored: {len(plan)} removed: {len(removed)}")
+    print(f"skipped_up_to_date: {len(partitions) - len(plan)}")
+    print(f"rows_scored: {total_rows}")
+    print(f"rows_per_sec: {total_rows / elapsed if elapsed > 0 else 0.0:.1f}")
+    result = {
+        "partitions": len(partitions),
+        "scored_partitions": len(plan),
+        "skipped_partitions": len(partitions) - len(plan),
+        "removed_partitions": len(removed),
+        "rows_scored": total_rows,
+    }
+    if near_duplicates:
+        print(
+            f"near_duplicate_clusters: {reuse['clusters']} "
+            f"clustered_rows: {reuse['lookups']} reused_model_scores: {reuse['reused']}"
+        )
+        result["near_duplicates"] = reuse
+    if cube_dir is not None:
+        result["cube"] = update_cube(output_dir, cube_dir, batch_size=batch_size)
+    return result
+
+
+def _record(
+    manifest: ScoreManifest,
+    partition: str,
+    entry: dict,
+    rows: int,
+    stats: dict[str, int],
+    reuse: dict[str, int],
+) -> int:
+    """Checkpoint a finished partition so an interrupted run keeps its progress."""
+    manifest.data["partitions"][partition] = {**entry, "rows": rows}
+    manifest.save()
+    for name, value in stats.items():
+        reuse[name] += value
+    return rows
+
+
+def _scored_files(out_dir: Path) -> list[str]:
+    return [
+        path.name
+        for path in out_dir.glob("*.parquet")
+        if not path.name.startswith((".", "_"))
+    ]
+
+
+def _score_partition(
+    root: Path,
+    out_root: Path,
+    relative: str,
+    files: list[str],
+    models_dir: Path,
+    batch_size: int,
+    near_duplicate_distance: int | None = None,
+) -> tuple[int, dict[str, int]]:
+    out_dir = out_root / relative
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = None
+    if near_duplicate_distance is not None:
+        index = NearDuplicateIndex(near_duplicate_distance)
+    score_names = {field.name for field in SCORE_FIELDS}
+    rows = 0
+    for name in files:
+        tmp_path = out_dir / f".{name}.tmp"
+        with pq.ParquetFile(root / relative / name) as source:
+            kept = [field for field in source.schema_arrow if field.name not in score_names]
+            schema = pa.schema(kept + SCORE_FIELDS)
+            with pq.ParquetWriter(tmp_path, schema) as writer:
+                for batch in source.iter_batches(batch_size=batch_size):
+                    scores = score_texts(batch_texts(batch), models_dir, index)
+                    columns = [batch.column(field.name) for field in kept]
+                    columns += [scores[field.name] for field in SCORE_FIELDS]
+                    writer.write_table(pa.table(columns, schema=schema))
+                    rows += batch.num_rows
+        os.replace(tmp_path, out_dir / name)
+    # Drop scored files whose input file is gone, e.g. after compaction.
+    for name in set(_scored_files(out_dir)) - set(files):
+        (out_dir / name).unlink()
+    return rows, index.stats() if index is not None else {}
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import numpy as np
+
 
 MARGIN = 10
+INTERPRETATIONS = ("explicit_pii_dominant", "contextually_concerning", "ambiguous_context")
 
 
 def combined_score(rule_score: int, p_risk: float) -> dict:
@@ -21,3 +24,18 @@ def combined_score(rule_score: int, p_risk: float) -> dict:
         "final_score": final_score,
         "interpretation": interpretation,
     }
+
+
+def combined_scores(rule_scores: np.ndarray, p_risk: np.ndarray) -> dict[str, np.ndarray]:
+    """``combined_score`` over arrays; ``interpretation`` indexes ``INTERPRETATIONS``."""
+    rule_scores = np.asarray(rule_scores, dtype=np.int64)
+    ml_scores = np.round(np.asarray(p_risk, dtype=float) * 100).astype(np.int64)
+    interpretation = np.where(
+        rule_scores > ml_scores + MARGIN, 0, np.where(ml_scores > rule_scores + MARGIN, 1, 2)
+    )
+    return {
+        "rule_score": rule_scores,
+        "ml_score": ml_scores,
+        "final_score": np.maximum(rule_scores, ml_scores),
+        "interpretation": interpretation.astype(np.int8),
+    }
@@ -6,7 +6,7 @@ from typing import Iterable
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 
-from pii_risk.pii.detector import PIIType, detect_pii_spans
+from pii_risk.pii.detector import PIISpan, PIIType, detect_pii_spans
 
 
 NUMERIC_FEATURE_NAMES = [
@@ -27,8 +27,9 @@ def _count_words(text: str) -> int:
     return len(re.findall(r"\b\w+\b", text))
 
 
-def _numeric_features_for_text(text: str) -> list[float]:
-    spans = detect_pii_spans(text)
+def _numeric_features_for_text(text: str, spans: list[PIISpan] | None = None) -> list[float]:
+    if spans is None:
+        spans = detect_pii_spans(text)
     types = [span.type for span in spans]
     count_emails = sum(1 for t in types if t == PIIType.EMAIL)
     count_phones = sum(1 for t in types if t == PIIType.PHONE)
@@ -46,8 +47,15 @@ def _numeric_features_for_text(text: str) -> list[float]:
     ]
 
 
-def build_numeric_features(texts: Iterable[str]) -> np.ndarray:
-    return np.array([_numeric_features_for_text(text) for text in texts], dtype=float)
+def build_numeric_features(
+    texts: Iterable[str], spans: Iterable[list[PIISpan]] | None = None
+) -> np.ndarray:
+    """Numeric features per text; pass ``spans`` to reuse detected PII spans."""
+    if spans is None:
+        rows = [_numeric_features_for_text(text) for text in texts]
+    else:
+        rows = [_numeric_features_for_text(text, found) for text, found in zip(texts, spans)]
+    return np.array(rows, dtype=float).reshape(-1, len(NUMERIC_FEATURE_NAMES))
 
 
 def fit_vectorizer(texts: list[str]) -> TfidfVectorizer:
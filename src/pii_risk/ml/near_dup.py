@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import re
+
+import numpy as np
+
+
+DEFAULT_MAX_DISTANCE = 3
+MIN_TOKENS = 8
+SHINGLE_TOKENS = 3
+SIGNATURE_BITS = 64
+
+_URL_RE = re.compile(r"https?://\S+")
+_HANDLE_RE = re.compile(r"@\w+(?:@[\w.-]+)?")
+_DIGITS_RE = re.compile(r"\d+")
+_TOKEN_RE = re.compile(r"\w+")
+_BIT_SHIFTS = np.arange(SIGNATURE_BITS, dtype=np.uint64)
+
+
+def normalized_tokens(text: str) -> list[str]:
+    """Tokens of ``text`` with case, links, handles and digit runs folded."""
+    text = _URL_RE.sub(" url ", text.lower())
+    text = _HANDLE_RE.sub(" handle ", text)
+    text = _DIGITS_RE.sub("0", text)
+    return _TOKEN_RE.findall(text)
+
+
+def simhash(tokens: list[str]) -> int:
+    """64-bit SimHash over word shingles; similar texts differ in few bits."""
+    size = min(SHINGLE_TOKENS, len(tokens))
+    shingles = [" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)]
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    bits = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).sum(axis=0)
+    return int(((bits * 2 > len(shingles)).astype(np.uint64) << _BIT_SHIFTS).sum())
+
+
+class NearDuplicateIndex:
+    """Clusters of near-identical texts, each with its representative's score.
+
+    Texts are normalized and SimHashed; two texts belong to one cluster when
+    their signatures differ in at most ``max_distance`` bits. The signature
+    is cut into ``max_distance + 1`` bands, so any such pair shares at least
+    one band exactly and candidates are found with one dictionary lookup per
+    band. Texts shorter than ``MIN_TOKENS`` tokens are never clustered: a
+    one-word edit changes too much of them.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE) -> None:
+        if not 0 <= max_distance < 16:
+            raise ValueError("max_distance must be between 0 and 15")
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self._band_bits = SIGNATURE_BITS // self.bands
+        self._buckets: dict[tuple[int, int], list[int]] = {}
+        self._signatures: list[int] = []
+        self.scores: list[float | None] = []
+        self.lookups = 0
+        self.reused = 0
+
+    def signature(self, text: str) -> int | None:
+        tokens = normalized_tokens(text)
+        if len(tokens) < MIN_TOKENS:
+            return None
+        return simhash(tokens)
+
+    def find(self, signature: int) -> int | None:
+        """The cluster within ``max_distance`` bits of ``signature``, if any."""
+        self.lookups += 1
+        for key in self._band_keys(signature):
+            for cluster in self._buckets.get(key, ()):
+                if (self._signatures[cluster] ^ signature).bit_count() <= self.max_distance:
+                    return cluster
+        return None
+
+    def add(self, signature: int) -> int:
+        """Start a cluster represented by ``signature``; its score is set later."""
+        cluster = len(self._signatures)
+        self._signatures.append(signature)
+        self.scores.append(None)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(cluster)
+        return cluster
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "clusters": len(self._signatures),
+            "lookups": self.lookups,
+            "reused": self.reused,
+        }
+
+    def _band_keys(self, signature: int) -> list[tuple[int, int]]:
+        mask = (1 << self._band_bits) - 1
+        return [
+            (band, (signature >> (band * self._band_bits)) & mask) for band in range(self.bands)
+        ]
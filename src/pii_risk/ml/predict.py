@@ -9,11 +9,27 @@ from scipy.sparse import csr_matrix, hstack
 from pii_risk.ml.features import NUMERIC_FEATURE_NAMES, build_numeric_features
 
 
+_ARTIFACT_CACHE: dict[tuple[str, int, int], tuple[object, object]] = {}
+
+
 def _load_artifacts(models_dir: Path) -> tuple[object, object]:
-    with (models_dir / "pii_risk_model.pkl").open("rb") as f:
+    """Load the model and vectorizer, reusing them until the files change."""
+    model_path = models_dir / "pii_risk_model.pkl"
+    vectorizer_path = models_dir / "vectorizer.pkl"
+    key = (
+        str(models_dir.resolve()),
+        model_path.stat().st_mtime_ns,
+        vectorizer_path.stat().st_mtime_ns,
+    )
+    cached = _ARTIFACT_CACHE.get(key)
+    if cached is not None:
+        return cached
+    with model_path.open("rb") as f:
         model = pickle.load(f)
-    with (models_dir / "vectorizer.pkl").open("rb") as f:
+    with vectorizer_path.open("rb") as f:
         vectorizer = pickle.load(f)
+    _ARTIFACT_CACHE.clear()
+    _ARTIFACT_CACHE[key] = (model, vectorizer)
     return model, vectorizer
 
 
@@ -51,3 +67,24 @@ def predict_risk(text: str, models_dir: Path | None = None) -> dict:
     top_terms = _top_terms(tfidf_vector, tfidf_coefficients, feature_names)
 
     return {"p_risk": float(proba), "top_terms": top_terms}
+
+
+def predict_risk_batch(
+    texts: list[str],
+    models_dir: Path | None = None,
+    numeric: np.ndarray | None = None,
+) -> np.ndarray:
+    """Return ``p_risk`` for each text, featurizing the whole batch at once.
+
+    ``numeric`` may carry precomputed ``build_numeric_features`` rows.
+    """
+    if models_dir is None:
+        models_dir = Path("models")
+    if not texts:
+        return np.empty(0, dtype=float)
+
+    model, vectorizer = _load_artifacts(models_dir)
+    if numeric is None:
+        numeric = build_numeric_features(texts)
+    features = hstack([csr_matrix(numeric), vectorizer.transform(texts)]).tocsr()
+    return model.predict_proba(features)[:, 1].astype(float)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from pii_risk.ingest.manifest import fingerprint_input
+from pii_risk.labels.weak import HIGH_SEVERITY_TYPES
+from pii_risk.ml.combine import MARGIN
+from pii_risk.pii.detector import PII_PATTERNS
+from pii_risk.pii.scoring import WEIGHTS
+
+
+SCORE_MANIFEST_NAME = "_score_manifest.json"
+SCORE_MANIFEST_VERSION = 1
+MODEL_ARTIFACTS = ("pii_risk_model.pkl", "vectorizer.pkl")
+
+
+def model_fingerprint(models_dir: Path) -> str:
+    digest = hashlib.sha256()
+    for name in MODEL_ARTIFACTS:
+        with (models_dir / name).open("rb") as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scoring_config_fingerprint(near_duplicate_distance: int | None = None) -> str:
+    """Identify the detector patterns, weights and score combination rules.
+
+    Near-duplicate reuse changes ``p_risk`` values, so its setting is part
+    of the configuration whenever it is enabled.
+    """
+    config: dict[str, Any] = {
+        "patterns": {name: [p.pattern, p.flags] for name, p in PII_PATTERNS.items()},
+        "weights": WEIGHTS,
+        "high_severity": sorted(HIGH_SEVERITY_TYPES),
+        "margin": MARGIN,
+    }
+    if near_duplicate_distance is not None:
+        config["near_duplicate_distance"] = near_duplicate_distance
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def partition_dirs(root: Path) -> list[str]:
+    """Relative paths of the leaf partitions of a hive dataset holding data files."""
+    partitions = set()
+    for path in root.rglob("*.parquet"):
+        relative = path.relative_to(root)
+        if any(part.startswith((".", "_")) for part in relative.parts):
+            continue
+        partitions.add(relative.parent.as_posix())
+    return sorted(partitions)
+
+
+class ScoreManifest:
+    """What each partition of a scored dataset was computed from.
+
+    Lives in the scored dataset as ``_score_manifest.json`` and maps each
+    partition path (``platform=.../record_type=.../year=.../month=...``) to
+    the fingerprints of its input files, the model artifacts and the
+    scoring configuration. A partition is re-scored only when one of them
+    changed. Input files are fingerprinted by content; the recorded size and
+    mtime let unchanged files skip even that.
+    """
+
+    name = SCORE_MANIFEST_NAME
+
+    def __init__(self, output_dir: Path, data: dict[str, Any]) -> None:
+        self.output_dir = output_dir
+        self.data = data
+
+    @classmethod
+    def load(cls, output_dir: str | Path) -> ScoreManifest:
+        output_path = Path(output_dir)
+        manifest_path = output_path / cls.name
+        if manifest_path.exists():
+            with manifest_path.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        else:
+            data = {"version": SCORE_MANIFEST_VERSION, "partitions": {}}
+        return cls(output_path, data)
+
+    def save(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.output_dir / self.name
+        tmp_path = manifest_path.with_suffix(".json.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(self.data, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+    def input_fingerprints(self, partition: str, input_dir: Path) -> dict[str, dict[str, Any]]:
+        """Fingerprint the data files of ``partition``, reusing unchanged entries."""
+        known = self.data["partitions"].get(partition, {}).get("inputs", {})
+        inputs = {}
+        for path in sorted(input_dir.glob("*.parquet")):
+            if path.name.startswith((".", "_")):
+                continue
+            stat = path.stat()
+            entry = known.get(path.name)
+            if entry is None or (entry["size"], entry["mtime_ns"]) != (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                entry = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "fingerprint": fingerprint_input(path),
+                }
+            inputs[path.name] = entry
+        return inputs
+
+    def stale_reasons(self, partition: str, entry: dict[str, Any]) -> list[str]:
+        """What changed since ``partition`` was scored; empty when it is current."""
+        recorded = self.data["partitions"].get(partition)
+        if recorded is None:
+            return ["new"]
+        reasons = []
+        if _content(recorded["inputs"]) != _content(entry["inputs"]):
+            reasons.append("inputs")
+        reasons += [
+            name for name in entry if name != "inputs" and recorded.get(name) != entry[name]
+        ]
+        if not all(path.exists() for path in self.outputs(partition, entry)):
+            reasons.append("missing_output")
+        return reasons
+
+    def outputs(self, partition: str, entry: dict[str, Any]) -> list[Path]:
+        """Files a current ``partition`` must have in the output directory."""
+        return [self.output_dir / partition / name for name in entry["inputs"]]
+
+
+def _content(inputs: dict[str, dict[str, Any]]) -> dict[str, str]:
+    return {name: item["fingerprint"] for name, item in inputs.items()}
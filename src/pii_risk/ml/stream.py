@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any
+
+from pii_risk.json_codec import dumps, loads
+from pii_risk.ml.batch_score import score_texts
+
+
+DEFAULT_STREAM_BATCH_ROWS = 256
+DEFAULT_MAX_LATENCY_MS = 200
+_EOF = object()
+
+
+def score_stream(
+    source: IO[bytes],
+    sink: IO[bytes],
+    models_dir: str | Path = "models",
+    batch_size: int = DEFAULT_STREAM_BATCH_ROWS,
+    max_latency_ms: float = DEFAULT_MAX_LATENCY_MS,
+    text_field: str = "text",
+) -> dict:
+    """Score JSONL records from ``source`` and write JSONL results to ``sink``.
+
+    Each input line yields one output line, in order: the record with the
+    ``score_texts`` fields added, or ``{"error": ...}`` for a line that is
+    not a JSON object. Lines are gathered into micro-batches that are
+    scored and flushed once ``batch_size`` lines arrived or the first line
+    of the batch waited ``max_latency_ms``. A reader thread feeds a queue
+    of at most two batches, so memory stays bounded however long the
+    stream is and a slow consumer throttles reading.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    models_path = Path(models_dir)
+    lines: queue.Queue[Any] = queue.Queue(maxsize=2 * batch_size)
+    reader = threading.Thread(target=_read_lines, args=(source, lines), daemon=True)
+    reader.start()
+
+    started = time.perf_counter()
+    records = batches = errors = 0
+    done = False
+    while not done:
+        line = lines.get()
+        if line is _EOF:
+            break
+        batch = [line]
+        deadline = time.monotonic() + max_latency_ms / 1000
+        while len(batch) < batch_size:
+            try:
+                line = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if line is _EOF:
+                done = True
+                break
+            batch.append(line)
+
+        results, invalid = _score_lines(batch, models_path, text_field)
+        sink.write(b"".join(dumps(result) + b"\n" for result in results))
+        sink.flush()
+        records += len(results)
+        errors += invalid
+        batches += 1
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"records: {records} errors: {errors} batches: {batches} "
+        f"rows_per_sec: {records / elapsed if elapsed > 0 else 0.0:.1f}",
+        file=sys.stderr,
+    )
+    return {"records": records, "errors": errors, "batches": batches}
+
+
+def _read_lines(source: IO[bytes], lines: queue.Queue[Any]) -> None:
+    try:
+        for line in source:
+            if line.strip():
+                lines.put(line)
+    finally:
+        lines.put(_EOF)
+
+
+def _score_lines(
+    batch: list[bytes], models_dir: Path, text_field: str
+) -> tuple[list[dict[str, Any]], int]:
+    results: list[dict[str, Any]] = []
+    texts: list[str] = []
+    scored: list[dict[str, Any]] = []
+    for line in batch:
+        try:
+            record = loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            results.append({"error": "line is not a JSON object"})
+            continue
+        text = record.get(text_field)
+        texts.append(text if isinstance(text, str) else "")
+        scored.append(record)
+        results.append(record)
+    if texts:
+        arrays = score_texts(texts, models_dir)
+        scores = {name: values.to_pylist() for name, values in arrays.items()}
+        for index, record in enumerate(scored):
+            record.update({name: values[index] for name, values in scores.items()})
+    return results, len(results) - len(scored)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import pickle
+from collections.abc import Sequence
 from pathlib import Path
 
 import numpy as np
@@ -15,7 +16,8 @@ from sklearn.metrics import (
     recall_score,
 )
 
-from pii_risk.data.loader import iter_parquet_records
+from pii_risk.data.sampling import DEFAULT_STRATA, iter_sample_records
+from pii_risk.labels.functions import label_texts, resolve_functions
 from pii_risk.labels.weak import weak_label_from_rules
 from pii_risk.ml.features import (
     NUMERIC_FEATURE_NAMES,
@@ -52,9 +54,31 @@ def _print_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> None:
 
 
 def train_model(
-    input_dir: str, max_rows: int | None = None, models_dir: Path | None = None
+    input_dir: str,
+    max_rows: int | None = None,
+    models_dir: Path | None = None,
+    sample_mode: str = "head",
+    seed: int = 0,
+    strata: tuple[str, ...] = DEFAULT_STRATA,
+    labeling_functions: Sequence[str] | None = None,
 ) -> dict:
-    records = list(iter_parquet_records(input_dir, max_rows=max_rows))
+    """Train the contextual risk model on weak labels.
+
+    Labels come from ``weak_label_from_rules`` unless ``labeling_functions``
+    names registered functions (see ``pii_risk.labels.functions``), whose
+    weighted vote then gives ``y_risk``.
+    """
+    functions = resolve_functions(labeling_functions) if labeling_functions else None
+    records = list(
+        iter_sample_records(
+            input_dir,
+            max_rows,
+            mode=sample_mode,
+            seed=seed,
+            columns=("created_at", "text"),
+            strata=strata,
+        )
+    )
     if not records:
         raise ValueError("No valid records found to train on.")
 
@@ -69,8 +93,16 @@ def train_model(
     x_train = _prepare_features(train_texts, vectorizer)
     x_test = _prepare_features(test_texts, vectorizer)
 
-    y_train = np.array([weak_label_from_rules(text)["y_risk"] for text in train_texts])
-    y_test = np.array([weak_label_from_rules(text)["y_risk"] for text in test_texts])
+    if functions is None:
+        y_train = np.array([weak_label_from_rules(text)["y_risk"] for text in train_texts])
+        y_test = np.array([weak_label_from_rules(text)["y_risk"] for text in test_texts])
+        label_rule = "y_risk=1 if rule_score>=25 or PII types include SSN/CREDIT_CARD; else 0"
+    else:
+        y_train = label_texts(train_texts, functions)
+        y_test = label_texts(test_texts, functions)
+        label_rule = "weighted vote of labeling functions: " + ", ".join(
+            f"{function.name} (weight {function.weight:g})" for function in functions
+        )
 
     model = LogisticRegression(class_weight="balanced", max_iter=1000, random_state=0)
     model.fit(x_train, y_train)
@@ -89,7 +121,7 @@ def train_model(
         pickle.dump(vectorizer, f)
 
     metadata = {
-        "label_rule": "y_risk=1 if rule_score>=25 or PII types include SSN/CREDIT_CARD; else 0",
+        "label_rule": label_rule,
         "feature_groups": {
             "numeric": NUMERIC_FEATURE_NAMES,
             "tfidf": {
@@ -32,14 +32,18 @@ def _build_explanation(counts: Counter[str]) -> str:
     return f"Detected {top_types[0]} and {top_types[1]} indicators."
 
 
-def score_record(text: str | None) -> dict:
-    spans = detect_pii_spans(text)
+def score_spans(spans: list[PIISpan]) -> int:
     counts = Counter(span.type for span in spans)
     score = 0
     for span_type, count in counts.items():
         score += WEIGHTS.get(span_type, 0) * count
+    return min(score, 100)
+
 
-    score = min(score, 100)
+def score_record(text: str | None) -> dict:
+    spans = detect_pii_spans(text)
+    counts = Counter(span.type for span in spans)
+    score = score_spans(spans)
 
     return {
         "score": score,
@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from pii_risk.eval.analysis import analyze_texts
+from pii_risk.ml.batch_score import score_texts
+from pii_risk.ml.predict import predict_risk_batch
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 64
+DEFAULT_BATCH_LATENCY_MS = 5.0
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_QUEUED_REQUESTS = 10_000
+ENDPOINTS = {"/v1/rules": "rules", "/v1/ml": "ml", "/v1/score": "score", "/v1/redact": "redact"}
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+def score_kind(kind: str, texts: list[str], models_dir: Path) -> list[dict[str, Any]]:
+    """Results of one endpoint for a batch of texts; runs in the worker pool."""
+    if kind == "score":
+        arrays = score_texts(texts, models_dir)
+        columns = {name: values.to_pylist() for name, values in arrays.items()}
+        return [
+            {name: values[index] for name, values in columns.items()}
+            for index in range(len(texts))
+        ]
+    analysis = analyze_texts(texts)
+    if kind == "rules":
+        return [
+            {"rule_score": score, "pii_types": types}
+            for score, types in zip(analysis.rule_scores, analysis.pii_types)
+        ]
+    if kind == "redact":
+        return [
+            {"redacted_text": redacted, "pii_types": types}
+            for redacted, types in zip(analysis.redacted, analysis.pii_types)
+        ]
+    p_risk = predict_risk_batch(texts, models_dir=models_dir, numeric=analysis.numeric)
+    return [{"p_risk": float(value)} for value in p_risk]
+
+
+def _warm(models_dir: Path) -> None:
+    """Load the model once per worker and exercise the detector before traffic."""
+    score_kind("score", ["warm up 555-123-4567"], models_dir)
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+class MicroBatcher:
+    """Coalesce concurrent requests of one endpoint into executor batches.
+
+    A batch is dispatched once it holds ``max_batch`` texts or its first
+    request waited ``max_latency_ms``; up to ``max_inflight`` batches run in
+    the executor at a time while the next one is being gathered.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        executor: Executor,
+        models_dir: Path,
+        max_batch: int,
+        max_latency_ms: float,
+        max_inflight: int,
+    ) -> None:
+        self.kind = kind
+        self.executor = executor
+        self.models_dir = models_dir
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000
+        self.queue: asyncio.Queue[tuple[list[str], asyncio.Future[Any]]] = asyncio.Queue(
+            MAX_QUEUED_REQUESTS
+        )
+        self.inflight = asyncio.Semaphore(max_inflight)
+        self.batches = 0
+        self.texts = 0
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(self, texts: list[str]) -> list[dict[str, Any]]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            count = len(items[0][0])
+            deadline = loop.time() + self.max_latency
+            while count < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                count += len(item[0])
+            await self.inflight.acquire()
+            task = asyncio.create_task(self._dispatch(items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, items: list[tuple[list[str], asyncio.Future[Any]]]) -> None:
+        texts = [text for request, _ in items for text in request]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, score_kind, self.kind, texts, self.models_dir
+            )
+        except Exception as exc:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            self.inflight.release()
+        self.batches += 1
+        self.texts += len(texts)
+        offset = 0
+        for request, future in items:
+            if not future.done():
+                future.set_result(results[offset : offset + len(request)])
+            offset += len(request)
+
+
+class ScoringService:
+    """Local HTTP/1.1 scoring server with a warm model and micro-batching.
+
+    ``POST /v1/rules``, ``/v1/ml``, ``/v1/score`` and ``/v1/redact`` take
+    ``{"text": ...}`` or ``{"texts": [...]}`` and answer with the matching
+    ``score_kind`` result or ``{"results": [...]}``. ``GET /health`` and
+    ``GET /stats`` report liveness and batching counters. Listens on a TCP
+    port (localhost by default) or a Unix socket; keep-alive is supported.
+    """
+
+    def __init__(
+        self,
+        models_dir: str | Path = "models",
+        workers: int = 1,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_latency_ms: float = DEFAULT_BATCH_LATENCY_MS,
+    ) -> None:
+        self.models_dir = Path(models_dir)
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_latency_ms = max_latency_ms
+        self.executor: ProcessPoolExecutor | None = None
+        self.batchers: dict[str, MicroBatcher] = {}
+        self.server: asyncio.base_events.Server | None = None
+        self.socket_path: str | None = None
+        self.requests = 0
+        self._runners: list[asyncio.Task[None]] = []
+
+    async def start(
+        self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str | None = None
+    ) -> None:
+        # The initializer warms every worker process, whichever tasks it
+        # later runs; the probes only start the processes and wait for them.
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm, initargs=(self.models_dir,)
+        )
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self.executor, _ready) for _ in range(self.workers))
+        )
+        for kind in ENDPOINTS.values():
+            batcher = MicroBatcher(
+                kind,
+                self.executor,
+                self.models_dir,
+                self.max_batch,
+                self.max_latency_ms,
+                max_inflight=2 * self.workers,
+            )
+            self.batchers[kind] = batcher
+            self._runners.append(asyncio.create_task(batcher.run()))
+        if socket_path is not None:
+            self.socket_path = socket_path
+            self.server = await asyncio.start_unix_server(self._handle, path=socket_path)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+
+    @property
+    def port(self) -> int | None:
+        if self.server is None or not self.server.sockets:
+            return None
+        address = self.server.sockets[0].getsockname()
+        return address[1] if isinstance(address, tuple) else None
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.socket_path is not None:
+            Path(self.socket_path).unlink(missing_ok=True)
+        for runner in self._runners:
+            runner.cancel()
+        await asyncio.gather(*self._runners, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": {kind: batcher.batches for kind, batcher in self.batchers.items()},
+            "texts": {kind: batcher.texts for kind, batcher in self.batchers.items()},
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if int(headers.get("content-length", "0")) > MAX_BODY_BYTES:
+                    await _respond(writer, 413, {"error": "request body too large"}, False)
+                    break
+                status, payload = await self._route(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await _respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[int, Any]:
+        if path in ("/health", "/stats"):
+            if method != "GET":
+                return 405, {"error": f"{path} takes GET"}
+            return 200, {"status": "ok"} if path == "/health" else self.stats()
+        kind = ENDPOINTS.get(path)
+        if kind is None:
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": f"{path} takes POST"}
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return 400, {"error": "body is not JSON"}
+        texts = _request_texts(request)
+        if texts is None:
+            return 400, {"error": 'expected either {"text": str} or {"texts": [str, ...]}'}
+        self.requests += 1
+        try:
+            results = await self.batchers[kind].submit(texts)
+        except Exception as exc:
+            return 500, {"error": str(exc)}
+        return 200, results[0] if "text" in request else {"results": results}
+
+
+def _request_texts(request: Any) -> list[str] | None:
+    # One request shape per body: with both fields, which result to return
+    # would be ambiguous.
+    if not isinstance(request, dict) or ("text" in request and "texts" in request):
+        return None
+    if isinstance(request.get("text"), str):
+        return [request["text"]]
+    texts = request.get("texts")
+    if isinstance(texts, list) and all(isinstance(text, str) for text in texts):
+        return texts
+    return None
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> tuple[str, str, dict[str, str], bytes] | None:
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, _ = request_line.decode("latin-1").split()
+    headers = await _read_headers(reader)
+    length = int(headers.get("content-length", "0"))
+    body = await reader.readexactly(length) if 0 < length <= MAX_BODY_BYTES else b""
+    return method, target.split("?", 1)[0], headers, body
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def _respond(
+    writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool
+) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def serve(
+    models_dir: str | Path = "models",
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str | None = None,
+    workers: int = 1,
+    max_batch: int = DEFAULT_MAX_BATCH,
+    max_latency_ms: float = DEFAULT_BATCH_LATENCY_MS,
+) -> None:
+    service = ScoringService(models_dir, workers, max_batch, max_latency_ms)
+    await service.start(host, port, socket_path)
+    where = socket_path if socket_path is not None else f"http://{host}:{service.port}"
+    print(f"serving on {where} with {workers} worker(s)")
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await service.close()
+
+
+async def load_test(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str | None = None,
+    endpoint: str = "/v1/score",
+    requests: int = 1_000,
+    concurrency: int = 32,
+    text: str = "call me at 555-123-4567 or mail me@example.com",
+) -> dict[str, float]:
+    """Send ``requests`` single-text requests over ``concurrency`` keep-alive connections."""
+    body = json.dumps({"text": text}).encode("utf-8")
+    request = (
+        f"POST {endpoint} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode("latin-1") + body
+    latencies: list[float] = []
+    failures = 0
+    remaining = requests
+
+    async def client() -> None:
+        nonlocal remaining, failures
+        if socket_path is not None:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while remaining > 0:
+                remaining -= 1
+                sent = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                status_line = await reader.readline()
+                headers = await _read_headers(reader)
+                await reader.readexactly(int(headers.get("content-length", "0")))
+                latencies.append(time.perf_counter() - sent)
+                if status_line.split()[1] != b"200":
+                    failures += 1
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - started
+    milliseconds = np.asarray(latencies) * 1000
+    result = {
+        "requests": float(len(latencies)),
+        "failures": float(failures),
+        "requests_per_sec": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": float(np.percentile(milliseconds, 50)) if len(latencies) else 0.0,
+        "p95_ms": float(np.percentile(milliseconds, 95)) if len(latencies) else 0.0,
+        "p99_ms": float(np.percentile(milliseconds, 99)) if len(latencies) else 0.0,
+    }
+    for name, value in result.items():
+        print(f"{name}: {value:.1f}" if name.endswith(("_ms", "_sec")) else f"{name}: {value:.0f}")
+    return result
@@ -4,6 +4,7 @@ import csv
 from pathlib import Path
 
 import pyarrow as pa
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 
 from pii_risk.eval.audit import audit_records
@@ -109,3 +110,53 @@ def test_audit_export(tmp_path: Path) -> None:
 
     bucket_counts = summary["bucket_counts"]
     assert sum(bucket_counts.values()) == 6
+
+
+def test_audit_output_is_independent_of_batching(tmp_path: Path) -> None:
+    data_dir = tmp_path / "processed"
+    _write_parquet_dataset(data_dir)
+    models_dir = tmp_path / "models"
+    train_model(str(data_dir), models_dir=models_dir)
+
+    serial = tmp_path / "serial.csv"
+    pooled = tmp_path / "pooled.csv"
+    audit_records(str(data_dir), str(models_dir), str(serial))
+    audit_records(str(data_dir), str(models_dir), str(pooled), batch_size=2, workers=2)
+
+    assert pooled.read_text(encoding="utf-8") == serial.read_text(encoding="utf-8")
+    with serial.open("r", encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    email_row = next(row for row in rows if row["record_id"] == "r1")
+    assert email_row["redacted_text"] == "Email me at [REDACTED:EMAIL] for details."
+    assert email_row["pii_types"] == "EMAIL"
+
+
+def test_columnar_audit_outputs(tmp_path: Path) -> None:
+    data_dir = tmp_path / "processed"
+    _write_parquet_dataset(data_dir)
+    models_dir = tmp_path / "models"
+    train_model(str(data_dir), models_dir=models_dir)
+
+    parquet_path = tmp_path / "audit.parquet"
+    audit_records(str(data_dir), str(models_dir), str(parquet_path), include_text=False)
+    table = pq.read_table(parquet_path)
+    assert "text" not in table.column_names
+    assert pa.types.is_dictionary(table.schema.field("bucket").type)
+    assert table.schema.field("pii_types").type == pa.list_(pa.string())
+    by_id = {row["record_id"]: row for row in table.to_pylist()}
+    assert by_id["r1"]["pii_types"] == ["EMAIL"]
+    assert by_id["r4"]["community"] is None
+
+    arrow_dir = tmp_path / "audit-arrow"
+    audit_records(
+        str(data_dir),
+        str(models_dir),
+        str(arrow_dir),
+        file_format="arrow",
+        partition_by=("bucket",),
+        include_redacted=False,
+    )
+    partitioned = ds.dataset(arrow_dir, format="ipc", partitioning="hive").to_table()
+    assert partitioned.num_rows == 6
+    assert "redacted_text" not in partitioned.column_names
+    assert {path.name.split("=")[0] for path in arrow_dir.iterdir()} == {"bucket"}
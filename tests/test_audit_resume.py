@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+
+import pii_risk.eval.audit as audit
+import pii_risk.eval.writers as writers
+from pii_risk.eval.audit import audit_records
+from pii_risk.eval.checkpoint import checkpoint_path
+from pii_risk.ingest.engine import validate_table, write_partitioned
+from pii_risk.ml.train import train_model
+
+
+def _dataset(tmp_path: Path) -> tuple[Path, Path]:
+    rows = [
+        {
+            "platform": "reddit" if index % 4 else "mastodon",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": "x",
+            "created_at": f"2024-0{1 + index % 5}-01T00:00:00Z",
+            "community": f"c{index % 2}",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": f"mail {index}@example.com" if index % 3 else f"plain note {index}",
+        }
+        for index in range(60)
+    ]
+    data_dir = tmp_path / "data"
+    write_partitioned(validate_table(pa.Table.from_pylist(rows)), str(data_dir), "part-{i}.parquet")
+    models_dir = tmp_path / "models"
+    train_model(str(data_dir), models_dir=models_dir)
+    return data_dir, models_dir
+
+
+def _crash_after(monkeypatch: pytest.MonkeyPatch, calls: int) -> None:
+    predict = audit.predict_risk_batch
+    seen = []
+
+    def flaky(*args: object, **kwargs: object) -> np.ndarray:
+        seen.append(1)
+        if len(seen) > calls:
+            raise RuntimeError("killed")
+        return predict(*args, **kwargs)
+
+    monkeypatch.setattr(audit, "predict_risk_batch", flaky)
+
+
+@pytest.mark.parametrize(
+    ("name", "options"),
+    [
+        ("audit.csv", {}),
+        ("audit.parquet", {}),
+        ("audit.arrow", {}),
+        ("parts", {"file_format": "parquet", "partition_by": ("bucket",)}),
+        ("summary.json", {"summary_only": True}),
+    ],
+)
+def test_resumed_audit_matches_uninterrupted_run(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, name: str, options: dict
+) -> None:
+    data_dir, models_dir = _dataset(tmp_path)
+    monkeypatch.setattr(writers, "WRITE_ROW_GROUP_ROWS", 10)
+    options = {"batch_size": 7, "thresholds": [0.3, 0.6], **options}
+
+    expected_path = tmp_path / "full" / name
+    expected = audit_records(str(data_dir), str(models_dir), str(expected_path), **options)
+
+    out = tmp_path / "resumed" / name
+    with monkeypatch.context() as patch:
+        _crash_after(patch, 5)
+        with pytest.raises(RuntimeError):
+            audit_records(
+                str(data_dir), str(models_dir), str(out), checkpoint_seconds=0, **options
+            )
+    assert checkpoint_path(out).exists()
+    resumed = audit_records(
+        str(data_dir), str(models_dir), str(out), checkpoint_seconds=0, resume=True, **options
+    )
+
+    assert resumed == expected
+    assert not checkpoint_path(out).exists()
+    if out.is_dir():
+        expected_rows = ds.dataset(expected_path, partitioning="hive").to_table()
+        resumed_rows = ds.dataset(out, partitioning="hive").to_table()
+        assert resumed_rows.sort_by("record_id").equals(expected_rows.sort_by("record_id"))
+        assert len(list(out.rglob("*.parquet"))) == len(list(expected_path.rglob("*.parquet")))
+    elif not options.get("summary_only"):
+        assert out.read_bytes() == expected_path.read_bytes()
+        assert list(out.parent.iterdir()) == [out]
+
+
+def test_resume_requires_matching_checkpoint(tmp_path: Path) -> None:
+    data_dir, models_dir = _dataset(tmp_path)
+    out = tmp_path / "audit.csv"
+    with pytest.raises(ValueError, match="No audit checkpoint"):
+        audit_records(str(data_dir), str(models_dir), str(out), resume=True)
+
+    audit.AuditCheckpoint(checkpoint_path(out), {"seed": 1}).save({"rows": 0})
+    with pytest.raises(ValueError, match="options differ"):
+        audit_records(str(data_dir), str(models_dir), str(out), resume=True)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+from pii_risk.eval.audit import audit_records
+from pii_risk.eval.summary import AuditSummary
+from pii_risk.eval.writers import AUDIT_SCHEMA
+from pii_risk.ingest.engine import validate_table, write_partitioned
+from pii_risk.ml.train import train_model
+
+
+def _audit_table(p_risk: list[float], y_risk: list[int], offset: int) -> pa.Table:
+    pred = [int(p >= 0.5) for p in p_risk]
+    codes = [
+        (0 if y else 1) if predicted else (2 if not y else 3)
+        for predicted, y in zip(pred, y_risk)
+    ]
+    count = len(p_risk)
+    return pa.table(
+        {
+            "record_id": [f"r{offset + index}" for index in range(count)],
+            "created_at": [f"2024-0{1 + index % 2}-01T00:00:00Z" for index in range(count)],
+            "bucket": pa.DictionaryArray.from_arrays(
+                pa.array(codes, pa.int8()), pa.array(["TP", "FP", "TN", "FN"])
+            ),
+            "y_risk": y_risk,
+            "pred_risk": pred,
+            "p_risk": p_risk,
+            "rule_score": [0] * count,
+            "pii_types": [[] for _ in range(count)],
+            "text": [""] * count,
+            "redacted_text": [""] * count,
+            "community": ["a" if index % 3 else None for index in range(count)],
+        },
+        schema=AUDIT_SCHEMA,
+    )
+
+
+def test_streaming_statistics_match_exact_values() -> None:
+    rng = np.random.default_rng(0)
+    p_risk = rng.random(1_000)
+    y_risk = rng.integers(0, 2, size=1_000)
+    summary = AuditSummary(top_k=3)
+
+    for start in range(0, 1_000, 137):
+        end = start + 137
+        summary.update(_audit_table(p_risk[start:end].tolist(), y_risk[start:end].tolist(), start))
+
+    result = summary.to_dict()
+    assert result["total_rows"] == 1_000
+    assert abs(result["p_risk"]["mean"] - p_risk.mean()) < 1e-12
+    assert abs(result["p_risk"]["std"] - p_risk.std()) < 1e-12
+    assert abs(result["p_risk"]["quantiles"]["0.9"] - np.quantile(p_risk, 0.9)) < 0.01
+
+    false_positive = (p_risk >= 0.5) & (y_risk == 0)
+    expected = np.sort(p_risk[false_positive])[::-1][:3]
+    assert [row["p_risk"] for row in result["top_false_positives"]] == expected.tolist()
+    false_negative = (p_risk < 0.5) & (y_risk == 1)
+    lowest = np.sort(p_risk[false_negative])[:3]
+    assert [row["p_risk"] for row in result["top_false_negatives"]] == lowest.tolist()
+
+    assert sum(sum(counts.values()) for counts in result["by_month"].values()) == 1_000
+    assert set(result["by_community"]) == {"", "a"}
+    assert result["by_community"]["a"]["FP"] + result["by_community"][""]["FP"] == int(
+        false_positive.sum()
+    )
+
+
+def test_summary_only_audit_writes_json(tmp_path: Path) -> None:
+    rows = [
+        {
+            "platform": "reddit",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": "x",
+            "created_at": f"2024-0{1 + index % 2}-01T00:00:00Z",
+            "community": "alpha",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": "mail me at a@example.com" if index % 3 else "nothing to see",
+        }
+        for index in range(10)
+    ]
+    data_dir = tmp_path / "data"
+    write_partitioned(validate_table(pa.Table.from_pylist(rows)), str(data_dir), "part-{i}.parquet")
+    train_model(str(data_dir), models_dir=tmp_path / "models")
+
+    out = tmp_path / "summary.json"
+    result = audit_records(str(data_dir), str(tmp_path / "models"), str(out), summary_only=True)
+
+    saved = json.loads(out.read_text(encoding="utf-8"))
+    assert saved["total_rows"] == result["total_rows"] == 10
+    assert set(saved["by_month"]) == {"2024-01", "2024-02"}
+    assert sum(saved["by_community"]["alpha"].values()) == 10
+    assert list(tmp_path.glob("*.csv")) == []
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pytest
+
+from pii_risk.eval.audit import audit_records
+from pii_risk.eval.sweep import ThresholdSweep, parse_thresholds
+from pii_risk.ingest.engine import validate_table, write_partitioned
+from pii_risk.ml.train import train_model
+
+
+def test_parse_thresholds() -> None:
+    assert parse_thresholds("0.5, 0.1:0.3:0.1") == [0.1, 0.2, 0.3, 0.5]
+    with pytest.raises(ValueError):
+        parse_thresholds("1.5")
+    with pytest.raises(ValueError):
+        parse_thresholds("0.1:0.5:0")
+
+
+def test_sweep_matches_per_threshold_confusion(tmp_path: Path) -> None:
+    rng = np.random.default_rng(3)
+    p_risk = np.round(rng.random(500), 2)
+    y_risk = rng.integers(0, 2, size=500)
+    thresholds = parse_thresholds("0:1:0.05")
+    sweep = ThresholdSweep(thresholds)
+
+    for start in range(0, 500, 64):
+        sweep.update(p_risk[start : start + 64], y_risk[start : start + 64])
+
+    for row in sweep.to_records():
+        pred = p_risk >= row["threshold"]
+        assert row["tp"] == int((pred & (y_risk == 1)).sum())
+        assert row["fp"] == int((pred & (y_risk == 0)).sum())
+        assert row["tn"] == int((~pred & (y_risk == 0)).sum())
+        assert row["fn"] == int((~pred & (y_risk == 1)).sum())
+        if row["tp"] + row["fp"]:
+            assert row["precision"] == pytest.approx(row["tp"] / (row["tp"] + row["fp"]))
+
+    out = tmp_path / "curve.csv"
+    sweep.write(out)
+    assert pa_csv.read_csv(out).num_rows == len(thresholds)
+
+
+def test_audit_sweep_agrees_with_buckets(tmp_path: Path) -> None:
+    rows = [
+        {
+            "platform": "reddit",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": "x",
+            "created_at": "2024-01-01T00:00:00Z",
+            "community": "alpha",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": "call 555-123-4567 now" if index % 3 else "nothing to see",
+        }
+        for index in range(12)
+    ]
+    data_dir = tmp_path / "data"
+    write_partitioned(validate_table(pa.Table.from_pylist(rows)), str(data_dir), "part-{i}.parquet")
+    train_model(str(data_dir), models_dir=tmp_path / "models")
+
+    result = audit_records(
+        str(data_dir),
+        str(tmp_path / "models"),
+        str(tmp_path / "audit.csv"),
+        batch_size=5,
+        threshold=0.4,
+        thresholds=[0.4, 0.6],
+        sweep_path=str(tmp_path / "curve.parquet"),
+    )
+
+    at_threshold = result["threshold_curve"][0]
+    assert at_threshold["threshold"] == 0.4
+    for label in ("TP", "FP", "TN", "FN"):
+        assert at_threshold[label.lower()] == result["bucket_counts"][label]
+    assert (tmp_path / "curve.parquet").exists()
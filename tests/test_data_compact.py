@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from pii_risk.data.compact import compact_dataset
+from pii_risk.ingest.engine import run_ingest
+from pii_risk.ingest.reddit import RedditAdapter
+
+
+def _ingest(tmp_path: Path, rows: int) -> Path:
+    input_path = tmp_path / "input.jsonl"
+    with input_path.open("w", encoding="utf-8") as handle:
+        for index in range(rows):
+            record = {
+                "id": f"t{index}",
+                "subreddit": "python",
+                "created_utc": 1704067200 + ((index * 7) % rows) * 3600,
+                "body": f"comment {index}",
+            }
+            handle.write(json.dumps(record) + "\n")
+    output_dir = tmp_path / "output"
+    run_ingest(RedditAdapter(), str(input_path), str(output_dir), batch_size=3)
+    return output_dir
+
+
+def _scan(output_dir: Path):
+    return ds.dataset(output_dir, format="parquet", partitioning="hive").to_table()
+
+
+def test_compaction_merges_sorts_and_preserves_rows(tmp_path: Path) -> None:
+    output_dir = _ingest(tmp_path, 20)
+    before = _scan(output_dir).sort_by("record_id")
+
+    report = compact_dataset(str(output_dir), row_group_rows=8)
+
+    assert report["files_before"] > report["files_after"] == report["partitions"]
+    assert _scan(output_dir).sort_by("record_id").equals(before)
+
+    (path,) = list(output_dir.rglob("compact-*.parquet"))
+    created = pq.read_table(path).column("created_at").to_pylist()
+    assert created == sorted(created)
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_row_groups == 3
+    column = metadata.row_group(0).column(metadata.schema.names.index("community"))
+    assert column.statistics.has_min_max
+    assert any("DICTIONARY" in encoding for encoding in column.encodings)
+
+    assert compact_dataset(str(output_dir))["compacted_partitions"] == 0
+
+
+def test_external_sort_keeps_order_and_non_data_files(tmp_path: Path) -> None:
+    output_dir = _ingest(tmp_path, 50)
+    before = _scan(output_dir).sort_by("record_id")
+    (partition,) = {path.parent for path in output_dir.rglob("part-*.parquet")}
+    (partition / "_SUCCESS").write_text("", encoding="utf-8")
+
+    compact_dataset(str(output_dir), row_group_rows=8, sort_run_rows=7, measure_scan=False)
+
+    assert _scan(output_dir).sort_by("record_id").equals(before)
+    (path,) = list(output_dir.rglob("compact-*.parquet"))
+    created = pq.read_table(path).column("created_at").to_pylist()
+    assert created == sorted(created)
+    assert pq.ParquetFile(path).metadata.num_row_groups == 7
+    assert (partition / "_SUCCESS").exists()
+    assert not list(partition.glob(".runs"))
+
+
+def test_interrupted_swap_is_recovered(tmp_path: Path) -> None:
+    output_dir = _ingest(tmp_path, 6)
+    (partition,) = {path.parent for path in output_dir.rglob("part-*.parquet")}
+    backup = partition.with_name(f".{partition.name}.compact-old")
+    partition.rename(backup)
+
+    compact_dataset(str(output_dir), measure_scan=False)
+
+    assert not backup.exists()
+    assert _scan(output_dir).num_rows == 6
+
+
+def test_refuses_to_compact_unfinished_ingest(tmp_path: Path) -> None:
+    output_dir = _ingest(tmp_path, 3)
+    manifest_path = output_dir / "_ingest_manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    for entry in manifest["inputs"].values():
+        entry["complete"] = False
+        entry["running"] = True
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        compact_dataset(str(output_dir))
+
+
+def test_compacts_cleanly_capped_ingest(tmp_path: Path) -> None:
+    input_path = tmp_path / "input.jsonl"
+    input_path.write_text(
+        "".join(
+            json.dumps({"id": f"t{index}", "created_utc": 1704067200, "body": "x"}) + "\n"
+            for index in range(6)
+        ),
+        encoding="utf-8",
+    )
+    output_dir = tmp_path / "output"
+    run_ingest(RedditAdapter(), str(input_path), str(output_dir), max_rows=4, batch_size=2)
+
+    assert compact_dataset(str(output_dir), measure_scan=False)["compacted_partitions"] == 1
+    run_ingest(RedditAdapter(), str(input_path), str(output_dir))
+    assert _scan(output_dir).num_rows == 6
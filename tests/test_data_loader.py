@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pyarrow as pa
+import pytest
+
+from pii_risk.data.loader import iter_parquet_batches, iter_parquet_records
+from pii_risk.ingest.engine import validate_table, write_partitioned
+
+
+def _write_dataset(output_dir: Path) -> None:
+    rows = []
+    for index, created_at in enumerate(
+        ["2023-12-31T23:00:00Z", "2024-01-15T00:00:00Z", "2024-02-01T00:00:00Z", "2024-03-09T12:00:00Z"]
+    ):
+        for record_type in ("post", "comment"):
+            rows.append(
+                {
+                    "platform": "reddit" if index % 2 else "mastodon",
+                    "record_type": record_type,
+                    "record_id": f"{record_type}-{index}",
+                    "author_id_hash": "x",
+                    "created_at": created_at,
+                    "community": "c",
+                    "parent_record_id": None,
+                    "thread_id": None,
+                    "text": f"text {index}",
+                }
+            )
+    write_partitioned(validate_table(pa.Table.from_pylist(rows)), str(output_dir), "part-{i}.parquet")
+
+
+def test_projection_and_partition_filters(tmp_path: Path) -> None:
+    _write_dataset(tmp_path)
+
+    batches = list(iter_parquet_batches(tmp_path, columns=["record_id", "text"], record_type="post"))
+
+    assert all(batch.schema.names == ["record_id", "text"] for batch in batches)
+    ids = sorted(row["record_id"] for batch in batches for row in batch.to_pylist())
+    assert ids == ["post-0", "post-1", "post-2", "post-3"]
+
+    records = list(
+        iter_parquet_records(tmp_path, platform=["reddit"], year="2024", month=["01", "03"])
+    )
+    assert sorted(record["record_id"] for record in records) == [
+        "comment-1",
+        "comment-3",
+        "post-1",
+        "post-3",
+    ]
+    assert {record["year"] for record in records} == {"2024"}
+
+
+def test_created_at_range_and_max_rows(tmp_path: Path) -> None:
+    _write_dataset(tmp_path)
+
+    records = list(
+        iter_parquet_records(
+            tmp_path, columns=["created_at"], created_from="2024-01-15", created_to="2024-03"
+        )
+    )
+    assert sorted({record["created_at"] for record in records}) == [
+        "2024-01-15T00:00:00Z",
+        "2024-02-01T00:00:00Z",
+    ]
+
+    assert len(list(iter_parquet_records(tmp_path, max_rows=3, batch_size=2))) == 3
+
+    with pytest.raises(ValueError):
+        list(iter_parquet_batches(tmp_path, columns=["missing"]))
+
+
+def test_skip_rows_resumes_the_scan(tmp_path: Path) -> None:
+    _write_dataset(tmp_path)
+    columns = ["record_id", "platform"]
+    full = [
+        row
+        for batch in iter_parquet_batches(tmp_path, columns=columns, created_from="2024")
+        for row in batch.to_pylist()
+    ]
+
+    for skip in range(len(full) + 1):
+        rest = [
+            row
+            for batch in iter_parquet_batches(
+                tmp_path, columns=columns, created_from="2024", skip_rows=skip, max_rows=5
+            )
+            for row in batch.to_pylist()
+        ]
+        assert rest == full[skip:5]
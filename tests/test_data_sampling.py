@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from pii_risk.data.sampling import iter_sample_records
+
+
+def _write_dataset(root: Path) -> None:
+    for platform, rows in (("reddit", 90), ("mastodon", 10)):
+        for month in ("01", "02"):
+            directory = root / f"platform={platform}" / f"month={month}"
+            directory.mkdir(parents=True)
+            table = pa.table(
+                {
+                    "record_id": [f"{platform}-{month}-{index}" for index in range(rows // 2)],
+                    "created_at": [f"2024-{month}-01T00:00:00Z"] * (rows // 2),
+                    "text": ["hello"] * (rows // 2),
+                }
+            )
+            pq.write_table(table, directory / "part-0.parquet", row_group_size=5)
+
+
+def _ids(root: Path, mode: str, rows: int, seed: int, **options) -> list[str]:
+    records = iter_sample_records(root, rows, mode=mode, seed=seed, **options)
+    return [record["record_id"] for record in records]
+
+
+@pytest.mark.parametrize("mode", ["fragment", "row-group", "reservoir", "stratified"])
+def test_sampling_is_seeded_and_exact(tmp_path: Path, mode: str) -> None:
+    _write_dataset(tmp_path)
+
+    first = _ids(tmp_path, mode, 12, seed=1)
+
+    assert len(first) == len(set(first)) == 12
+    assert first == _ids(tmp_path, mode, 12, seed=1)
+    assert first != _ids(tmp_path, mode, 12, seed=2)
+
+
+@pytest.mark.parametrize("mode", ["head", "fragment", "row-group", "reservoir", "stratified"])
+def test_zero_rows_sample_is_empty(tmp_path: Path, mode: str) -> None:
+    _write_dataset(tmp_path)
+
+    assert _ids(tmp_path, mode, 0, seed=0) == []
+    with pytest.raises(ValueError):
+        _ids(tmp_path, mode, -1, seed=0)
+
+
+def test_reservoir_covers_all_partitions(tmp_path: Path) -> None:
+    _write_dataset(tmp_path)
+
+    seen = Counter(
+        record_id.rsplit("-", 1)[0]
+        for seed in range(20)
+        for record_id in _ids(tmp_path, "reservoir", 10, seed=seed)
+    )
+
+    assert set(seen) == {"reddit-01", "reddit-02", "mastodon-01", "mastodon-02"}
+    assert seen["reddit-01"] > seen["mastodon-01"]
+
+
+def test_stratified_sample_is_balanced(tmp_path: Path) -> None:
+    _write_dataset(tmp_path)
+
+    balanced = Counter(
+        record_id.split("-")[0]
+        for record_id in _ids(tmp_path, "stratified", 20, seed=0, strata=("platform",))
+    )
+    assert balanced == {"reddit": 10, "mastodon": 10}
+
+    # The small stratum is exhausted and its unused share goes to the large one.
+    topped_up = Counter(
+        record_id.split("-")[0]
+        for record_id in _ids(tmp_path, "stratified", 30, seed=0, strata=("platform",))
+    )
+    assert topped_up == {"reddit": 20, "mastodon": 10}
+
+    by_month = Counter(
+        record_id.split("-", 1)[1][:2]
+        for record_id in _ids(
+            tmp_path, "stratified", 8, seed=0, strata=("platform", "month"), platform="reddit"
+        )
+    )
+    assert by_month == {"01": 4, "02": 4}
+
+
+def test_unknown_options_are_rejected(tmp_path: Path) -> None:
+    _write_dataset(tmp_path)
+
+    with pytest.raises(ValueError):
+        _ids(tmp_path, "bogus", 5, seed=0)
+    with pytest.raises(ValueError):
+        _ids(tmp_path, "stratified", 5, seed=0, strata=("author",))
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from pii_risk.eval.cube import RiskCube, update_cube
+from pii_risk.ingest.engine import validate_table, write_partitioned
+
+
+PII = [[], ["EMAIL"], ["EMAIL", "SSN"], []]
+
+
+def _write_scored(data_dir: Path, rows: int = 60, null_community: bool = False) -> list[dict]:
+    records = [
+        {
+            "platform": "reddit" if index % 2 else "mastodon",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": "x",
+            "created_at": f"2024-0{1 + index % 3}-01T00:00:00Z",
+            "community": None if null_community and index % 4 == 3 else f"c{index % 4}",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": "x",
+        }
+        for index in range(rows)
+    ]
+    table = validate_table(pa.Table.from_pylist(records))
+    order = [int(record_id[1:]) for record_id in table.column("record_id").to_pylist()]
+    table = table.append_column("final_score", pa.array([i % 100 for i in order], pa.int16()))
+    table = table.append_column("p_risk", pa.array([(i % 10) / 10 for i in order]))
+    table = table.append_column(
+        "pii_types", pa.array([PII[i % 5 % 4] for i in order], pa.list_(pa.string()))
+    )
+    write_partitioned(table, str(data_dir), "part-{i}.parquet")
+    return table.to_pylist()
+
+
+def test_cube_queries_match_a_full_scan(tmp_path: Path) -> None:
+    records = _write_scored(tmp_path / "scored")
+    result = update_cube(str(tmp_path / "scored"), str(tmp_path / "cube"))
+    assert result["rows_scanned"] == len(records)
+    cube = RiskCube.open(tmp_path / "cube")
+
+    rows = cube.query(by=["community", "month"], platform="reddit").to_pylist()
+    for row in rows:
+        group = [
+            r
+            for r in records
+            if r["platform"] == "reddit"
+            and r["community"] == row["community"]
+            and r["month"] == row["month"]
+        ]
+        assert row["records"] == len(group)
+        assert row["pii_records"] == sum(bool(r["pii_types"]) for r in group)
+        assert row["pii_rate"] == pytest.approx(row["pii_records"] / len(group))
+        assert row["final_score_max"] == max(r["final_score"] for r in group)
+        assert row["final_score_mean"] == pytest.approx(
+            sum(r["final_score"] for r in group) / len(group)
+        )
+    assert sum(row["records"] for row in rows) == sum(r["platform"] == "reddit" for r in records)
+
+    (ssn,) = cube.query(pii_type="SSN", score_bucket=["50-74", "75-100"]).to_pylist()
+    high = [r for r in records if r["final_score"] >= 50]
+    with_ssn = [r for r in high if "SSN" in r["pii_types"]]
+    assert ssn["records"] == len(high)
+    assert ssn["pii_records"] == len(with_ssn)
+    assert ssn["p_risk_mean"] == pytest.approx(sum(r["p_risk"] for r in with_ssn) / len(with_ssn))
+
+    by_type = cube.query(by=["pii_type"]).to_pylist()
+    assert [row["pii_type"] for row in by_type] == ["EMAIL", "SSN"]
+    with pytest.raises(ValueError):
+        cube.query(by=["author_id_hash"])
+
+
+def test_cube_updates_only_changed_partitions(tmp_path: Path) -> None:
+    _write_scored(tmp_path / "scored")
+    first = update_cube(str(tmp_path / "scored"), str(tmp_path / "cube"))
+    assert update_cube(str(tmp_path / "scored"), str(tmp_path / "cube"))["rebuilt_partitions"] == 0
+
+    changed = sorted((tmp_path / "scored").rglob("*.parquet"))[0]
+    table = pq.read_table(changed)
+    pq.write_table(table.slice(1), changed)
+    shutil.rmtree(sorted((tmp_path / "scored").rglob("*.parquet"))[-1].parent)
+    again = update_cube(str(tmp_path / "scored"), str(tmp_path / "cube"))
+
+    assert again["rebuilt_partitions"] == 1
+    assert again["removed_partitions"] == 1
+    assert again["rows_scanned"] == table.num_rows - 1
+    (total,) = RiskCube.open(tmp_path / "cube").query().to_pylist()
+    remaining = pq.read_table(tmp_path / "scored", partitioning=None).num_rows
+    assert total["records"] == remaining
+    assert len(list((tmp_path / "cube").rglob("cube.parquet"))) == first["partitions"] - 1
+
+
+def test_empty_cube_answers_with_no_rows(tmp_path: Path) -> None:
+    assert RiskCube.open(tmp_path / "missing").query(by=["community"]).num_rows == 0
+
+
+
+def test_typed_queries_keep_null_community_groups(tmp_path: Path) -> None:
+    records = _write_scored(tmp_path / "scored", null_community=True)
+    update_cube(str(tmp_path / "scored"), str(tmp_path / "cube"))
+    cube = RiskCube.open(tmp_path / "cube")
+
+    for by in (["community"], ["community", "pii_type"]):
+        rows = cube.query(by=by, pii_type="EMAIL").to_pylist()
+        assert None in [row["community"] for row in rows]
+        for row in rows:
+            group = [r for r in records if r["community"] == row["community"]]
+            with_email = [r for r in group if "EMAIL" in r["pii_types"]]
+            assert row["records"] == len(group)
+            assert row["pii_records"] == len(with_email)
+            assert row["pii_rate"] == pytest.approx(len(with_email) / len(group))
+
+
+def test_typed_queries_keep_groups_without_that_type(tmp_path: Path) -> None:
+    records = _write_scored(tmp_path / "scored", rows=12)
+    update_cube(str(tmp_path / "scored"), str(tmp_path / "cube"))
+    cube = RiskCube.open(tmp_path / "cube")
+
+    rows = cube.query(by=["community", "pii_type"], pii_type="SSN", platform="reddit").to_pylist()
+    assert [row["community"] for row in rows] == ["c1", "c3"]
+    for row in rows:
+        group = [
+            r for r in records if r["community"] == row["community"] and r["platform"] == "reddit"
+        ]
+        with_ssn = [r for r in group if "SSN" in r["pii_types"]]
+        assert row["pii_type"] == "SSN"
+        assert row["records"] == len(group)
+        assert row["pii_records"] == len(with_ssn)
+        assert row["pii_rate"] == pytest.approx(len(with_ssn) / len(group))
+    assert 0 in [row["pii_records"] for row in rows]
+
+    (row,) = cube.query(pii_type="PHONE").to_pylist()
+    assert row["records"] == len(records)
+    assert (row["pii_records"], row["pii_rate"]) == (0, 0.0)
+    assert row["final_score_mean"] is None
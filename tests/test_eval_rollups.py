@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from pii_risk.eval import rollups
+from pii_risk.eval.rollups import aggregate_exposure
+from pii_risk.ingest.engine import validate_table, write_partitioned
+
+
+PII = [[], ["EMAIL"], ["PHONE", "SSN"], [], ["URL"]]
+
+
+def _write_scored(data_dir: Path, rows: int = 300) -> list[dict]:
+    records = [
+        {
+            "platform": "reddit" if index % 4 else "mastodon",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": f"author{index % 37}",
+            "created_at": f"2024-{1 + index % 3:02d}-{1 + index % 28:02d}T00:00:00Z",
+            "community": f"c{index % 5}",
+            "parent_record_id": None,
+            "thread_id": f"t{index % 11}" if index % 3 else None,
+            "text": "x",
+        }
+        for index in range(rows)
+    ]
+    table = validate_table(pa.Table.from_pylist(records))
+    order = [int(record_id[1:]) for record_id in table.column("record_id").to_pylist()]
+    table = table.append_column("final_score", pa.array([(i * 7) % 101 for i in order], pa.int16()))
+    table = table.append_column(
+        "pii_types", pa.array([PII[i % len(PII)] for i in order], pa.list_(pa.string()))
+    )
+    write_partitioned(table, str(data_dir), "part-{i}.parquet")
+    return table.to_pylist()
+
+
+def _expected(records: list[dict], key: str) -> dict[tuple[str, str], dict]:
+    groups: dict[tuple[str, str], dict] = defaultdict(
+        lambda: {"records": 0, "high_risk_records": 0, "pii_records": 0, "scores": [], "dates": []}
+    )
+    for record in records:
+        if record[key] is None:
+            continue
+        group = groups[(record["platform"], record[key])]
+        group["records"] += 1
+        group["high_risk_records"] += record["final_score"] >= 50
+        group["pii_records"] += bool(record["pii_types"])
+        group["pii_ssn"] = group.get("pii_ssn", 0) + ("SSN" in record["pii_types"])
+        group["scores"].append(record["final_score"])
+        group["dates"].append(record["created_at"])
+    return groups
+
+
+def _read(out_dir: Path) -> list[dict]:
+    return pq.read_table(out_dir, partitioning=None).to_pylist()
+
+
+@pytest.mark.parametrize("max_groups", [1_000_000, 4])
+def test_rollups_match_direct_computation(tmp_path: Path, max_groups: int) -> None:
+    records = _write_scored(tmp_path / "scored")
+
+    result = aggregate_exposure(
+        str(tmp_path / "scored"), str(tmp_path / "rollups"), max_groups=max_groups, batch_size=50
+    )
+
+    assert result["rows"] == len(records)
+    assert bool(result["spilled_rows"]["author_id_hash"]) == (max_groups == 4)
+    for key in ("author_id_hash", "thread_id", "community"):
+        expected = _expected(records, key)
+        rows = _read(tmp_path / "rollups" / key)
+        assert result["groups"][key] == len(rows) == len(expected)
+        for row in rows:
+            group = expected[(row["platform"], row[key])]
+            assert row["records"] == group["records"]
+            assert row["high_risk_records"] == group["high_risk_records"]
+            assert row["pii_records"] == group["pii_records"]
+            assert row["pii_ssn"] == group["pii_ssn"]
+            assert row["final_score_max"] == max(group["scores"])
+            assert row["final_score_mean"] == pytest.approx(
+                sum(group["scores"]) / len(group["scores"])
+            )
+            assert row["first_created_at"] == min(group["dates"])
+            assert row["last_created_at"] == max(group["dates"])
+    assert not list((tmp_path / "rollups").glob(".spill-*"))
+
+
+def test_oversized_spill_buckets_are_split_again(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(rollups, "SPILL_BUCKET_BITS", 1)
+    monkeypatch.setattr(rollups, "SPILL_BUCKETS", 2)
+    records = _write_scored(tmp_path / "scored")
+
+    result = aggregate_exposure(
+        str(tmp_path / "scored"),
+        str(tmp_path / "rollups"),
+        keys=["author_id_hash"],
+        max_groups=4,
+        batch_size=50,
+    )
+
+    expected = _expected(records, "author_id_hash")
+    rows = _read(tmp_path / "rollups" / "author_id_hash")
+    assert result["groups"]["author_id_hash"] == len(rows) == len(expected)
+    for row in rows:
+        assert row["records"] == expected[(row["platform"], row["author_id_hash"])]["records"]
+    parts = [path.stem for path in (tmp_path / "rollups" / "author_id_hash").iterdir()]
+    assert max(part.count("-") for part in parts) > 2
+
+
+def test_rollups_are_sorted_by_high_risk_records(tmp_path: Path) -> None:
+    _write_scored(tmp_path / "scored")
+    aggregate_exposure(str(tmp_path / "scored"), str(tmp_path / "rollups"), keys=["community"])
+
+    rows = _read(tmp_path / "rollups" / "community")
+    high_risk = [row["high_risk_records"] for row in rows]
+    assert high_risk == sorted(high_risk, reverse=True)
+    assert not (tmp_path / "rollups" / "thread_id").exists()
+    with pytest.raises(ValueError):
+        aggregate_exposure(str(tmp_path / "scored"), str(tmp_path / "rollups"), keys=["text"])
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from pii_risk.ingest.mastodon import MastodonAdapter, ingest_mastodon
+from pii_risk.ingest.readers import iter_raw_batches
+from pii_risk.ingest.reddit import ingest_reddit
+
+
+def _reddit_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"t{index}",
+            "author": f"user{index % 3}",
+            "subreddit": "python",
+            "created_utc": 1704067200 + index * 86400,
+            "body": f"comment {index}",
+        }
+        for index in range(count)
+    ]
+
+
+def _scan(output_dir: Path) -> pa.Table:
+    table = ds.dataset(output_dir, format="parquet", partitioning="hive").to_table()
+    return table.select(sorted(table.column_names)).sort_by("record_id")
+
+
+def test_parquet_input_matches_jsonl(tmp_path: Path) -> None:
+    rows = _reddit_rows(7)
+    jsonl = tmp_path / "input.jsonl"
+    jsonl.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    parquet = tmp_path / "input.parquet"
+    pq.write_table(pa.Table.from_pylist(rows), parquet, row_group_size=3)
+
+    ingest_reddit(str(jsonl), str(tmp_path / "from-jsonl"))
+    stats = ingest_reddit(str(parquet), str(tmp_path / "from-parquet"))
+
+    assert (stats.total_read, stats.total_written) == (7, 7)
+    assert _scan(tmp_path / "from-parquet").equals(_scan(tmp_path / "from-jsonl"))
+
+
+def test_arrow_batches_are_regrouped_and_limited(tmp_path: Path) -> None:
+    path = tmp_path / "data.arrow"
+    table = pa.Table.from_pylist(_reddit_rows(10))
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=3)
+
+    batches = list(iter_raw_batches(path, 4, max_rows=9, skip_rows=2))
+
+    assert [batch.num_rows for batch in batches] == [4, 4]
+    ids = [row["id"] for batch in batches for row in batch.records.to_pylist()]
+    assert ids == [f"t{index}" for index in range(2, 10)]
+
+
+def test_datasets_cache_directory_with_default_timestamp(tmp_path: Path) -> None:
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    (cache / "dataset_info.json").write_text("{}", encoding="utf-8")
+    for shard in range(2):
+        table = pa.table(
+            {
+                "id": [f"s{shard}-{index}" for index in range(3)],
+                "text": ["hello <b>world</b>", "", "plain"],
+                "binary label": [0, 1, 0],
+            }
+        )
+        path = cache / f"mastodon-train-{shard:05d}-of-00002.arrow"
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    stats = ingest_mastodon(
+        str(cache), str(tmp_path / "output"), default_created_at="2025-01-01T00:00:00Z"
+    )
+
+    assert (stats.total_read, stats.total_written, stats.total_skipped) == (6, 4, 2)
+    table = _scan(tmp_path / "output")
+    assert set(table.column("created_at").to_pylist()) == {"2025-01-01T00:00:00Z"}
+    assert table.column("text").to_pylist()[0] == "hello world"
+
+
+def test_invalid_default_timestamp_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        MastodonAdapter(default_created_at="yesterday")
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from pii_risk.ingest.engine import IngestEngine, PlatformAdapter, validate_table
+from pii_risk.ingest.mastodon import MastodonAdapter
+from pii_risk.ingest.reddit import RedditAdapter
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _parity(adapter: PlatformAdapter, raws: list[dict[str, Any]]) -> None:
+    engine = IngestEngine(adapter, "unused")
+    reference = [row for row in (engine._validate(raw) for raw in raws) if row is not None]
+    raw_table = pa.Table.from_struct_array(pa.array(raws))
+    columnar = validate_table(adapter.normalize_table(raw_table)).to_pylist()
+    assert columnar == reference
+
+
+def _load(name: str) -> list[dict[str, Any]]:
+    with (FIXTURES / name).open("r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def test_reddit_columnar_matches_reference() -> None:
+    _parity(RedditAdapter(), _load("reddit_sample.jsonl"))
+    _parity(
+        RedditAdapter(),
+        [
+            {"id": 1, "author": "", "created_utc": 1735689600.5, "title": "  hi ", "subreddit": ""},
+            {"id": 2, "author": None, "created_utc": 1735689600.0, "body": " yo　"},
+            {"id": None, "created_utc": 1.0, "body": "no id"},
+            {"id": 4, "created_utc": None, "body": "no timestamp"},
+            {"id": 5, "created_utc": -1.25, "body": "", "parent_id": "t1_x"},
+        ],
+    )
+
+
+def test_mastodon_columnar_matches_reference() -> None:
+    _parity(MastodonAdapter(), _load("mastodon_sample.jsonl"))
+    _parity(
+        MastodonAdapter(),
+        [
+            {
+                "id": "7",
+                "created_at": "2024-12-05 18:45:00",
+                "content": "<p>a &amp; b</p>\n<br>  c",
+                "account": '{"acct": "z"}',
+                "url": "http://host.example/y",
+            },
+            {"id": "8", "created_at": "2024-12-05T18:45:00.5-05:00", "text": "t"},
+            {"id": "9", "created_at": "garbage", "text": "t", "account.username": "q"},
+            {"id": "10", "created_at_utc": "2024-01-01", "content": "", "text": ""},
+            {"id": "11", "created_at": "2024-02-03", "content": "a<b", "uri": "nope"},
+        ],
+    )
+
+
+def test_engine_falls_back_to_reference_for_mixed_types(tmp_path: Path) -> None:
+    input_path = tmp_path / "mixed.jsonl"
+    input_path.write_text(
+        '{"id": "a", "created_utc": 1735689600, "body": "numeric"}\n'
+        '{"id": "b", "created_utc": "1735689600", "body": "string"}\n',
+        encoding="utf-8",
+    )
+    output_dir = tmp_path / "output"
+
+    stats = IngestEngine(RedditAdapter(), str(output_dir)).run(str(input_path))
+
+    assert (stats.total_read, stats.total_written, stats.total_skipped) == (2, 2, 0)
+    table = ds.dataset(output_dir, format="parquet", partitioning="hive").to_table()
+    assert set(table.column("created_at").to_pylist()) == {"2025-01-01T00:00:00Z"}
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pyarrow.dataset as ds
+import pytest
+
+from pii_risk.ingest import dedup
+from pii_risk.ingest.dedup import RecordIdIndex
+from pii_risk.ingest.reddit import ingest_reddit
+
+
+def _write_input(path: Path, ids: list[str]) -> None:
+    with path.open("w", encoding="utf-8") as handle:
+        for record_id in ids:
+            record = {"id": record_id, "created_utc": 1704067200, "body": f"text {record_id}"}
+            handle.write(json.dumps(record) + "\n")
+
+
+def test_index_persists_and_merges_runs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(dedup, "MERGE_CHUNK_KEYS", 3)
+    index = RecordIdIndex(tmp_path, capacity=1_000)
+    keys = np.unique(np.random.default_rng(0).integers(0, 2**62, size=15)).astype(np.uint64)
+    batches = [keys[:8], keys[8:13], keys[13:]]
+
+    for batch in batches:
+        new = index.filter_new(batch)
+        index.add(batch[new])
+        index.flush()
+
+    reopened = RecordIdIndex(tmp_path, capacity=1_000)
+    everything = np.unique(np.concatenate(batches))
+    assert len(reopened) == len(everything)
+    assert len(reopened.meta["runs"]) < len(batches)
+    assert not reopened.filter_new(everything).any()
+
+    fresh = np.array([1, 2, 2, 3], dtype=np.uint64)
+    assert reopened.filter_new(fresh).tolist() == [True, True, False, True]
+
+
+def test_keys_reach_disk_only_on_flush(tmp_path: Path) -> None:
+    index = RecordIdIndex(tmp_path, capacity=1_000)
+    keys = np.arange(1, 2_001, dtype=np.uint64)
+    index.add(keys)
+
+    # Unflushed keys belong to parts no checkpoint lists yet; a resume
+    # re-reads those records and must not drop them as duplicates.
+    assert len(RecordIdIndex(tmp_path, capacity=1_000)) == 0
+    index.flush()
+    assert not RecordIdIndex(tmp_path, capacity=1_000).filter_new(keys).any()
+
+
+def test_readonly_buffer_tracks_many_small_batches(tmp_path: Path) -> None:
+    RecordIdIndex(tmp_path, capacity=1_000).flush()
+    index = RecordIdIndex(tmp_path, capacity=1_000, readonly=True)
+    keys = np.random.default_rng(1).permutation(np.arange(1, 501, dtype=np.uint64))
+
+    for batch in np.array_split(keys, 100):
+        assert index.filter_new(batch).all()
+        index.add(batch)
+        index.add(batch[:1])
+
+    assert len(index) == len(keys)
+    assert len(index._buffers) < 10
+    assert not index.filter_new(keys).any()
+    assert index.buffered_keys().tolist() == sorted(keys.tolist())
+
+
+def test_ingest_drops_ids_seen_in_earlier_dumps(tmp_path: Path) -> None:
+    first = tmp_path / "dump-1.jsonl"
+    second = tmp_path / "dump-2.jsonl"
+    _write_input(first, ["a", "b", "c", "a"])
+    _write_input(second, ["c", "d", "b", "e"])
+    output_dir = tmp_path / "output"
+
+    first_stats = ingest_reddit(str(first), str(output_dir))
+    second_stats = ingest_reddit(str(second), str(output_dir))
+
+    assert (first_stats.total_written, first_stats.total_duplicates) == (3, 1)
+    assert (second_stats.total_written, second_stats.total_duplicates) == (2, 2)
+    assert second_stats.total_skipped == 0
+
+    table = ds.dataset(output_dir, format="parquet", partitioning="hive").to_table()
+    assert sorted(table.column("record_id").to_pylist()) == ["a", "b", "c", "d", "e"]
+
+
+def test_parallel_ingest_drops_duplicates_across_ranges(tmp_path: Path) -> None:
+    input_path = tmp_path / "dump.jsonl"
+    ids = [f"r{index}" for index in range(30)]
+    _write_input(input_path, ids + ids[::2])
+
+    sequential = ingest_reddit(str(input_path), str(tmp_path / "seq"))
+    parallel = ingest_reddit(str(input_path), str(tmp_path / "par"), workers=3)
+
+    manifest = json.loads((tmp_path / "par" / "_ingest_manifest.json").read_text("utf-8"))
+    assert [len(entry["ranges"]) for entry in manifest["inputs"].values()] == [3]
+    assert (parallel.total_written, parallel.total_duplicates) == (30, 15)
+    assert parallel == sequential
+    table = ds.dataset(tmp_path / "par", format="parquet", partitioning="hive").to_table()
+    assert sorted(table.column("record_id").to_pylist()) == sorted(ids)
+
+
+def test_no_dedup_keeps_repeats(tmp_path: Path) -> None:
+    input_path = tmp_path / "dump.jsonl"
+    _write_input(input_path, ["a", "a"])
+
+    stats = ingest_reddit(str(input_path), str(tmp_path / "output"), dedup=False)
+
+    assert (stats.total_written, stats.total_duplicates) == (2, 0)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pyarrow.dataset as ds
+import pytest
+
+from pii_risk.ingest.engine import INGEST_PARQUET_SCHEMA, PlatformAdapter, run_ingest
+from pii_risk.ingest.reddit import ingest_reddit
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class _EchoAdapter(PlatformAdapter):
+    platform = "echo"
+
+    def normalize(self, raw: dict[str, Any]) -> dict[str, Any] | None:
+        if not raw.get("body"):
+            return None
+        return {
+            "platform": self.platform,
+            "record_type": "post",
+            "record_id": str(raw["id"]),
+            "author_id_hash": "x",
+            "created_at": "2024-03-01T00:00:00Z",
+            "text": raw["body"],
+        }
+
+
+def test_ingest_reddit_jsonl_uses_explicit_schema(tmp_path: Path) -> None:
+    output_dir = tmp_path / "output"
+    stats = ingest_reddit(str(FIXTURES / "reddit_sample.jsonl"), str(output_dir))
+
+    assert (stats.total_read, stats.total_written, stats.total_skipped) == (4, 4, 0)
+
+    dataset = ds.dataset(output_dir, format="parquet", partitioning="hive")
+    fragment_schema = next(iter(dataset.get_fragments())).physical_schema
+    for field in fragment_schema:
+        assert field.type == INGEST_PARQUET_SCHEMA.field(field.name).type
+
+    records = dataset.to_table().to_pylist()
+    post = next(r for r in records if r["record_id"] == "p1")
+    assert post["text"] == "First post\n\nHello world"
+    assert (output_dir / "platform=reddit" / "record_type=comment").is_dir()
+
+
+def test_engine_counts_and_max_rows_with_custom_adapter(tmp_path: Path) -> None:
+    input_path = tmp_path / "input.jsonl"
+    input_path.write_text(
+        '{"id": 1, "body": "one"}\n'
+        "not json\n"
+        "\n"
+        '{"id": 2, "body": ""}\n'
+        '{"id": 3, "body": "three"}\n',
+        encoding="utf-8",
+    )
+
+    stats = run_ingest(_EchoAdapter(), str(input_path), str(tmp_path / "all"), batch_size=1)
+    assert (stats.total_read, stats.total_written, stats.total_skipped) == (4, 2, 2)
+
+    limited = run_ingest(_EchoAdapter(), str(input_path), str(tmp_path / "limited"), max_rows=2)
+    assert (limited.total_read, limited.total_written, limited.total_skipped) == (2, 1, 1)
+
+    table = ds.dataset(tmp_path / "all", format="parquet", partitioning="hive").to_table()
+    assert sorted(table.column("record_id").to_pylist()) == ["1", "3"]
+
+
+def test_adapter_without_normalize_cannot_be_instantiated() -> None:
+    class _Incomplete(PlatformAdapter):
+        platform = "incomplete"
+
+    with pytest.raises(TypeError):
+        _Incomplete()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pyarrow.dataset as ds
+import pytest
+
+from pii_risk.ingest.engine import IngestEngine, run_ingest
+from pii_risk.ingest.manifest import MANIFEST_NAME, IngestManifest
+from pii_risk.ingest.reddit import RedditAdapter
+
+
+def _write_input(path: Path, prefix: str, rows: int) -> None:
+    with path.open("w", encoding="utf-8") as handle:
+        for index in range(rows):
+            record = {
+                "id": f"{prefix}{index}",
+                "author": "someone",
+                "created_utc": 1704067200 + index * 3600,
+                "body": f"comment {index}",
+            }
+            handle.write(json.dumps(record) + "\n")
+
+
+def _record_ids(output_dir: Path) -> list[str]:
+    table = ds.dataset(output_dir, format="parquet", partitioning="hive").to_table()
+    return sorted(table.column("record_id").to_pylist())
+
+
+def _entry(output_dir: Path) -> dict:
+    return next(iter(IngestManifest.load(output_dir).data["inputs"].values()))
+
+
+def test_interrupted_ingest_resumes_without_duplicates(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    input_path = tmp_path / "input.jsonl"
+    _write_input(input_path, "a", 10)
+    output_dir = tmp_path / "output"
+
+    original_write = IngestEngine._write
+    calls = {"count": 0}
+
+    def crashing_write(self: IngestEngine, table) -> None:
+        original_write(self, table)
+        calls["count"] += 1
+        if calls["count"] == 3:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(IngestEngine, "_write", crashing_write)
+    with pytest.raises(KeyboardInterrupt):
+        run_ingest(RedditAdapter(), str(input_path), str(output_dir), batch_size=2)
+    monkeypatch.setattr(IngestEngine, "_write", original_write)
+
+    resumed = run_ingest(RedditAdapter(), str(input_path), str(output_dir), batch_size=2)
+
+    assert resumed.total_read == 6
+    assert _record_ids(output_dir) == sorted(f"a{index}" for index in range(10))
+
+    entry = _entry(output_dir)
+    assert entry["complete"] is True
+    assert entry["ranges"][0]["stats"]["total_written"] == 10
+
+
+def test_seen_inputs_are_skipped_and_new_inputs_appended(tmp_path: Path) -> None:
+    first = tmp_path / "first.jsonl"
+    second = tmp_path / "second.jsonl"
+    _write_input(first, "a", 4)
+    _write_input(second, "b", 4)
+    output_dir = tmp_path / "output"
+
+    run_ingest(RedditAdapter(), str(first), str(output_dir))
+    repeat = run_ingest(RedditAdapter(), str(first), str(output_dir))
+    run_ingest(RedditAdapter(), str(second), str(output_dir))
+
+    assert repeat.total_read == 0
+    expected = [f"a{index}" for index in range(4)] + [f"b{index}" for index in range(4)]
+    assert _record_ids(output_dir) == sorted(expected)
+    assert (output_dir / MANIFEST_NAME).exists()
+    assert len(IngestManifest.load(output_dir).data["inputs"]) == 2
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_capped_ingest_continues_with_a_larger_cap(tmp_path: Path, workers: int) -> None:
+    input_path = tmp_path / "input.jsonl"
+    _write_input(input_path, "a", 20)
+    output_dir = tmp_path / "output"
+
+    def ingest(max_rows: int | None):
+        return run_ingest(
+            RedditAdapter(), str(input_path), str(output_dir), max_rows, 3, workers=workers
+        )
+
+    assert ingest(8).total_read == 8
+    assert ingest(8).total_read == 0
+    assert ingest(12).total_read == 4
+    assert _record_ids(output_dir) == sorted(f"a{index}" for index in range(12))
+    assert _entry(output_dir)["complete"] is False
+
+    assert ingest(None).total_read == 8
+    assert _record_ids(output_dir) == sorted(f"a{index}" for index in range(20))
+    assert _entry(output_dir)["complete"] is True
+    assert ingest(None).total_read == 0
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+
+import pyarrow as pa
+import pytest
+
+from pii_risk.ingest.mastodon import ingest_mastodon
+from pii_risk.ingest.readers import input_format, iter_raw_batches
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.mark.parametrize(
+    ("suffix", "opener"),
+    [(".gz", gzip.open), (".bz2", bz2.open), (".xz", lzma.open)],
+)
+def test_compressed_jsonl_matches_plain(tmp_path: Path, suffix: str, opener) -> None:
+    data = (FIXTURES / "mastodon_sample.jsonl").read_bytes()
+    compressed = tmp_path / f"mastodon.jsonl{suffix}"
+    with opener(compressed, "wb") as handle:
+        handle.write(data + b"{not json}\n")
+
+    stats = ingest_mastodon(str(compressed), str(tmp_path / "output"))
+
+    assert (stats.total_read, stats.total_written, stats.total_skipped) == (4, 3, 1)
+    assert stats.bytes_read == len(data) + len(b"{not json}\n")
+
+
+def test_zst_input_is_streamed(tmp_path: Path) -> None:
+    zstandard = pytest.importorskip("zstandard")
+    compressed = tmp_path / "RS_2024-01.zst"
+    data = (FIXTURES / "mastodon_sample.jsonl").read_bytes()
+    compressed.write_bytes(zstandard.ZstdCompressor().compress(data))
+
+    stats = ingest_mastodon(str(compressed), str(tmp_path / "output"))
+
+    assert stats.total_written == 3
+
+
+def test_block_decoding_falls_back_per_line(tmp_path: Path) -> None:
+    input_path = tmp_path / "input.jsonl"
+    input_path.write_text(
+        '{"id": "1", "created_at": "2025-01-01T00:00:00Z"}\n'
+        "[1, 2]\n"
+        '{"id": "2", "created_at": "2025-01-02T00:00:00Z"\n'
+        '{"id": "3", "created_at": "2025-01-03T00:00:00Z"}\n',
+        encoding="utf-8",
+    )
+    schema = pa.schema([("created_at", pa.string())])
+
+    batches = list(iter_raw_batches(input_path, batch_size=10, raw_schema=schema))
+    assert [(batch.num_rows, batch.skipped) for batch in batches] == [(2, 2)]
+
+    clean = list(iter_raw_batches(input_path, batch_size=1, max_rows=1, raw_schema=schema))
+    assert isinstance(clean[0].records, pa.Table)
+    assert clean[0].records.schema.field("created_at").type == pa.string()
+
+
+def test_input_format_detection() -> None:
+    assert input_format(Path("dump.jsonl.gz")) == ("jsonl", ".gz")
+    assert input_format(Path("RC_2019-01.zst")) == ("jsonl", ".zst")
+    assert input_format(Path("posts.csv")) == ("csv", None)
+    assert input_format(Path("cache-train.arrow")) == ("arrow", None)
+    with pytest.raises(ValueError):
+        input_format(Path("posts.xlsx"))
+
+
+def test_csv_is_streamed_as_strings_and_bad_rows_skipped(tmp_path: Path) -> None:
+    lines = ["id,author,subreddit,created_utc,title,selftext,body"]
+    for index in range(50):
+        lines.append(f'{index:03d},user{index},python,{1704067200 + index},,,"line one\nline two"')
+    lines.insert(10, "oops,too,many,fields,here,,,,")
+    csv_path = tmp_path / "posts.csv"
+    csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    batches = list(iter_raw_batches(csv_path, 20, csv_block_size=256))
+
+    assert [batch.num_rows for batch in batches] == [20, 20, 10]
+    assert sum(batch.skipped for batch in batches) == 1
+    first = batches[0].records
+    assert first.schema.field("created_utc").type == pa.string()
+    assert first.column("id")[0].as_py() == "000"
+    assert first.column("title")[0].as_py() == ""
+    assert first.column("body")[0].as_py() == "line one\nline two"
+
+    limited = list(iter_raw_batches(csv_path, 20, max_rows=5, skip_rows=30))
+    assert [row["id"] for row in limited[0].records.to_pylist()] == [
+        f"{index:03d}" for index in range(29, 34)
+    ]
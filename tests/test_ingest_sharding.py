@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pyarrow.dataset as ds
+
+from pii_risk.ingest.reddit import ingest_reddit
+from pii_risk.ingest.sharding import offset_after_rows, plan_byte_ranges
+
+
+def _write_input(path: Path, rows: int) -> None:
+    with path.open("w", encoding="utf-8") as handle:
+        for index in range(rows):
+            if index % 7 == 3:
+                handle.write("{broken json\n")
+                continue
+            if index % 11 == 5:
+                handle.write("\n")
+            record = {
+                "id": f"r{index}",
+                "author": f"user{index % 5}",
+                "created_utc": 1704067200 + index * 86400,
+                "body": f"comment number {index}",
+            }
+            handle.write(json.dumps(record) + "\n")
+
+
+def _record_ids(output_dir: Path) -> list[str]:
+    table = ds.dataset(output_dir, format="parquet", partitioning="hive").to_table()
+    return sorted(table.column("record_id").to_pylist())
+
+
+def test_plan_byte_ranges_are_newline_aligned(tmp_path: Path) -> None:
+    input_path = tmp_path / "input.jsonl"
+    _write_input(input_path, 50)
+    data = input_path.read_bytes()
+
+    ranges = plan_byte_ranges(input_path, 4, target_bytes=200)
+
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == len(data)
+    for (_, previous_end), (start, _) in zip(ranges, ranges[1:]):
+        assert previous_end == start
+        assert data[start - 1 : start] == b"\n"
+
+
+def test_parallel_ingest_matches_sequential(tmp_path: Path) -> None:
+    input_path = tmp_path / "input.jsonl"
+    _write_input(input_path, 60)
+
+    sequential = ingest_reddit(str(input_path), str(tmp_path / "seq"), max_rows=40)
+    parallel = ingest_reddit(str(input_path), str(tmp_path / "par"), max_rows=40, workers=3)
+
+    assert parallel == sequential
+    assert sequential.total_read == 40
+    assert _record_ids(tmp_path / "par") == _record_ids(tmp_path / "seq")
+
+
+def test_offset_after_rows_skips_blank_lines(tmp_path: Path) -> None:
+    input_path = tmp_path / "input.jsonl"
+    input_path.write_bytes(b'{"a": 1}\n\n{"a": 2}\n{"a": 3}\n')
+
+    assert offset_after_rows(input_path, 0) == 0
+    assert offset_after_rows(input_path, 2) == len(b'{"a": 1}\n\n{"a": 2}\n')
+    assert offset_after_rows(input_path, 10) == input_path.stat().st_size
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import json
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+
+from pii_risk.ingest.engine import validate_table, write_partitioned
+from pii_risk.ingest.mastodon import ingest_mastodon_stream
+from pii_risk.ml.train import train_model
+from pii_risk.pii.scoring import score_record
+
+
+def _status(index: int, text: str) -> dict:
+    return {
+        "id": str(index),
+        "created_at": f"2024-0{1 + index % 2}-05T10:00:00Z",
+        "content": f"<p>{text}</p>",
+        "account": {"id": f"a{index % 3}", "acct": f"user{index % 3}"},
+        "uri": "https://social.example/statuses/1",
+    }
+
+
+def _producer(lines: list[bytes], pause_after: int = 0, pause: threading.Event | None = None):
+    """Serve ``lines`` to one client; optionally hold the connection open mid-way."""
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def serve() -> None:
+        connection, _ = server.accept()
+        with connection:
+            for position, line in enumerate(lines):
+                if pause is not None and position == pause_after:
+                    pause.wait(timeout=10)
+                connection.sendall(line)
+        server.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    return f"tcp://127.0.0.1:{server.getsockname()[1]}", thread
+
+
+def test_stream_ingest_from_tcp_source(tmp_path: Path) -> None:
+    lines = [json.dumps(_status(index, f"post {index}")).encode() + b"\n" for index in range(7)]
+    lines.insert(2, b": heartbeat\n")
+    lines.insert(3, b"event: update\n")
+    lines.insert(4, b"data: " + json.dumps(_status(7, "sse framed")).encode() + b"\n")
+    lines.insert(5, b"not json\n")
+    lines.append(json.dumps(_status(1, "duplicate id")).encode() + b"\n")
+    source, producer = _producer(lines)
+    output_dir = tmp_path / "output"
+
+    stats = ingest_mastodon_stream(source, str(output_dir), batch_rows=3, batch_seconds=5)
+    producer.join(timeout=10)
+
+    table = ds.dataset(output_dir, format="parquet", partitioning="hive").to_table()
+    assert sorted(table.column("record_id").to_pylist(), key=int) == [str(i) for i in range(8)]
+    assert stats.total_written == 8
+    assert stats.total_skipped == 1
+    assert stats.total_duplicates == 1
+    months = {path.name for path in output_dir.glob("platform=mastodon/record_type=post/*/*")}
+    assert months == {"month=01", "month=02"}
+
+    # A later stream into the same dataset keeps earlier ids out and its files apart.
+    source, producer = _producer([json.dumps(_status(3, "again")).encode() + b"\n"])
+    stats = ingest_mastodon_stream(source, str(output_dir), batch_rows=3, batch_seconds=5)
+    producer.join(timeout=10)
+    assert stats.total_duplicates == 1
+    assert ds.dataset(output_dir, format="parquet", partitioning="hive").count_rows() == 8
+
+
+def test_partial_batch_is_written_after_batch_seconds(tmp_path: Path) -> None:
+    release = threading.Event()
+    lines = [json.dumps(_status(index, f"post {index}")).encode() + b"\n" for index in range(3)]
+    source, producer = _producer(lines, pause_after=1, pause=release)
+    output_dir = tmp_path / "output"
+
+    worker = threading.Thread(
+        target=ingest_mastodon_stream,
+        args=(source, str(output_dir)),
+        kwargs={"batch_rows": 100, "batch_seconds": 0.05},
+        daemon=True,
+    )
+    worker.start()
+    # The producer holds the connection open: only the time bound can flush.
+    deadline = time.monotonic() + 10
+    while not list(output_dir.rglob("*.parquet")) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert ds.dataset(output_dir, format="parquet", partitioning="hive").count_rows() == 1
+    release.set()
+    worker.join(timeout=10)
+    producer.join(timeout=10)
+    assert not worker.is_alive()
+    assert ds.dataset(output_dir, format="parquet", partitioning="hive").count_rows() == 3
+
+
+def test_stream_ingest_writes_scored_batches(tmp_path: Path) -> None:
+    texts = ["call 555-123-4567", "nothing here", "ssn 123-45-6789 and a@b.com", "hi"]
+    rows = [
+        {
+            "platform": "reddit",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": "x",
+            "created_at": f"2024-0{1 + index % 5}-01T00:00:00Z",
+            "community": "c",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": texts[index % len(texts)],
+        }
+        for index in range(40)
+    ]
+    write_partitioned(
+        validate_table(pa.Table.from_pylist(rows)), str(tmp_path / "train"), "part-{i}.parquet"
+    )
+    train_model(str(tmp_path / "train"), models_dir=tmp_path / "models")
+
+    lines = [json.dumps(_status(index, texts[index % 4])).encode() + b"\n" for index in range(6)]
+    source, producer = _producer(lines)
+    ingest_mastodon_stream(
+        source,
+        str(tmp_path / "output"),
+        batch_rows=4,
+        score_dir=str(tmp_path / "scored"),
+        models_dir=str(tmp_path / "models"),
+    )
+    producer.join(timeout=10)
+
+    raw = ds.dataset(tmp_path / "output", format="parquet", partitioning="hive")
+    scored = ds.dataset(tmp_path / "scored", format="parquet", partitioning="hive")
+    assert {p.relative_to(tmp_path / "output") for p in (tmp_path / "output").rglob("*.parquet")} == {
+        p.relative_to(tmp_path / "scored") for p in (tmp_path / "scored").rglob("*.parquet")
+    }
+    assert scored.count_rows() == raw.count_rows() == 6
+    for record in scored.to_table().to_pylist():
+        assert record["rule_score"] == score_record(record["text"])["score"]
+        assert 0.0 <= record["p_risk"] <= 1.0
+
+
+def test_open_event_source_rejects_bad_tcp_address() -> None:
+    with pytest.raises(ValueError):
+        ingest_mastodon_stream("tcp://localhost", "unused")
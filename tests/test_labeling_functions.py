@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from pii_risk.ingest.engine import validate_table, write_partitioned
+from pii_risk.labels.functions import (
+    ABSTAIN,
+    LABELING_FUNCTIONS,
+    NEGATIVE,
+    POSITIVE,
+    LabelContext,
+    LabelingStats,
+    apply_functions,
+    community_prior,
+    label_dataset,
+    label_texts,
+    labeling_function,
+    resolve_functions,
+)
+from pii_risk.labels.weak import weak_label_from_rules
+from pii_risk.ml.train import train_model
+
+
+TEXTS = [
+    "My SSN is 123-45-6789, please keep it private.",
+    "Just sharing a project update with no sensitive data.",
+    "email me at someone@example.com",
+    "great read https://example.com/post",
+    "found out where she lives, her address is 12 Elm Street",
+    "Name: Jo Bloggs\nAddress: somewhere\nEmployer: ACME",
+    "hi",
+]
+
+
+def test_builtin_functions_vote_in_one_pass() -> None:
+    context = LabelContext(TEXTS)
+    functions = resolve_functions()
+    matrix = apply_functions(context, functions)
+
+    assert matrix.votes.shape == (len(TEXTS), len(functions))
+    assert set(matrix.votes.data) <= {1, -1}
+    y_risk = matrix.combine()
+    assert list(y_risk) == [1, 0, 1, 0, 1, 1, 0]
+    # The rule-based positives are kept.
+    for text, label in zip(TEXTS, y_risk):
+        if weak_label_from_rules(text)["y_risk"]:
+            assert label == 1
+    positives = dict(zip(TEXTS, matrix.function_names(1)))
+    assert positives[TEXTS[4]] == ["doxxing_language"]
+    assert positives[TEXTS[5]] == ["profile_fields"]
+    assert "self_disclosure" in positives[TEXTS[2]]
+    assert matrix.function_names(-1)[3] == ["link_only"]
+    assert list(label_texts(TEXTS)) == list(y_risk)
+
+
+def test_stats_report_coverage_and_conflicts() -> None:
+    prior = community_prior("risky_community", {"doxbin": POSITIVE})
+    functions = [*resolve_functions(["rule_score", "short_text"]), prior]
+    context = LabelContext(["hi", "hello there friend", "hi"], communities=["doxbin", None, "x"])
+    matrix = apply_functions(context, functions)
+    stats = LabelingStats(functions)
+    stats.update(matrix, matrix.combine())
+
+    summary = stats.to_dict()
+    assert summary["rows"] == 3
+    assert summary["coverage"] == 1.0
+    # Row 0: the prior votes positive while rule_score and short_text vote negative.
+    assert summary["conflict_rate"] == pytest.approx(1 / 3)
+    assert summary["functions"]["risky_community"] == {
+        "positives": 1,
+        "negatives": 0,
+        "coverage": pytest.approx(1 / 3),
+        "overlap": pytest.approx(1 / 3),
+        "conflict": pytest.approx(1 / 3),
+    }
+    assert summary["functions"]["short_text"]["negatives"] == 2
+    assert list(matrix.combine()) == [0, 0, 0]
+
+
+def test_registered_functions_share_the_context() -> None:
+    calls = []
+
+    @labeling_function("mentions_phone_word")
+    def mentions_phone_word(context: LabelContext) -> np.ndarray:
+        calls.append(id(context.spans))
+        return context.votes(("phone" in tokens for tokens in context.tokens), POSITIVE)
+
+    try:
+        with pytest.raises(ValueError):
+            labeling_function("mentions_phone_word")(mentions_phone_word)
+        context = LabelContext(["my phone died", "no"])
+        spans = context.spans
+        matrix = apply_functions(context, resolve_functions(["mentions_phone_word"]))
+        assert calls == [id(spans)]
+        assert matrix.votes.toarray().ravel().tolist() == [1, 0]
+    finally:
+        del LABELING_FUNCTIONS["mentions_phone_word"]
+    with pytest.raises(ValueError):
+        resolve_functions(["mentions_phone_word"])
+    assert ABSTAIN not in (POSITIVE, NEGATIVE)
+
+
+def _write_dataset(data_dir: Path) -> None:
+    rows = [
+        {
+            "platform": "reddit",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": "x",
+            "created_at": f"2024-0{1 + index % 5}-01T00:00:00Z",
+            "community": "c",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": TEXTS[index % len(TEXTS)],
+        }
+        for index in range(42)
+    ]
+    write_partitioned(validate_table(pa.Table.from_pylist(rows)), str(data_dir), "part-{i}.parquet")
+
+
+def test_label_dataset_streams_labels_to_parquet(tmp_path: Path) -> None:
+    _write_dataset(tmp_path / "data")
+
+    summary = label_dataset(str(tmp_path / "data"), str(tmp_path / "labels.parquet"), batch_size=5)
+
+    labels = pq.read_table(tmp_path / "labels.parquet").to_pylist()
+    assert summary["rows"] == len(labels) == 42
+    expected = dict(zip(TEXTS, label_texts(TEXTS)))
+    texts = {f"r{index}": TEXTS[index % len(TEXTS)] for index in range(42)}
+    for row in labels:
+        assert row["y_risk"] == expected[texts[row["record_id"]]]
+    assert summary["positive_rate"] == pytest.approx(sum(row["y_risk"] for row in labels) / 42)
+    assert set(summary["functions"]) == set(LABELING_FUNCTIONS)
+
+
+def test_train_with_labeling_functions(tmp_path: Path) -> None:
+    _write_dataset(tmp_path / "data")
+
+    result = train_model(
+        str(tmp_path / "data"),
+        models_dir=tmp_path / "models",
+        labeling_functions=["rule_score", "doxxing_language", "link_only"],
+    )
+
+    metadata = json.loads(Path(result["metadata_path"]).read_text(encoding="utf-8"))
+    assert metadata["label_rule"].startswith("weighted vote of labeling functions: rule_score")
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from pii_risk.ingest.engine import validate_table, write_partitioned
+from pii_risk.ml.batch_score import score_dataset
+from pii_risk.ml.combine import combined_score
+from pii_risk.ml.predict import predict_risk
+from pii_risk.ml.train import train_model
+from pii_risk.pii.detector import detect_pii_spans, redact_text
+from pii_risk.pii.scoring import WEIGHTS, score_record
+
+
+def _write_dataset(data_dir: Path) -> None:
+    texts = ["call 555-123-4567", "nothing here", "ssn 123-45-6789 and a@b.com", "hi"]
+    rows = [
+        {
+            "platform": "reddit" if index % 2 else "mastodon",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": "x",
+            "created_at": f"2024-0{1 + index % 5}-01T00:00:00Z",
+            "community": "c",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": texts[index % len(texts)],
+        }
+        for index in range(40)
+    ]
+    write_partitioned(validate_table(pa.Table.from_pylist(rows)), str(data_dir), "part-{i}.parquet")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scored_dataset_matches_per_record_scoring(tmp_path: Path, workers: int) -> None:
+    data_dir = tmp_path / "data"
+    models_dir = tmp_path / "models"
+    _write_dataset(data_dir)
+    train_model(str(data_dir), models_dir=models_dir)
+
+    out_dir = tmp_path / "scored"
+    result = score_dataset(
+        str(data_dir), str(out_dir), str(models_dir), workers=workers, batch_size=3
+    )
+
+    input_files = sorted(path.relative_to(data_dir) for path in data_dir.rglob("*.parquet"))
+    assert sorted(path.relative_to(out_dir) for path in out_dir.rglob("*.parquet")) == input_files
+    rows = ds.dataset(out_dir, partitioning="hive").to_table().to_pylist()
+    assert len(rows) == result["rows_scored"] == 40
+    for row in rows:
+        text = row["text"]
+        rules = score_record(text)
+        p_risk = predict_risk(text, models_dir)["p_risk"]
+        combined = combined_score(rules["score"], p_risk)
+        assert row["rule_score"] == rules["score"]
+        assert row["p_risk"] == pytest.approx(p_risk)
+        assert row["final_score"] == combined["final_score"]
+        assert row["interpretation"] == combined["interpretation"]
+        assert row["redacted_text"] == redact_text(text, detect_pii_spans(text))
+        assert row["pii_types"] == sorted({span.type for span in detect_pii_spans(text)})
+
+
+def test_incremental_rescoring_follows_fingerprints(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    data_dir = tmp_path / "data"
+    models_dir = tmp_path / "models"
+    _write_dataset(data_dir)
+    train_model(str(data_dir), models_dir=models_dir)
+    out_dir = tmp_path / "scored"
+
+    first = score_dataset(
+        str(data_dir), str(out_dir), str(models_dir), cube_dir=str(tmp_path / "cube")
+    )
+    assert first["skipped_partitions"] == 0
+    assert first["cube"]["rebuilt_partitions"] == first["partitions"]
+    assert (out_dir / "_score_manifest.json").exists()
+
+    # A touched but unchanged file is not re-scored.
+    changed = sorted(data_dir.rglob("*.parquet"))[0]
+    later = (changed.stat().st_mtime_ns // 1_000_000_000 + 10) * 1_000_000_000
+    os.utime(changed, ns=(later, later))
+    again = score_dataset(str(data_dir), str(out_dir), str(models_dir))
+    assert again["scored_partitions"] == 0
+
+    partition = changed.parent.relative_to(data_dir).as_posix()
+    table = pq.read_table(changed)
+    pq.write_table(table.slice(1), changed)
+    plan = score_dataset(str(data_dir), str(out_dir), str(models_dir), dry_run=True)
+    assert plan["to_score"] == [partition]
+    assert score_dataset(str(data_dir), str(out_dir), str(models_dir))["scored_partitions"] == 1
+
+    shutil.rmtree(changed.parent)
+    plan = score_dataset(str(data_dir), str(out_dir), str(models_dir), dry_run=True)
+    assert plan == {"partitions": first["partitions"] - 1, "to_score": [], "to_remove": [partition]}
+    score_dataset(str(data_dir), str(out_dir), str(models_dir))
+    assert not (out_dir / partition).exists()
+
+    monkeypatch.setitem(WEIGHTS, "URL", 6)
+    plan = score_dataset(str(data_dir), str(out_dir), str(models_dir), dry_run=True)
+    assert len(plan["to_score"]) == first["partitions"] - 1
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+
+from pii_risk.ingest.engine import validate_table, write_partitioned
+from pii_risk.ml.batch_score import score_dataset
+from pii_risk.ml.near_dup import NearDuplicateIndex
+from pii_risk.ml.predict import predict_risk
+from pii_risk.ml.train import train_model
+from pii_risk.pii.detector import detect_pii_spans, redact_text
+from pii_risk.pii.scoring import score_record
+
+
+PASTE = (
+    "found where {handle} lives now, the address is 12 Elm Street and the phone is {phone} go visit"
+)
+
+
+def test_index_clusters_reposts_with_changed_handles() -> None:
+    index = NearDuplicateIndex(max_distance=3)
+    first = index.signature(PASTE.format(handle="@alice", phone="555-123-4567"))
+    assert first is not None
+    cluster = index.add(first)
+
+    repost = index.signature(PASTE.format(handle="@bob@social.example", phone="555-987-6543"))
+    assert repost is not None and index.find(repost) == cluster
+
+    other = index.signature("a completely different post about the weather and trains today")
+    assert other is not None and index.find(other) is None
+    assert index.signature("too short to cluster") is None
+    assert index.stats() == {"clusters": 1, "lookups": 2, "reused": 0}
+
+
+def test_index_rejects_unusable_distance() -> None:
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(max_distance=16)
+
+
+def test_score_dataset_reuses_model_scores_of_near_duplicates(tmp_path: Path) -> None:
+    texts = ["call 555-123-4567", "nothing here", "ssn 123-45-6789", "hi"]
+    texts += [
+        PASTE.format(handle=f"@user{index}", phone=f"555-000-{index:04d}") for index in range(6)
+    ]
+    rows = [
+        {
+            "platform": "mastodon",
+            "record_type": "post",
+            "record_id": f"m{index}",
+            "author_id_hash": "x",
+            "created_at": f"2024-0{1 + index % 2}-01T00:00:00Z",
+            "community": "c",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": texts[index % len(texts)],
+        }
+        for index in range(40)
+    ]
+    data_dir = tmp_path / "data"
+    write_partitioned(validate_table(pa.Table.from_pylist(rows)), str(data_dir), "part-{i}.parquet")
+    train_model(str(data_dir), models_dir=tmp_path / "models")
+    out_dir = tmp_path / "scored"
+
+    result = score_dataset(
+        str(data_dir), str(out_dir), str(tmp_path / "models"), batch_size=7, near_duplicates=True
+    )
+
+    # One paste cluster per month partition; every other paste reuses its score.
+    reuse = result["near_duplicates"]
+    assert reuse["clusters"] == 2
+    assert reuse["lookups"] == 24
+    assert reuse["reused"] == 22
+    scored = ds.dataset(out_dir, partitioning="hive").to_table().to_pylist()
+    pastes = [row for row in scored if row["text"].startswith("found where")]
+    for row in scored:
+        # Detection still runs on every text.
+        assert row["rule_score"] == score_record(row["text"])["score"]
+        assert row["redacted_text"] == redact_text(row["text"], detect_pii_spans(row["text"]))
+    for row in scored:
+        if row not in pastes:
+            assert row["p_risk"] == pytest.approx(
+                predict_risk(row["text"], tmp_path / "models")["p_risk"]
+            )
+    assert len({row["p_risk"] for row in pastes}) <= 2
+
+    # Toggling reuse changes p_risk values, so every partition is scored again.
+    plan = score_dataset(str(data_dir), str(out_dir), str(tmp_path / "models"), dry_run=True)
+    assert len(plan["to_score"]) == result["partitions"]
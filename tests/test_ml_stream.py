@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import threading
+from pathlib import Path
+
+import pyarrow as pa
+import pytest
+
+from pii_risk.ingest.engine import validate_table, write_partitioned
+from pii_risk.ml.predict import predict_risk
+from pii_risk.ml.stream import score_stream
+from pii_risk.ml.train import train_model
+from pii_risk.pii.scoring import score_record
+
+
+TEXTS = ["call 555-123-4567", "nothing here", "ssn 123-45-6789 and a@b.com", "hi"]
+
+
+@pytest.fixture
+def models_dir(tmp_path: Path) -> Path:
+    rows = [
+        {
+            "platform": "reddit",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": "x",
+            "created_at": f"2024-0{1 + index % 5}-01T00:00:00Z",
+            "community": "c",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": TEXTS[index % len(TEXTS)],
+        }
+        for index in range(40)
+    ]
+    write_partitioned(
+        validate_table(pa.Table.from_pylist(rows)), str(tmp_path / "data"), "part-{i}.parquet"
+    )
+    train_model(str(tmp_path / "data"), models_dir=tmp_path / "models")
+    return tmp_path / "models"
+
+
+def test_stream_scores_every_line_in_order(models_dir: Path) -> None:
+    lines = [json.dumps({"id": index, "body": TEXTS[index % len(TEXTS)]}) for index in range(10)]
+    lines.insert(3, "not json")
+    source = io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+    sink = io.BytesIO()
+
+    result = score_stream(source, sink, models_dir, batch_size=4, text_field="body")
+
+    outputs = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert result == {"records": 11, "errors": 1, "batches": 3}
+    assert outputs[3] == {"error": "line is not a JSON object"}
+    del outputs[3]
+    assert [output["id"] for output in outputs] == list(range(10))
+    for output in outputs:
+        assert output["rule_score"] == score_record(output["body"])["score"]
+        assert output["p_risk"] == pytest.approx(predict_risk(output["body"], models_dir)["p_risk"])
+
+
+def test_partial_batch_is_flushed_after_the_latency_budget(models_dir: Path) -> None:
+    read_fd, write_fd = os.pipe()
+    flushed = threading.Event()
+
+    class Sink(io.BytesIO):
+        def flush(self) -> None:
+            flushed.set()
+
+    sink = Sink()
+    with os.fdopen(read_fd, "rb") as source, os.fdopen(write_fd, "wb") as writer:
+        worker = threading.Thread(
+            target=score_stream, args=(source, sink, models_dir, 100, 20), daemon=True
+        )
+        worker.start()
+        writer.write(b'{"text": "call 555-123-4567"}\n')
+        writer.flush()
+        # The stream is still open: only the latency budget can flush the line.
+        assert flushed.wait(timeout=10)
+        assert json.loads(sink.getvalue())["rule_score"] == 25
+    worker.join(timeout=10)
+    assert not worker.is_alive()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import pyarrow as pa
+import pytest
+
+from pii_risk.ingest.engine import validate_table, write_partitioned
+from pii_risk.ml.batch_score import score_texts
+from pii_risk.ml.train import train_model
+from pii_risk.service import ScoringService, load_test
+
+
+TEXTS = ["call 555-123-4567", "nothing here", "ssn 123-45-6789 and a@b.com", "hi"]
+
+
+@pytest.fixture
+def models_dir(tmp_path: Path) -> Path:
+    rows = [
+        {
+            "platform": "reddit",
+            "record_type": "post",
+            "record_id": f"r{index}",
+            "author_id_hash": "x",
+            "created_at": f"2024-0{1 + index % 5}-01T00:00:00Z",
+            "community": "c",
+            "parent_record_id": None,
+            "thread_id": None,
+            "text": TEXTS[index % len(TEXTS)],
+        }
+        for index in range(40)
+    ]
+    write_partitioned(
+        validate_table(pa.Table.from_pylist(rows)), str(tmp_path / "data"), "part-{i}.parquet"
+    )
+    train_model(str(tmp_path / "data"), models_dir=tmp_path / "models")
+    return tmp_path / "models"
+
+
+async def _request(port: int, method: str, path: str, payload: object = None) -> tuple[int, object]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    head = f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(content)
+
+
+def test_endpoints_and_micro_batching(models_dir: Path) -> None:
+    async def scenario() -> None:
+        service = ScoringService(models_dir, workers=1, max_batch=64, max_latency_ms=50)
+        await service.start(port=0)
+        try:
+            port = service.port
+            assert port is not None
+            responses = await asyncio.gather(
+                *(_request(port, "POST", "/v1/score", {"text": text}) for text in TEXTS * 5)
+            )
+            arrays = score_texts(TEXTS, models_dir)
+            expected = {name: values.to_pylist() for name, values in arrays.items()}
+            for index, (status, result) in enumerate(responses):
+                assert status == 200
+                assert result["final_score"] == expected["final_score"][index % len(TEXTS)]
+                assert result["p_risk"] == pytest.approx(expected["p_risk"][index % len(TEXTS)])
+            stats = service.stats()
+            assert stats["texts"]["score"] == 20
+            assert stats["batches"]["score"] < 20
+
+            status, rules = await _request(port, "POST", "/v1/rules", {"texts": TEXTS[:2]})
+            assert status == 200
+            assert [item["rule_score"] for item in rules["results"]] == [25, 0]
+            status, redacted = await _request(port, "POST", "/v1/redact", {"text": TEXTS[0]})
+            assert redacted["redacted_text"] != TEXTS[0]
+            status, ml = await _request(port, "POST", "/v1/ml", {"text": TEXTS[1]})
+            assert set(ml) == {"p_risk"}
+
+            assert (await _request(port, "POST", "/v1/score", {"body": 1}))[0] == 400
+            both = {"text": TEXTS[0], "texts": TEXTS[:2]}
+            assert (await _request(port, "POST", "/v1/score", both))[0] == 400
+            assert (await _request(port, "GET", "/v1/score"))[0] == 405
+            assert (await _request(port, "GET", "/nope"))[0] == 404
+            assert await _request(port, "GET", "/health") == (200, {"status": "ok"})
+
+            result = await load_test(port=port, requests=50, concurrency=8)
+            assert result["requests"] == 50 and result["failures"] == 0
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())